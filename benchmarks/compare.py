@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compares two benchmark results (see ``suite.py``).
+
+Prints time and peak memory of every measurement of both results
+and fails if any of them got worse by more than the threshold.
+
+Usage:
+
+    python benchmarks/compare.py BASE.json NEW.json [--threshold 0.2]
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(filename):
+    """
+    Loads results as (case, size) -> result.
+    """
+
+    with open(filename) as f:
+        data = json.load(f)
+
+    return data, {(r["case"], r["size"]): r for r in data["results"]}
+
+
+def ratio(base, new):
+
+    if not base or new is None:
+        return None
+
+    return new / base
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Compares benchmark results.")
+    parser.add_argument("base", help="Results of the base commit.")
+    parser.add_argument("new", help="Results of the new commit.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown (and memory growth) - 0.2 is 20 %%.",
+    )
+    args = parser.parse_args()
+
+    base_data, base = load(args.base)
+    new_data, new = load(args.new)
+    failed = False
+
+    print(f"base: {base_data.get('commit')}  new: {new_data.get('commit')}\n")
+    print(f"{'case':>12} {'tasks':>8} {'base s':>10} {'new s':>10} {'time':>7} {'memory':>7}")
+
+    for key in sorted(base.keys() & new.keys(), key=lambda k: (k[1], k[0])):
+        b, n = base[key], new[key]
+        changes = (ratio(b["seconds"], n["seconds"]), ratio(b["peak"], n["peak"]))
+        worse = any(c is not None and 1 + args.threshold < c for c in changes)
+        failed = failed or worse
+
+        time_change, memory_change = (
+            f"{c:>6.2f}x" if c is not None else f"{'-':>7}" for c in changes
+        )
+
+        print(
+            f"{key[0]:>12} {key[1]:>8} {b['seconds']:>10.4f} {n['seconds']:>10.4f} "
+            f"{time_change} {memory_change}{'  REGRESSION' if worse else ''}"
+        )
+
+    return 1 if failed else 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
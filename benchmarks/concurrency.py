@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Concurrent writers benchmark.
+
+Runs N processes which add tasks to the same (temporary) storage at once
+and reports throughput. Every added task has to be in the storage
+at the end - lost updates are reported as failure.
+
+Usage:
+
+    python benchmarks/concurrency.py [--writers N] [--tasks M] [--engine E]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def writer(number, tasks, start):
+    """
+    Adds tasks one by one - every task in its own storage session
+    the same way ``eagle -a`` does.
+    """
+
+    from eagle.storage import Task, get_storage
+
+    start.wait()
+
+    for i in range(tasks):
+        with get_storage() as s:
+            s["tasks"].add(Task(f"writer {number} task {i}", None, None, datetime.now()))
+
+
+def run(writers, tasks):
+    """
+    Runs the writers and returns elapsed time in seconds.
+    """
+
+    start = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=writer, args=(n, tasks, start))
+        for n in range(writers)
+    ]
+
+    for p in processes:
+        p.start()
+
+    began = time.perf_counter()
+    start.set()
+
+    for p in processes:
+        p.join()
+
+        if p.exitcode:
+            raise RuntimeError(f"Writer failed with exit code {p.exitcode}.")
+
+    return time.perf_counter() - began
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Concurrent writers benchmark.")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--tasks", type=int, default=200, help="Tasks per writer.")
+    parser.add_argument("--engine", choices=["journal", "sqlite"], default="journal")
+    args = parser.parse_args()
+
+    os.environ["EAGLE_ENGINE"] = args.engine
+    failed = False
+
+    print(f"{'writers':>8} {'tasks':>8} {'seconds':>8} {'tasks/s':>8}  result")
+
+    for writers in args.writers:
+
+        # Every run gets empty storage in its own home directory.
+        with tempfile.TemporaryDirectory() as home:
+            os.environ["HOME"] = home
+            os.environ.pop("EAGLE_HOME", None)
+
+            elapsed = run(writers, args.tasks)
+
+            from eagle.storage import get_storage
+
+            with get_storage() as s:
+                stored = len(s["tasks"])
+
+        expected = writers * args.tasks
+        result = "ok" if stored == expected else f"LOST {expected - stored}"
+        failed = failed or stored != expected
+
+        print(
+            f"{writers:>8} {expected:>8} {elapsed:>8.2f} "
+            f"{expected / elapsed:>8.0f}  {result}"
+        )
+
+    return 1 if failed else 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Storage file formats.
+
+Writes the same generated list (see ``generate.py``) as plain pickle
+(the format of older versions, now read only to be converted) and
+in the storage file format with every compression, then reports size
+of the file and time of loading it (reading the file and deserializing
+the storage).
+On network file systems loading gets slower with every byte read
+so the size matters more than it seems locally.
+
+Usage:
+
+    python benchmarks/formats.py [--tasks N] [--repeat R]
+        [--formats pickle none zlib:1 ...]
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from generate import populate  # noqa: E402
+
+from eagle.datafile import dump, load  # noqa: E402
+from eagle.storage import (  # noqa: E402
+    deserialize_structures,
+    get_engine,
+    serialize_structures,
+)
+
+FORMATS = ["pickle", "none", "zlib:1", "zlib:6", "lzma:0", "lzma:6"]
+
+
+def write(filename, raw, fmt):
+
+    with open(filename, "wb") as f:
+        if "pickle" == fmt:
+            pickle.dump(raw, f)
+        else:
+            codec, _, level = fmt.partition(":")
+            dump(raw, f, codec, int(level or 0))
+
+
+def read(filename):
+
+    with open(filename, "rb") as f:
+        raw, _ = load(f)
+
+    return deserialize_structures(raw)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Compares storage file formats.")
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5, help="Loads per format.")
+    parser.add_argument("--formats", nargs="+", default=FORMATS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        os.environ.pop("EAGLE_HOME", None)
+        populate(args.tasks)
+        raw = serialize_structures(get_engine().load())
+        filename = os.path.join(home, "storage.test")
+
+        print(f"{'format':>8} {'KiB':>10} {'ratio':>7} {'write s':>9} {'load s':>9}")
+        base = None
+
+        for fmt in args.formats:
+            began = time.perf_counter()
+            write(filename, raw, fmt)
+            written = time.perf_counter() - began
+            size = os.path.getsize(filename)
+            base = base or size
+            times = []
+
+            for _ in range(args.repeat):
+                began = time.perf_counter()
+                read(filename)
+                times.append(time.perf_counter() - began)
+
+            print(
+                f"{fmt:>8} {size / 1024:>10.0f} {size / base:>7.2f} "
+                f"{written:>9.4f} {min(times):>9.4f}"
+            )
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Synthetic task lists for benchmarks.
+
+Generated lists mix tasks with specific dates (past and future), recurring
+tasks (daily to yearly) and undated tasks, grouped into many groups or not
+grouped at all. The same count and seed always give the same list.
+
+Usage (fills the storage in the current home directory):
+
+    python benchmarks/generate.py COUNT [--groups G] [--seed S]
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from eagle.storage import DATE, Frequency, Group, Task, get_storage  # noqa: E402
+
+# Tasks saved at once while the list is generated.
+BATCH_SIZE = 10000
+
+WORDS = (
+    "buy milk",
+    "call mom",
+    "pay rent",
+    "water plants",
+    "review pull request",
+    "book dentist",
+    "clean the kitchen",
+    "renew passport",
+    "do the laundry",
+    "write report",
+)
+
+
+def get_group_count(count):
+
+    return max(10, count // 100)
+
+
+def generate_tasks(count, groups=None, seed=0):
+    """
+    Generates tasks - 30 % with specific date, 20 % recurring,
+    the rest undated. 60 % of the tasks belong to a group.
+
+    :param int count: Number of tasks.
+    :param int groups: Number of groups (1 per 100 tasks by default).
+    :param int seed: Random seed.
+    :return: Generator of tasks.
+    :rtype: generator
+    """
+
+    rng = random.Random(seed)
+    groups = groups or get_group_count(count)
+    today = date.today().toordinal()
+    created = datetime.now() - timedelta(days=365)
+
+    for i in range(count):
+        kind = rng.random()
+
+        if kind < 0.3:
+            frequency = Frequency(DATE, 0, today + rng.randint(-60, 60))
+        elif kind < 0.5:
+            frequency = Frequency(
+                rng.choice("dwmy"), rng.randint(1, 4), today - rng.randint(0, 365)
+            )
+        else:
+            frequency = None
+
+        group = f"group {rng.randrange(groups)}" if rng.random() < 0.6 else None
+
+        yield Task(f"{rng.choice(WORDS)} {i}", frequency, group, created)
+
+
+def populate(count, groups=None, seed=0):
+    """
+    Fills the storage (of the current home directory) with generated
+    tasks and all their groups.
+
+    :param int count: Number of tasks.
+    :param int groups: Number of groups (see ``generate_tasks()``).
+    :param int seed: Random seed.
+    """
+
+    groups = groups or get_group_count(count)
+
+    with get_storage() as s:
+        for g in range(groups):
+            s["groups"].append(Group(f"group {g}", datetime.now()))
+
+        for i, task in enumerate(generate_tasks(count, groups, seed), 1):
+            s["tasks"].add(task)
+
+            if 0 == i % BATCH_SIZE:
+                s.commit()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Generates task list.")
+    parser.add_argument("count", type=int, help="Number of tasks.")
+    parser.add_argument("--groups", type=int, help="Number of groups.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    populate(args.count, args.groups, args.seed)
+
+
+if "__main__" == __name__:
+    main()
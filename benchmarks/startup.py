@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark.
+
+Runs the plain listing and ``--today`` (the commands which run i.e. in shell
+prompt) as fresh processes and reports wall-clock time and import time
+(``python -X importtime``). Fails if a command gets slower than the given
+limit or if it imports a module the fast path has to avoid.
+
+Usage:
+
+    python benchmarks/startup.py [--tasks N] [--runs R] [--max-ms MS]
+"""
+
+import argparse
+import compileall
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Commands measured and modules they must not import.
+COMMANDS = (
+    ("list", []),
+    ("today", ["--today"]),
+)
+FORBIDDEN = ("argparse", "calendar", "csv", "json", "socket", "eagle.tasks")
+
+
+def run(args, env, importtime=False):
+    """
+    Runs eagle command and returns elapsed time in milliseconds
+    and its stderr.
+    """
+
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else [])
+    began = time.perf_counter()
+    process = subprocess.run(
+        cmd + ["-m", "eagle"] + args,
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+
+    return (time.perf_counter() - began) * 1000, process.stderr
+
+
+def parse_importtime(output):
+    """
+    Parses ``-X importtime`` output into module -> cumulative
+    import time in milliseconds.
+    """
+
+    modules = {}
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, name = line[len("import time:") :].split("|")
+
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative) / 1000
+
+    return modules
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Startup benchmark.")
+    parser.add_argument("--tasks", type=int, default=1000, help="Tasks in the list.")
+    parser.add_argument("--runs", type=int, default=20, help="Runs per command.")
+    parser.add_argument("--max-ms", type=float, help="Fail above this median.")
+    args = parser.parse_args()
+
+    # Installed package has its bytecode compiled.
+    compileall.compile_dir(os.path.join(ROOT, "eagle"), quiet=1)
+    failed = False
+
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, PYTHONPATH=ROOT)
+        env.pop("EAGLE_ENGINE", None)
+        env.pop("EAGLE_HOME", None)
+        records = os.path.join(home, "tasks.jsonl")
+
+        with open(records, "w") as f:
+            for i in range(args.tasks):
+                f.write(json.dumps({"title": f"task {i}"}) + "\n")
+
+        run(["--import", records], env)
+
+        print(f"{'command':>8} {'median ms':>10} {'min ms':>8} {'import ms':>10}  result")
+
+        for name, command in COMMANDS:
+            times = [run(command, env)[0] for _ in range(args.runs)]
+            modules = parse_importtime(run(command, env, importtime=True)[1])
+            median = statistics.median(times)
+
+            problems = [f"imports {m}" for m in FORBIDDEN if m in modules]
+
+            if args.max_ms is not None and args.max_ms < median:
+                problems.append(f"slower than {args.max_ms:g} ms")
+
+            failed = failed or bool(problems)
+
+            print(
+                f"{name:>8} {median:>10.1f} {min(times):>8.1f} "
+                f"{modules.get('eagle.eagle', 0):>10.1f}  "
+                f"{', '.join(problems) or 'ok'}"
+            )
+
+    return 1 if failed else 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite.
+
+Measures the main storage operations on generated task lists (see
+``generate.py``) of several sizes - loading and saving the storage,
+classifying and listing tasks, search, bulk adds, API sessions, group
+deletion and pruning. Every measurement runs in its own process on a fresh copy
+of the list and reports time and peak memory (``tracemalloc``) of the
+operation only. Results can be saved as JSON and compared between commits
+(see ``compare.py``).
+
+Usage:
+
+    python benchmarks/suite.py [--sizes 1000 10000 ...] [--cases load ...]
+        [--repeat R] [--engine E] [--no-memory] [--output FILE]
+
+Lists up to 100k tasks are measured by default, add ``--sizes 1000000``
+for the big one (generating it takes a while).
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from generate import populate  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Number of tasks added by the "add" case.
+ADDS = 1000
+
+
+def bench_load():
+    """
+    Loading the whole storage.
+    """
+
+    from eagle.storage import get_storage
+
+    def run():
+
+        with get_storage():
+            pass
+
+    return run
+
+
+def bench_save():
+    """
+    Writing the whole storage - compaction of the default engine,
+    all tasks changed at once for the others.
+    """
+
+    from eagle.storage import get_engine
+
+    engine = get_engine()
+    storage = engine.load()
+
+    def run():
+
+        if hasattr(engine, "compact"):
+            with engine.lock():
+                engine.compact(storage)
+        else:
+            tasks = storage["tasks"]
+
+            for i, t in list(tasks.items()):
+                tasks[i] = t
+
+            engine.save(storage)
+
+    return run
+
+
+def bench_classify():
+    """
+    Sorting all tasks into overdue, today, upcoming and other.
+    """
+
+    from eagle.storage import classify_tasks, read_tasks
+
+    tasks = list(read_tasks().values())
+
+    return lambda: classify_tasks(tasks)
+
+
+def bench_list():
+    """
+    Listing all tasks (``eagle`` without arguments).
+    """
+
+    from eagle.eagle import print_list
+
+    def run():
+
+        with redirect_stdout(io.StringIO()):
+            print_list((), all_tasks=True)
+
+    return run
+
+
+def bench_search():
+    """
+    Searching task titles (with the search index already built).
+    """
+
+    from eagle.search import search
+
+    search(["warm up"])
+
+    return lambda: search(["milk 12", "rent"])
+
+
+def bench_add():
+    """
+    Adding tasks in one command (``eagle -a .. -a ..``).
+    """
+
+    from eagle.tasks import add_task
+
+    tasks = [[f"added task {i}", "1w", "group 1"] for i in range(ADDS)]
+
+    return lambda: add_task(tasks)
+
+
+def bench_session():
+    """
+    Adding, editing and deleting tasks in one API session (see
+    ``eagle.api``) - committed at once.
+    """
+
+    from eagle.api import Session
+
+    def run():
+
+        with Session() as s:
+            ids = s.add_many((f"added task {i}", "1w", "group 1") for i in range(ADDS))
+
+            for i in ids[::2]:
+                s.edit(i, title="edited task")
+
+            s.delete_many(ids[1::2])
+
+    return run
+
+
+def bench_delete_group():
+    """
+    Deleting group with all its tasks.
+    """
+
+    from eagle.groups import delete_group
+
+    def run():
+
+        with redirect_stdout(io.StringIO()):
+            delete_group([["group 1"]])
+
+    return run
+
+
+def bench_prune():
+    """
+    Deleting all overdue tasks.
+    """
+
+    from eagle.tasks import prune
+
+    def run():
+
+        with redirect_stdout(io.StringIO()):
+            prune()
+
+    return run
+
+
+CASES = {
+    "load": bench_load,
+    "save": bench_save,
+    "classify": bench_classify,
+    "list": bench_list,
+    "search": bench_search,
+    "add": bench_add,
+    "session": bench_session,
+    "delete_group": bench_delete_group,
+    "prune": bench_prune,
+}
+
+
+def measure(case, home, memory, results):
+    """
+    Runs the case in the given home directory (in a child process)
+    and puts elapsed seconds and peak memory in bytes (or None)
+    to the results queue.
+    """
+
+    os.environ["HOME"] = home
+    os.environ.pop("EAGLE_HOME", None)
+    run = CASES[case]()
+
+    if memory:
+        tracemalloc.start()
+
+    began = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - began
+    peak = tracemalloc.get_traced_memory()[1] if memory else None
+
+    results.put((elapsed, peak))
+
+
+def in_process(target, *args):
+    """
+    Runs the function in a fresh process so no storage is cached.
+    """
+
+    process = multiprocessing.Process(target=target, args=args)
+    process.start()
+    process.join()
+
+    if process.exitcode:
+        raise RuntimeError(f"Benchmark failed with exit code {process.exitcode}.")
+
+
+def run_case(case, store, repeat, memory):
+    """
+    Measures the case on copies of the generated list.
+
+    :return: Best time in seconds and peak memory in bytes (or None).
+    :rtype: tuple
+    """
+
+    results = multiprocessing.Queue()
+    times = []
+    peak = None
+
+    # Memory is traced in an extra run as tracing slows the code down.
+    for traced in [False] * repeat + ([True] if memory else []):
+        with tempfile.TemporaryDirectory() as home:
+            shutil.copytree(store, os.path.join(home, ".config", "eagle"))
+            in_process(measure, case, home, traced, results)
+
+        elapsed, traced_peak = results.get()
+
+        if traced:
+            peak = traced_peak
+        else:
+            times.append(elapsed)
+
+    return min(times), peak
+
+
+def generate(home, size):
+
+    os.environ["HOME"] = home
+    os.environ.pop("EAGLE_HOME", None)
+    populate(size)
+
+
+def get_commit():
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case.")
+    parser.add_argument("--engine", choices=["journal", "sqlite"], default="journal")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc.")
+    parser.add_argument("--output", help="Save results as JSON into the file.")
+    args = parser.parse_args()
+
+    os.environ["EAGLE_ENGINE"] = args.engine
+    results = []
+
+    print(f"{'case':>12} {'tasks':>8} {'seconds':>10} {'peak KiB':>10}")
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as home:
+            in_process(generate, home, size)
+            store = os.path.join(home, ".config", "eagle")
+
+            for case in args.cases:
+                seconds, peak = run_case(case, store, args.repeat, not args.no_memory)
+                results.append(
+                    {"case": case, "size": size, "seconds": seconds, "peak": peak}
+                )
+
+                peak = f"{peak / 1024:.0f}" if peak is not None else "-"
+                print(f"{case:>12} {size:>8} {seconds:>10.4f} {peak:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "commit": get_commit(),
+                    "python": platform.python_version(),
+                    "engine": args.engine,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if "__main__" == __name__:
+    main()
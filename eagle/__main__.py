@@ -1,5 +1,88 @@
-from .eagle import eagle
+import os
+import sys
+
+from .tools import get_socket_file
+
+# Arguments which have to run in the client process - interactive
+# edit, stdin/stdout transfers, profiling, other than the default
+# list (the daemon keeps only that one) and the daemon itself.
+# Only saves the round trip - the daemon parses the arguments and
+# hands back other spellings of them (see ``eagle.daemon.runs_locally()``).
+LOCAL_ARGS = ("-e", "--edit", "--serve", "--profile", "--list", "--all-lists", "-")
+
+
+def request_daemon(argv):
+    """
+    Forwards the command to eagle daemon (see ``eagle.daemon``).
+
+    :param list argv: Command arguments.
+    :return: Response or None if the daemon is not running
+        (or cannot run the command).
+    :rtype: dict
+    """
+
+    socket_file = get_socket_file()
+
+    # Socket modules are not loaded unless the daemon is running.
+    if not os.path.exists(socket_file):
+        return None
+
+    import json
+    import socket
+
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "engine": os.environ.get("EAGLE_ENGINE", "journal"),
+    }
+
+    try:
+        with socket.socket(socket.AF_UNIX) as s:
+            s.settimeout(1)
+            s.connect(socket_file)
+            s.settimeout(None)
+            s.sendall(json.dumps(request).encode())
+            s.shutdown(socket.SHUT_WR)
+
+            with s.makefile("rb") as f:
+                response = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+    if response.get("fallback"):
+        return None
+
+    return response
+
+
+def main(argv=None):
+    """
+    Runs eagle command - in eagle daemon if it's running,
+    directly otherwise.
+
+    :param list argv: Arguments (``sys.argv`` by default).
+    """
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Traced command runs directly so the trace covers it.
+    local = bool(os.environ.get("EAGLE_TRACE"))
+
+    if not local and not any(
+        a.split("=", 1)[0] in LOCAL_ARGS or a.startswith("-e") for a in argv
+    ):
+        response = request_daemon(argv)
+
+        if response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            sys.exit(response["code"])
+
+    from .eagle import eagle
+
+    eagle(argv)
 
 
 if "__main__" == __name__:
-    eagle()
+    main()
@@ -0,0 +1,391 @@
+from datetime import datetime
+
+from .groups import delete_groups
+from .query import Query
+from .storage import DATE, Frequency, Group, Task, get_engine, is_list_name
+from .tasks import parse_frequency
+
+# Number of tasks filtered at once by the query methods.
+CHUNK_SIZE = 10000
+
+# Task fields which can be changed by ``Session.edit()``.
+EDITABLE = ("title", "frequency", "group")
+
+
+class Session:
+    """
+    Transaction over one task list for programmatic use (without
+    the CLI). The storage is loaded on the first operation and all
+    the changes are written at once by ``commit()`` (or at the end
+    of ``with`` block - changes are thrown away if the block raises)
+    so a batch of operations costs one load and one save. Changes
+    made meanwhile by other processes are kept (see
+    ``eagle.storage.rebase()``).
+
+    Read-only sessions never load the storage if the engine can read
+    tasks right from the columnar snapshot (see ``tasks()``)::
+
+        from eagle.api import Session
+
+        with Session() as s:
+            for title in titles:
+                s.add(title, "1w", "chores")
+
+            s.delete(12)
+
+        with Session("work") as s:
+            for i, task in s.tasks(date_filters=["today"]):
+                print(i, task.title)
+    """
+
+    def __init__(self, name=None):
+        """
+        :param str name: List name (the default list by default).
+        :raises ValueError: If the list name is not valid.
+        """
+
+        if name is not None and not is_list_name(name):
+            raise ValueError(f'Invalid list name "{name}".')
+
+        self.engine = get_engine(name)
+        self._storage = None
+
+        # Storage of the session is never shared with other sessions
+        # (or ``get_storage()``) of the process.
+        if hasattr(self.engine, "cache"):
+            self.engine.cache = {}
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self.close()
+
+    @property
+    def storage(self):
+        """
+        Loaded storage (see ``eagle.storage.Storage``).
+        """
+
+        if self._storage is None:
+            self._storage = self.engine.load()
+            self._storage.engine = self.engine
+
+        return self._storage
+
+    @property
+    def dirty(self):
+        """
+        True if there are changes which were not committed yet.
+        """
+
+        return self._storage is not None and self._storage.dirty
+
+    def commit(self):
+        """
+        Writes all changes made since the last commit.
+        """
+
+        if self.dirty:
+            self.engine.save(self._storage)
+
+    def rollback(self):
+        """
+        Throws away all changes made since the last commit.
+        """
+
+        # Changed storage is left dirty so it's never taken
+        # from the engine cache (see ``JournalEngine.load()``).
+        self._storage = None
+
+    def close(self):
+        """
+        Closes the storage engine. Changes which were not committed
+        are lost.
+        """
+
+        self.rollback()
+        self.engine.close()
+
+    def parse_frequency(self, frequency, anchor=None):
+        """
+        Converts frequency given the same way as on the command line
+        (i.e. "1w", "@24/12", "tomorrow" or "-") into ``Frequency``.
+
+        :param frequency: Frequency string, ``Frequency`` or None.
+        :param date anchor: First occurrence of recurring task.
+        :return: Frequency or None.
+        :rtype: Frequency
+        :raises ValueError: If the frequency is not recognized
+            or its interval is not positive.
+        """
+
+        if isinstance(frequency, Frequency):
+            if DATE != frequency.kind and 0 >= frequency.interval:
+                raise ValueError("Frequency interval has to be positive.")
+
+            return frequency
+
+        if frequency is None:
+            return frequency
+
+        parsed = parse_frequency(frequency, anchor=anchor)
+
+        if parsed is None and "-" != frequency:
+            raise ValueError(f'Unknown frequency "{frequency}".')
+
+        return parsed
+
+    def ensure_group(self, title):
+        """
+        Creates the group if it doesn't exist yet (same as ``-a``
+        does for unknown groups).
+
+        :param str title: Group title (or None).
+        """
+
+        if title is not None and self.storage.group(title) is None:
+            self.storage["groups"].append(Group(title, datetime.now()))
+
+    def add(self, title, frequency=None, group=None):
+        """
+        Adds new task (see ``eagle.tasks.add_task()``).
+
+        :param str title: Task title.
+        :param frequency: Frequency (see ``parse_frequency()``).
+        :param str group: Group title - created if it doesn't exist.
+        :return: ID of the new task.
+        :rtype: int
+        :raises ValueError: If the title is empty or the frequency
+            is not recognized.
+        """
+
+        if not title or not title.strip():
+            raise ValueError("Title is mandatory.")
+
+        frequency = self.parse_frequency(frequency)
+        self.ensure_group(group)
+
+        return self.storage["tasks"].add(Task(title, frequency, group, datetime.now()))
+
+    def add_many(self, tasks):
+        """
+        Adds more tasks at once.
+
+        :param iterable tasks: Tasks - (title, frequency, group) tuples
+            (frequency and group are optional).
+        :return: IDs of the new tasks.
+        :rtype: list
+        """
+
+        return [self.add(*t) for t in tasks]
+
+    def edit(self, task_id, **changes):
+        """
+        Changes the task - only the given fields are changed
+        (see ``EDITABLE``). Frequency is anchored to the task creation
+        the same way as by ``-e``.
+
+        :param int task_id: Task ID.
+        :return: Changed task.
+        :rtype: Task
+        :raises KeyError: If there is no such task.
+        :raises TypeError: If other fields are given.
+        """
+
+        unknown = set(changes) - set(EDITABLE)
+
+        if unknown:
+            raise TypeError(f"Cannot edit {', '.join(sorted(unknown))}.")
+
+        tasks = self.storage["tasks"]
+        task = tasks[task_id]
+
+        if "title" in changes and not (changes["title"] or "").strip():
+            raise ValueError("Title is mandatory.")
+
+        if "frequency" in changes:
+            changes["frequency"] = self.parse_frequency(
+                changes["frequency"], task.created
+            )
+
+        self.ensure_group(changes.get("group"))
+        tasks[task_id] = task = task._replace(**changes)
+
+        return task
+
+    def delete(self, task_id):
+        """
+        Deletes the task.
+
+        :param int task_id: Task ID.
+        :return: Deleted task.
+        :rtype: Task
+        :raises KeyError: If there is no such task.
+        """
+
+        return self.storage["tasks"].pop(task_id)
+
+    def delete_many(self, task_ids):
+        """
+        Deletes more tasks at once. Missing tasks are skipped.
+
+        :param iterable task_ids: Task IDs.
+        :return: Number of deleted tasks.
+        :rtype: int
+        """
+
+        tasks = self.storage["tasks"]
+        deleted = 0
+
+        for i in task_ids:
+            if tasks.pop(i, None) is not None:
+                deleted += 1
+
+        return deleted
+
+    def add_group(self, title):
+        """
+        Creates new group.
+
+        :param str title: Group title.
+        :return: New group.
+        :rtype: Group
+        :raises ValueError: If the group already exists.
+        """
+
+        if self.storage.group(title) is not None:
+            raise ValueError(f'Group "{title}" already exists.')
+
+        group = Group(title, datetime.now())
+        self.storage["groups"].append(group)
+
+        return group
+
+    def delete_group(self, title, keep_tasks=False):
+        """
+        Deletes the group with all its tasks (``-D``) or ungroups
+        the tasks (``-S``).
+
+        :param str title: Group title.
+        :param bool keep_tasks: Keep the tasks without group.
+        :return: Number of deleted or ungrouped tasks.
+        :rtype: int
+        """
+
+        storage = self.storage
+        tasks = storage["tasks"]
+        task_ids = storage.group_tasks(title)
+
+        for i in task_ids:
+            if keep_tasks:
+                tasks[i] = tasks[i]._replace(group=None)
+            else:
+                del tasks[i]
+
+        delete_groups(storage, [title])
+
+        return len(task_ids)
+
+    def get(self, task_id, default=None):
+        """
+        Returns the task.
+
+        :param int task_id: Task ID.
+        :param default: Returned if there is no such task.
+        :return: Task.
+        :rtype: Task
+        """
+
+        tasks = self.get_tasks()
+
+        return tasks[task_id] if task_id in tasks else default
+
+    def groups(self):
+        """
+        Yields all groups.
+
+        :return: Generator of groups.
+        :rtype: generator
+        """
+
+        yield from list(self.storage["groups"])
+
+    def get_tasks(self):
+        """
+        Returns mapping of task IDs to tasks to be read. Unless
+        the storage was loaded (changed) already the tasks are read
+        from the columnar snapshot if the engine supports it.
+
+        :return: Mapping of task IDs to tasks.
+        :rtype: TaskTable or SnapshotView
+        """
+
+        if self._storage is None and hasattr(self.engine, "view"):
+            view = self.engine.view()
+
+            if view is not None:
+                return view
+
+        return self.storage["tasks"]
+
+    def tasks(
+        self,
+        groups=None,
+        queries=None,
+        date_filters=None,
+        match_all=False,
+        combine_all=False,
+    ):
+        """
+        Yields tasks matching the filters (all tasks by default) in order
+        of their IDs. Filters are the same as of the command line (see
+        ``eagle.query.Query``) - tasks are built and filtered in chunks
+        (see ``CHUNK_SIZE``) so the first ones come out right away and
+        all the matching tasks are never held at once.
+
+        :param list groups: Group titles.
+        :param list queries: Queries searched in task titles.
+        :param list date_filters: Any of "today", "overdue", "upcoming"
+            and "others".
+        :param bool match_all: Task title has to contain all the queries.
+        :param bool combine_all: Task has to match all the kinds of filters.
+        :return: Generator of (ID, task) pairs.
+        :rtype: generator
+        """
+
+        query = Query(groups, queries, date_filters, match_all, combine_all)
+        tasks = self.get_tasks()
+        items = iter(tasks.items())
+
+        # Only tasks of the groups can match - narrowed by group index.
+        if query.groups is not None and (combine_all or 1 == query.kinds()):
+            if self._storage is not None:
+                ids = sorted(
+                    {i for g in query.groups for i in self.storage.group_tasks(g)}
+                )
+                items = ((i, tasks[i]) for i in ids)
+
+        while True:
+            chunk = [item for _, item in zip(range(CHUNK_SIZE), items)]
+
+            if not chunk:
+                return
+
+            yield from query.filter(chunk) if query else chunk
+
+    def count(self, **filters):
+        """
+        Counts tasks matching the filters (see ``tasks()``).
+
+        :return: Number of matching tasks.
+        :rtype: int
+        """
+
+        return sum(1 for _ in self.tasks(**filters))
@@ -0,0 +1,158 @@
+import os
+import struct
+from array import array
+
+from .profiling import count, phase
+from .snapshot import pad
+from .storage import classify_chunk, get_task_columns
+
+MAGIC = b"EGLB"
+VERSION = 1
+
+# Magic, version, task count, ordinal of the day the tasks were
+# classified for, size and modification time of the storage snapshot
+# the buckets belong to, size of the journal and number of tasks
+# changed in the journal.
+HEADER = struct.Struct("<4sH2xQQqqQQ")
+
+
+def write_buckets(filename, buckets, today, stamp, journal_size=0, changed=None):
+    """
+    Writes bucket cache file - one byte per task in order of the columnar
+    snapshot (see ``eagle.snapshot``) followed by IDs and buckets of tasks
+    changed in the journal. The file is replaced at once the same way
+    as the search index (see ``eagle.search``).
+
+    :param str filename: Cache file name.
+    :param bytes buckets: Bucket of every task of the snapshot.
+    :param int today: Ordinal of the day the tasks were classified for.
+    :param tuple stamp: Stamp of the storage snapshot.
+    :param int journal_size: Size of the journal.
+    :param dict changed: Task ID -> bucket of tasks changed in the journal.
+    """
+
+    changed = changed or {}
+    header = HEADER.pack(
+        MAGIC, VERSION, len(buckets), today, *stamp, journal_size, len(changed)
+    )
+    tmp = f"{filename}.{os.getpid()}.tmp"
+
+    try:
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(pad(bytes(buckets)))
+            f.write(bytes(array("q", changed)))
+            f.write(bytes(changed.values()))
+
+        os.replace(tmp, filename)
+    except OSError:
+        # The cache is just an optimization.
+        pass
+
+
+def read_buckets(filename, today, stamp):
+    """
+    Reads bucket cache file.
+
+    :param str filename: Cache file name.
+    :param int today: Today's ordinal.
+    :param tuple stamp: Stamp of the current storage snapshot.
+    :return: Buckets of the snapshot tasks, journal size and buckets
+        of the changed tasks (see ``write_buckets()``) or None if there
+        is no cache for the day and the snapshot.
+    :rtype: tuple
+    """
+
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if len(data) < HEADER.size:
+        return None
+
+    magic, version, task_count, day, *file_stamp, journal_size, changed_count = (
+        HEADER.unpack_from(data)
+    )
+    offset = HEADER.size + task_count + (-task_count % 8)
+
+    if MAGIC != magic or VERSION != version or len(data) != offset + 9 * changed_count:
+        return None
+
+    # Classified for another day or another snapshot.
+    if today != day or tuple(stamp) != tuple(file_stamp):
+        return None
+
+    ids = array("q")
+    ids.frombytes(data[offset : offset + 8 * changed_count])
+    changed = dict(zip(ids, data[offset + 8 * changed_count :]))
+
+    return data[HEADER.size : HEADER.size + task_count], journal_size, changed
+
+
+def get_buckets(filename, view, today):
+    """
+    Returns buckets of all tasks of the snapshot view. Tasks are
+    classified only if there is no cache for today and the snapshot yet
+    - after the journal changed only tasks changed in the journal are.
+    The cache is rewritten then.
+
+    :param str filename: Cache file name.
+    :param SnapshotView view: All tasks.
+    :param int today: Today's ordinal.
+    :return: Bucket of every task in order of ``view.rows_items()``.
+    :rtype: iterable
+    """
+
+    snapshot = view.snapshot
+
+    with phase("buckets"):
+        cached = read_buckets(filename, today, snapshot.stamp)
+
+    if cached is not None and len(cached[0]) == len(snapshot):
+        buckets, journal_size, changed = cached
+        count("buckets.cached", len(buckets))
+    else:
+        buckets = bytes(classify_chunk(snapshot.columns(), today))
+        journal_size, changed = None, None
+
+    if view.overlay is None:
+        if cached is None:
+            with phase("buckets"):
+                write_buckets(filename, buckets, today, snapshot.stamp)
+
+        return buckets
+
+    if journal_size == view.journal_size:
+        count("buckets.cached", len(changed))
+    else:
+        ids = view.changed()
+        tasks = get_task_columns([view[i] for i in ids])
+        changed = dict(zip(ids, classify_chunk(tasks, today)))
+
+        with phase("buckets"):
+            write_buckets(
+                filename, buckets, today, snapshot.stamp, view.journal_size, changed
+            )
+
+    return view.lay_over(buckets, changed)
+
+
+def update_buckets(filename, tasks, today, stamp):
+    """
+    Carries the bucket cache over storage compaction - tasks of the new
+    snapshot are classified by the writer so listings don't have to.
+    Nothing happens if there is no cache (listing wasn't used).
+
+    :param str filename: Cache file name.
+    :param tasks: All tasks in order of the new snapshot.
+    :param int today: Today's ordinal.
+    :param tuple stamp: Stamp of the new snapshot.
+    """
+
+    if not os.path.exists(filename):
+        return
+
+    buckets = bytes(classify_chunk(get_task_columns(tasks), today))
+    write_buckets(filename, buckets, today, stamp)
@@ -0,0 +1,211 @@
+import io
+import json
+import os
+import signal
+import socket
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+from .eagle import eagle, parse_arguments
+from .storage import get_engine, get_storage
+from .tools import err_print, get_socket_file
+
+
+def get_files_state(engine):
+    """
+    Returns state (size and modification time) of the storage files
+    so changes made by other processes can be detected.
+
+    :param engine: Storage engine.
+    :return: Tuple of file states.
+    :rtype: tuple
+    """
+
+    files = [engine.filename]
+
+    if hasattr(engine, "journal"):
+        files.append(engine.journal.filename)
+
+    state = []
+
+    for f in files:
+        try:
+            stat = os.stat(f)
+        except FileNotFoundError:
+            state.append(None)
+        else:
+            state.append((stat.st_size, stat.st_mtime_ns))
+
+    return tuple(state)
+
+
+def runs_locally(argv):
+    """
+    Returns True if the command has to run in the client process -
+    it edits tasks interactively, imports from stdin, exports
+    to stdout, profiles, uses other than the default list (the only
+    one the daemon keeps) or runs the daemon itself. Decided from
+    parsed arguments so every spelling of the options is recognized
+    (``--edit=1``, ``--import=-``, ``--list=work``, ``--lis work``, ..).
+
+    :param list argv: Command arguments.
+    :return: True if the command cannot run in the daemon.
+    :rtype: bool
+    """
+
+    # Help and errors are printed by the command itself.
+    try:
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            args = parse_arguments(argv)
+    except SystemExit:
+        return False
+
+    return bool(
+        args.edit
+        or args.serve
+        or args.profile
+        or args.list
+        or args.all_lists
+        or "-" in (args.import_file, args.export_file)
+    )
+
+
+class Daemon:
+    """
+    Keeps storage loaded in memory and runs eagle commands against it.
+    Commands are run one by one so they never interfere. The storage
+    is reloaded once its files were changed by another process.
+    """
+
+    def __init__(self):
+
+        self.engine = get_engine()
+        self.engine_name = os.environ.get("EAGLE_ENGINE", "journal")
+        self.storage = None
+        self.state = None
+
+    def get_storage(self):
+
+        state = get_files_state(self.engine)
+
+        if self.storage is None or state != self.state:
+            self.storage = self.engine.load()
+            self.storage.engine = self.engine
+            self.state = state
+
+        return self.storage
+
+    def run(self, argv, cwd):
+        """
+        Runs eagle command and captures its output.
+
+        :param list argv: Command arguments.
+        :param str cwd: Working directory of the client.
+        :return: Response - stdout, stderr and exit code.
+        :rtype: dict
+        """
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        code = 0
+        storage = self.get_storage()
+
+        # All get_storage() calls of the command get the loaded storage.
+        get_storage.storage = storage
+
+        try:
+            os.chdir(cwd)
+
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    eagle(argv)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else 1
+
+            self.engine.save(storage)
+            self.state = get_files_state(self.engine)
+        except Exception:
+            stderr.write(traceback.format_exc())
+            code = 1
+
+            # Changes of the failed command are thrown away.
+            storage.ops.clear()
+            self.storage = None
+        finally:
+            del get_storage.storage
+
+        return {"stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "code": code}
+
+    def handle(self, connection):
+        """
+        Reads one request from the client and sends the response back.
+
+        :param socket connection: Client connection.
+        """
+
+        with connection, connection.makefile("rb") as f:
+            request = json.loads(f.read())
+
+            if request.get("engine", "journal") != self.engine_name:
+                response = {"fallback": True}
+            elif runs_locally(request["argv"]):
+                response = {"fallback": True}
+            else:
+                response = self.run(request["argv"], request["cwd"])
+
+            connection.sendall(json.dumps(response).encode())
+
+    def close(self):
+
+        self.engine.close()
+
+
+def serve():
+    """
+    Runs eagle daemon listening on Unix socket (see ``get_socket_file()``)
+    until it's interrupted or terminated.
+    """
+
+    filename = get_socket_file()
+
+    if os.path.exists(filename):
+        try:
+            with socket.socket(socket.AF_UNIX) as s:
+                s.connect(filename)
+        except OSError:
+            # Socket left by killed daemon.
+            os.remove(filename)
+        else:
+            err_print("Eagle daemon is already running.")
+
+            return
+
+    # Terminate the same way as interrupted.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    daemon = Daemon()
+    server = socket.socket(socket.AF_UNIX)
+
+    try:
+        server.bind(filename)
+        os.chmod(filename, 0o600)
+        server.listen()
+        print(f"Eagle daemon is listening on {filename}")
+
+        while True:
+            connection, _ = server.accept()
+
+            try:
+                daemon.handle(connection)
+            except (OSError, ValueError):
+                # Broken client - keep serving the others.
+                pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        daemon.close()
+
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
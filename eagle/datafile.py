@@ -0,0 +1,282 @@
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"EGLD"
+VERSION = 2
+
+# Compression codecs and their IDs stored in the header.
+CODECS = {"none": 0, "zlib": 1, "lzma": 2}
+CODEC_NAMES = {i: name for name, i in CODECS.items()}
+
+# Default compression levels (lzma preset).
+LEVELS = {"none": 0, "zlib": 6, "lzma": 6}
+
+# Magic, format version, codec ID, compression level and size
+# of the uncompressed payload.
+HEADER = struct.Struct("<4sHBBQ")
+
+# Storage version, generation, next task ID (-1 if not known), task
+# count, group name count, group count and byte order of the columns
+# (0 for little endian, 1 for big endian).
+PAYLOAD = struct.Struct("<qqqQQQB7x")
+
+BYTE_ORDER = 0 if "little" == sys.byteorder else 1
+
+
+def get_compression():
+    """
+    Returns compression chosen by ``EAGLE_COMPRESSION`` environment
+    variable - codec name optionally followed by compression level
+    from 0 to 9 (i.e. "zlib", "zlib:1" or "lzma:6"). Choices are:
+
+    * none (default)
+    * zlib
+    * lzma
+
+    :return: Codec name and compression level.
+    :rtype: tuple
+    """
+
+    codec, _, level = os.environ.get("EAGLE_COMPRESSION", "none").partition(":")
+
+    if codec not in CODECS:
+        return "none", 0
+
+    try:
+        level = min(max(int(level), 0), 9) if level else LEVELS[codec]
+    except ValueError:
+        level = LEVELS[codec]
+
+    return codec, level
+
+
+def compress(data, codec, level):
+
+    if "zlib" == codec:
+        import zlib
+
+        return zlib.compress(data, level)
+
+    if "lzma" == codec:
+        import lzma
+
+        return lzma.compress(data, preset=level)
+
+    return data
+
+
+def decompress(data, codec):
+
+    if "zlib" == codec:
+        import zlib
+
+        return zlib.decompress(data)
+
+    if "lzma" == codec:
+        import lzma
+
+        return lzma.decompress(data)
+
+    return data
+
+
+def encode_storage(raw):
+    """
+    Encodes raw storage into struct-packed payload - fixed size
+    header (see ``PAYLOAD``) followed by the task columns of the task
+    table (see ``eagle.table.TaskTable.to_raw()``), group names and
+    groups. Strings are packed into blobs with offsets and every
+    column is padded to 8 bytes the same way as in the columnar
+    snapshot (see ``eagle.snapshot``).
+
+    :param dict raw: Raw storage (see ``eagle.storage.serialize_structures()``).
+    :return: Payload.
+    :rtype: bytes
+    """
+
+    from .snapshot import pack_strings, pad, to_us
+
+    tasks, groups = raw["tasks"], raw["groups"]
+    next_id = raw.get("tasks_next_id")
+    name_offsets, names = pack_strings(tasks["names"])
+    group_offsets, group_titles = pack_strings(g[0] for g in groups)
+    parts = [
+        PAYLOAD.pack(
+            raw["version"],
+            raw.get("generation", 0),
+            -1 if next_id is None else next_id,
+            len(tasks["ids"]) // 8,
+            len(tasks["names"]),
+            len(groups),
+            BYTE_ORDER,
+        )
+    ]
+
+    for column in (
+        tasks["ids"],
+        tasks["created"],
+        tasks["kinds"],
+        tasks["intervals"],
+        tasks["anchors"],
+        tasks["group_ids"],
+        tasks["title_offsets"],
+        tasks["titles"],
+        name_offsets,
+        names,
+        group_offsets,
+        group_titles,
+        array("q", (to_us(g[1]) for g in groups)),
+    ):
+        parts.append(pad(bytes(column)))
+
+    return b"".join(parts)
+
+
+def decode_storage(data):
+    """
+    Decodes payload made by ``encode_storage()``. Nothing but numbers,
+    strings and datetimes is constructed and task columns are handed
+    over as they are - titles stay encoded in their blob until tasks
+    are accessed (see ``eagle.table.Titles``).
+
+    :param bytes data: Payload.
+    :return: Raw storage.
+    :rtype: dict
+    :raises ValueError: If the payload is corrupted.
+    """
+
+    from .snapshot import from_us
+
+    view = memoryview(data)
+
+    if len(view) < PAYLOAD.size:
+        raise ValueError("Storage file is corrupted.")
+
+    version, generation, next_id, count, name_count, group_count, byte_order = (
+        PAYLOAD.unpack_from(view)
+    )
+
+    if BYTE_ORDER != byte_order:
+        raise ValueError("Storage file was written on machine of other byte order.")
+
+    offset = PAYLOAD.size
+
+    def column(size):
+
+        nonlocal offset
+
+        if len(view) < offset + size:
+            raise ValueError("Storage file is corrupted.")
+
+        chunk = view[offset : offset + size]
+        offset += size + (-size % 8)
+
+        return chunk
+
+    def strings(length):
+
+        offsets = column(8 * (length + 1)).cast("Q")
+
+        return offsets, column(offsets[length])
+
+    tasks = {
+        "ids": column(8 * count),
+        "created": column(8 * count),
+        "kinds": column(count),
+        "intervals": column(4 * count),
+        "anchors": column(4 * count),
+        "group_ids": column(4 * count),
+    }
+    tasks["title_offsets"], tasks["titles"] = strings(count)
+    tasks["title_offsets"] = tasks["title_offsets"].cast("B")
+    tasks["titles"] = bytes(tasks["titles"])
+
+    # Group names and groups are few - decode them all.
+    name_offsets, names = strings(name_count)
+    tasks["names"] = [
+        str(names[name_offsets[i] : name_offsets[i + 1]], "utf-8")
+        for i in range(name_count)
+    ]
+    group_offsets, group_titles = strings(group_count)
+    group_created = array("q")
+    group_created.frombytes(column(8 * group_count))
+    groups = [
+        [
+            str(group_titles[group_offsets[i] : group_offsets[i + 1]], "utf-8"),
+            from_us(group_created[i]),
+        ]
+        for i in range(group_count)
+    ]
+
+    return {
+        "version": version,
+        "generation": generation,
+        "tasks_next_id": None if -1 == next_id else next_id,
+        "tasks": tasks,
+        "groups": groups,
+    }
+
+
+def dump(raw, f, codec="none", level=0):
+    """
+    Writes raw (serialized) storage into storage file - header
+    followed by encoded storage (see ``encode_storage()``) compressed
+    with the codec.
+
+    :param dict raw: Raw storage (see ``eagle.storage.serialize_structures()``).
+    :param file f: File opened for binary writing.
+    :param str codec: Codec name (see ``CODECS``).
+    :param int level: Compression level.
+    """
+
+    payload = encode_storage(raw)
+    f.write(HEADER.pack(MAGIC, VERSION, CODECS[codec], level, len(payload)))
+    f.write(compress(payload, codec, level))
+
+
+def load(f):
+    """
+    Reads raw storage from storage file. The format is detected
+    by the header. Files written before the header was introduced
+    are plain pickles and the first version of the format held
+    pickled storage - both are read by restricted unpickler (see
+    ``eagle.legacy``) so they can be converted.
+
+    :param file f: File opened for binary reading.
+    :return: Raw storage and codec name (None for pickled storage).
+    :rtype: tuple
+    :raises ValueError: If the file was written by newer version
+        or it's corrupted.
+    """
+
+    header = f.read(HEADER.size)
+
+    if not header.startswith(MAGIC):
+        from .legacy import load
+
+        f.seek(0)
+
+        return load(f), None
+
+    if HEADER.size != len(header):
+        raise ValueError("Storage file is corrupted.")
+
+    magic, version, codec_id, level, size = HEADER.unpack(header)
+
+    if VERSION < version or codec_id not in CODEC_NAMES:
+        raise ValueError("Storage file was written by newer version of eagle.")
+
+    codec = CODEC_NAMES[codec_id]
+    payload = decompress(f.read(), codec)
+
+    if size != len(payload):
+        raise ValueError("Storage file is corrupted.")
+
+    if 1 == version:
+        from .legacy import loads
+
+        return loads(payload), None
+
+    return decode_storage(payload), codec
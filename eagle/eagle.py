@@ -1,11 +1,9 @@
-import argparse
 import sys
-from datetime import datetime
 
-from .groups import add_group, delete_group, soft_delete_group
 from .meta import CONFIG
-from .storage import get_storage
-from .tasks import add_task, delete_task, edit_task, prune
+from .storage import TODAY, get_lists, get_storage, is_list_name, read_tasks, use_list
+from .render import FORMATS, render_agenda, render_tasks, render_view
+from .tools import err_print
 
 
 def clear():
@@ -20,14 +18,17 @@ def clear():
     print("\nYour list has been cleared out.\n")
 
 
-def parse_arguments():
+def parse_arguments(argv=None):
     """
     Parses CLI arguments and returns Namespace object.
 
+    :param list argv: Arguments (``sys.argv`` by default).
     :return: Namespace object with parsed params.
     :rtype: Namespace
     """
 
+    import argparse
+
     parser = argparse.ArgumentParser(
         prog=CONFIG["package_name"], description=CONFIG["description"]
     )
@@ -56,6 +57,20 @@ def parse_arguments():
     h = "Removes all overdue tasks."
     parser.add_argument("--prune", action="store_true", help=h)
 
+    # --import
+    h = (
+        "Imports tasks from JSON Lines or CSV (.csv) file. "
+        'Records have "title", "frequency", "group" and "created" fields. '
+        'Use "-" for stdin.'
+    )
+    meta = "FILE"
+    parser.add_argument("--import", dest="import_file", metavar=meta, help=h)
+
+    # --export
+    h = 'Exports all tasks into JSON Lines or CSV (.csv) file. Use "-" for stdout.'
+    meta = "FILE"
+    parser.add_argument("--export", dest="export_file", metavar=meta, help=h)
+
     # 2. Group
     # -A, --add-group
     h = "Creates a group which can be used for managing tasks."
@@ -105,400 +120,334 @@ def parse_arguments():
     meta = "QUERY"
     parser.add_argument("--search", nargs=1, action="append", metavar=meta, help=h)
 
+    # --match
+    h = 'Searched tasks have to match "any" (default) or "all" the queries.'
+    parser.add_argument("--match", choices=["any", "all"], default="any", help=h)
+
     # --others
     h = "Filters others tasks."
     parser.add_argument("--others", action="store_true", help=h)
 
+    # --combine
+    h = (
+        "Listed tasks have to match any (default) or all the filters "
+        "- groups, search and date filters (--today, --overdue, ..)."
+    )
+    parser.add_argument("--combine", choices=["any", "all"], default="any", help=h)
+
+    # --agenda
+    h = (
+        "Lists all occurrences of tasks between two dates day by day. "
+        'Dates can be given the same way as for tasks: --agenda today +30 or --agenda @1/1 @31/1.'
+    )
+    meta = ("FROM", "TO")
+    parser.add_argument("--agenda", nargs=2, metavar=meta, help=h)
+
     # --sort
     h = 'Sort tasks by the given flag. Possible options are: "groups".'
     parser.add_argument("--sort", choices=["groups"], help=h)
 
+    # --format
+    h = (
+        'Output format. Possible options are: "text" (default), "json" and "ndjson" '
+        "(one JSON record per line)."
+    )
+    parser.add_argument("--format", choices=FORMATS, default="text", help=h)
+
+    # --limit
+    h = "Lists at most N tasks in every section (overdue, today, ..)."
+    parser.add_argument("--limit", type=int, metavar="N", help=h)
+
+    # 4. Lists
+    # --list
+    h = (
+        "Works with the named list instead of the default one. "
+        "Given more times lists (and filters) tasks of all the lists."
+    )
+    meta = "NAME"
+    parser.add_argument("--list", action="append", metavar=meta, help=h)
+
+    # --all-lists
+    h = "Lists (and filters) tasks of all the lists."
+    parser.add_argument("--all-lists", action="store_true", help=h)
+
+    # --profile
+    h = (
+        "Profiles the command with cProfile and saves the stats into FILE "
+        '(see "python -m pstats FILE"). Prints time of every phase to stderr.'
+    )
+    parser.add_argument("--profile", metavar="FILE", help=h)
+
     # --version
     # parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
     h = "Shows version and other useful informations."
     parser.add_argument("--version", action="store_true", help=h)
 
-    return parser.parse_args()
+    # --serve
+    h = (
+        "Runs eagle daemon which keeps your list in memory and answers "
+        "other eagle commands over a socket."
+    )
+    parser.add_argument("--serve", action="store_true", help=h)
+
+    return parser.parse_args(argv)
 
 
-def print_list(tasks, sort_by=None, all_tasks=False):
+def print_list(
+    tasks, sort_by=None, all_tasks=False, limit=None, fmt="text", buckets=None
+):
     """
     Prints overdue, today upcoming and other tasks.
 
-    :param list tasks: List of already filtered tasks - enumerated.
+    :param list tasks: List of already filtered tasks - (ID, task) pairs.
     :param str sort_by: Sort the task by given flag - choices: "groups"
+    :param bool all_tasks: Print all tasks instead of the given ones.
+    :param int limit: Print at most this many tasks per section.
+    :param str fmt: Output format - choices: "text", "json", "ndjson"
+    :param set buckets: Print only tasks of these buckets (all tasks only).
     """
 
-    def get_printable_freq(freq):
-        """
-        Formats task frequency.
-
-        :param datetime or str frequency: Frequency to be formatted.
-        :return: Formatted frequency string.
-        :rtype: str
-        """
-
-        # Display the frequency properly.
-        if isinstance(freq, datetime):
-            return freq.strftime("%d/%m/%Y")
-        else:
-            return freq
+    if all_tasks:
+        render_view(read_tasks(), limit, sort_by, fmt, buckets=buckets)
+    else:
+        render_tasks(list(tasks), limit, sort_by, fmt)
 
-    def print_task(number, task, freq=False):
-        """
-        Prints formatted task.
 
-        :param int number: Order number of the task.
-        :param Task task: Task object.
-        :param str freq: Formatted task frequency.
-        """
+def print_agenda(date_range, fmt="text"):
+    """
+    Prints all occurrences of tasks in the given date range
+    grouped by day.
 
-        group = ""
+    :param list date_range: Range boundaries (FROM, TO) - both
+        as frequency strings (i.e. "today", "+7", "@1/12/2030").
+    :param str fmt: Output format - choices: "text", "json", "ndjson"
+    """
 
-        # Format task group.
-        if task.group:
-            group = f" [{task.group}]"
+    from .tasks import parse_frequency
 
-        if freq:
-            print(f"\t{number + 1}. {task.title} ({freq}){group}")
-        else:
-            print(f"\t{number + 1}. {task.title}{group}")
+    bounds = [parse_frequency(d) for d in date_range]
 
-    def print_overdue_tasks(tasks):
-        """
-        Prints overdue tasks in numbered list.
-        The item number is +1 of index from storage index.
+    if not all(b and b.is_date() for b in bounds):
+        err_print("Agenda range has to be given as dates (i.e. today +7).")
 
-        :param dict tasks: Task dict where key is task index and val Task instance.
-        """
+        return
 
-        print("\nOverdue:")
+    start, end = (b.date() for b in bounds)
 
-        for i, t in tasks:
+    from .recurrence import iter_agenda
 
-            freq = get_printable_freq(t.frequency)
-            print_task(i, t, freq)
+    # Load tasks dated in the range and recurring tasks.
+    with get_storage() as s:
+        tasks = s.select(date_from=start, date_to=end, recurring=True)
 
-    def print_today_tasks(tasks):
-        """
-        Prints today tasks in numbered list.
-        The item number is +1 of index from storage index.
+    render_agenda(iter_agenda(tasks, start, end), fmt)
 
-        :param dict tasks: Task dict where key is task index and val Task instance.
-        """
 
-        print("\nToday:")
+def print_lists(args, query):
+    """
+    Prints tasks of more lists at once (see ``eagle.lists``). Only
+    listing and filters are supported - changes have to be made
+    list by list.
 
-        for i, t in tasks:
+    :param Namespace args: Parsed arguments.
+    :param Query query: Filters.
+    """
 
-            freq = get_printable_freq(t.frequency)
-            print_task(i, t, freq)
+    names = get_lists() if args.all_lists else list(dict.fromkeys(args.list))
+    changes = (
+        args.add,
+        args.edit,
+        args.delete,
+        args.clear,
+        args.prune,
+        args.import_file,
+        args.export_file,
+        args.add_group,
+        args.delete_group,
+        args.soft_delete_group,
+        args.agenda,
+        args.serve,
+    )
 
-    def print_upcoming_tasks(tasks):
-        """
-        Prints upcoming tasks in numbered list.
-        The item number is +1 of index from storage index.
+    if any(changes):
+        err_print("Only listing and filters work with more lists at once.")
 
-        :param dict tasks: Task dict where key is task index and val Task instance.
-        """
+        return
 
-        print("\nUpcoming:")
+    from .lists import query_lists
 
-        for i, t in tasks:
+    print_list(query_lists(names, query), args.sort, False, args.limit, args.format)
 
-            freq = get_printable_freq(t.frequency)
-            print_task(i, t, freq)
 
-    def print_other_tasks(tasks):
-        """
-        Prints other (besides today) tasks in numbered list.
-        The item number is +1 of index from storage index.
+def eagle(argv=None):
+    """
+    Main app function. Spins up the wheel
+    and delivers the output.
 
-        :param dict tasks: Task dict where key is task index and val Task instance.
-        """
+    :param list argv: Arguments (``sys.argv`` by default).
+    """
 
-        print("\nYour list:")
+    if argv is None:
+        argv = sys.argv[1:]
 
-        for i, t in tasks:
+    # Fast path - plain listing and today's tasks don't need
+    # the argument parser nor any of the commands.
+    if not argv or ["--today"] == argv:
+        print_list((), all_tasks=True, buckets={TODAY} if argv else None)
 
-            if t.frequency:
-                freq = get_printable_freq(t.frequency)
-                print_task(i, t, freq)
-            else:
-                print_task(i, t)
+        return
 
-        print("")
+    to_print = False
+    # groups = None
+    tasks = []
+    all_tasks = False
 
-    def sort_tasks(tasks, flag):
-        """
-        Sorts tasks by the given flag.
-        Choices are:
-            * groups
+    args = parse_arguments(argv)
+    # print(args)
 
-        :param list tasks: List of tasks.
-        :param str sort_by: The sort flag.
-        """
+    for name in args.list or ():
+        if not is_list_name(name):
+            err_print(f'Invalid list name "{name}".')
 
-        if "groups" == flag:
-            return sorted(tasks, key=lambda t: t[1].group if t[1].group else "")
+            return
 
-    # Load tasks.
-    if all_tasks:
-        with get_storage() as s:
-            tasks = enumerate(s["tasks"])
-
-    overdue_tasks = []
-    today_tasks = []
-    other_tasks = []
-    upcoming_tasks = []
-    # tasks = zip(range(0, len(tasks)), tasks)
-
-    # Gather tasks.
-    for i, t in tasks:
-
-        if t.is_overdue():
-            overdue_tasks.append((i, t))
-        elif t.is_today_task():
-            today_tasks.append((i, t))
-        elif t.is_upcoming():
-            upcoming_tasks.append((i, t))
-        else:
-            other_tasks.append((i, t))
-
-    # Sort tasks.
-    if sort_by:
-        if overdue_tasks:
-            overdue_tasks = sort_tasks(overdue_tasks, sort_by)
-        if today_tasks:
-            today_tasks = sort_tasks(today_tasks, sort_by)
-        if other_tasks:
-            other_tasks = sort_tasks(other_tasks, sort_by)
-
-    if overdue_tasks:
-        print_overdue_tasks(overdue_tasks)
-
-    if today_tasks:
-        print_today_tasks(today_tasks)
-
-    if upcoming_tasks:
-        print_upcoming_tasks(upcoming_tasks)
-
-    if other_tasks:
-        print_other_tasks(other_tasks)
-
-
-def filter_tasks_by_groups(tasks=None, groups=None):
-    """
-    Filters tasks by the given groups.
+    # Profile the command.
+    if args.profile:
+        from .profiling import start_profile
 
-    :param list tasks: List of already filtered tasks.
-    :param list groups: List of existing groups.
-    :return: Narrowed list of tasks.
-    :rtype: list
-    """
+        start_profile(args.profile)
 
-    # Load tasks.
-    if not tasks:
-        with get_storage() as s:
-            tasks = s["tasks"]
+    # Filters.
+    from .query import Query
 
-    # Flatten group list.
-    if groups:
-        groups = [g for g_list in groups for g in g_list]
-        tasks = list(filter(lambda t: t[1].group in groups, enumerate(tasks)))
+    query = Query(
+        [g for g_list in args.group for g in g_list] if args.group else None,
+        [q for q_list in args.search for q in q_list] if args.search else None,
+        [f for f in ("today", "overdue", "upcoming", "others") if getattr(args, f)],
+        "all" == args.match,
+        "all" == args.combine,
+    )
 
-    return tasks
+    # More lists at once.
+    if args.all_lists or (args.list and 1 < len(set(args.list))):
+        print_lists(args, query)
 
+        return
 
-def filter_today_tasks():
-    """
-    Filters today's tasks.
+    # Named list.
+    if args.list:
+        use_list(args.list[0])
 
-    :return: Narrowed list of tasks - enumerated.
-    :rtype: list
-    """
+    # Nothing but the list (or profiling) - all tasks are listed
+    # (as without arguments).
+    options = ("list", "match", "combine", "format", "profile")
 
-    # Load tasks.
-    with get_storage() as s:
-        tasks = s["tasks"]
+    if not any(v for k, v in vars(args).items() if k not in options):
+        to_print = all_tasks = True
 
-    return list(filter(lambda t: t[1].is_today_task(), enumerate(tasks)))
+    # Run daemon.
+    if args.serve:
+        if args.list:
+            err_print("The daemon serves the default list only.")
 
+            return
 
-def filter_overdue_tasks():
-    """
-    Filters overdue tasks.
+        from .daemon import serve
 
-    :return: Narrowed list of tasks - enumerated.
-    :rtype: list
-    """
+        serve()
 
-    # Load tasks.
-    with get_storage() as s:
-        tasks = s["tasks"]
+        return
 
-    return list(filter(lambda t: t[1].is_overdue(), enumerate(tasks)))
+    # Add task.
+    if args.add:
+        from .tasks import add_task
 
+        add_task(args.add)
+        to_print = True
 
-def filter_other_tasks():
-    """
-    Filters other tasks.
+    # Edit task.
+    if args.edit:
+        from .tasks import edit_task
 
-    :return: Narrowed list of tasks.
-    :rtype: list
-    """
+        edit_task(args.edit)
+        to_print = True
 
-    # Load tasks.
-    with get_storage() as s:
-        tasks = enumerate(s["tasks"])
+    # Delete task.
+    if args.delete:
+        from .tasks import delete_task
 
-    return list(
-        filter(lambda t: not t[1].is_today_task() and not t[1].is_overdue(), tasks)
-    )
+        delete_task(args.delete)
+        to_print = True
 
+    # Clear tasks.
+    if args.clear:
+        clear()
 
-def search_tasks(queries):
-    """
-    Search tasks.
+    if args.prune:
+        from .tasks import prune
 
-    :param str queries: Query string to be searched in tasks.
-    :return: Narrowed list of tasks.
-    :rtype: list
-    """
+        prune()
 
-    filtered_tasks = []
-    queries = [q for q_list in queries for q in q_list]
+    # Import tasks.
+    if args.import_file:
+        from .transfer import import_tasks
 
-    # Load tasks.
-    with get_storage() as s:
-        tasks = s["tasks"]
+        import_tasks(args.import_file)
 
-    for query in queries:
-        filtered_tasks.extend(
-            list(
-                filter(lambda t: query.lower() in t[1].title.lower(), enumerate(tasks))
-            )
-        )
+    # Export tasks.
+    if args.export_file:
+        from .transfer import export_tasks
 
-    return filtered_tasks
+        export_tasks(args.export_file)
 
+    # Add group.
+    if args.add_group:
+        from .groups import add_group
 
-def filter_upcoming_tasks():
-    """
-    Filters upcoming tasks.
+        add_group(args.add_group)
+        to_print = True
 
-    :return: Narrowed list of tasks.
-    :rtype: list
-    """
+    # Delete group.
+    if args.delete_group:
+        from .groups import delete_group
 
-    # Load tasks.
-    with get_storage() as s:
-        tasks = s["tasks"]
+        delete_group(args.delete_group)
+        to_print = True
 
-    return list(filter(lambda t: t[1].is_upcoming(), enumerate(tasks)))
+    # Soft delete group.
+    if args.soft_delete_group:
+        from .groups import soft_delete_group
 
+        soft_delete_group(args.soft_delete_group)
+        to_print = True
 
-def eagle():
-    """
-    Main app function. Spins up the wheel
-    and delivers the output.
-    """
+    # Filter tasks.
+    if query:
+        to_print = True
+        tasks = query.run()
 
-    to_print = False
-    # groups = None
-    tasks = []
-    args = None
-    all_tasks = False
+    # Agenda.
+    if args.agenda:
+        print_agenda(args.agenda, args.format)
 
-    if 1 < len(sys.argv):
-
-        args = parse_arguments()
-        # print(args)
-
-        # Add task.
-        if args.add:
-            add_task(args.add)
-            to_print = True
-
-        # Edit task.
-        if args.edit:
-            edit_task(args.edit)
-            to_print = True
-
-        # Delete task.
-        if args.delete:
-            delete_task(args.delete)
-            to_print = True
-
-        # Clear tasks.
-        if args.clear:
-            clear()
-
-        if args.prune:
-            prune()
-
-        # Add group.
-        if args.add_group:
-            add_group(args.add_group)
-            to_print = True
-
-        # Delete group.
-        if args.delete_group:
-            delete_group(args.delete_group)
-            to_print = True
-
-        # Soft delete group.
-        if args.soft_delete_group:
-            soft_delete_group(args.soft_delete_group)
-            to_print = True
-
-        # Filter by group.
-        if args.group:
-            to_print = True
-            tasks.extend(filter_tasks_by_groups(tasks, args.group))
-
-        # Filter today's tasks.
-        if args.today:
-            to_print = True
-            tasks.extend(filter_today_tasks())
-
-        # Filter overdue tasks.
-        if args.overdue:
-            to_print = True
-            tasks.extend(filter_overdue_tasks())
-
-        # Filter upcoming tasks.
-        if args.upcoming:
-            to_print = True
-            tasks.extend(filter_upcoming_tasks())
-
-        # Search tasks.
-        if args.search:
-            to_print = True
-            tasks.extend(search_tasks(args.search))
-
-        # Filter other tasks.
-        if args.others:
-            to_print = True
-            tasks.extend(filter_other_tasks())
-
-        # Sort.
-        if args.sort:
-            to_print = True
-
-        # Version.
-        if args.version:
-            print(
-                (
-                    f"{CONFIG['package_name']} {CONFIG['version']}\n"
-                    f"Author: {CONFIG['author']}\n"
-                    f"Homepage: {CONFIG['homepage']}"
-                )
-            )
+    # Sort.
+    if args.sort:
+        to_print = True
 
-    else:
+    # Limit and format - without filters all tasks are listed.
+    if args.limit is not None or ("text" != args.format and not args.agenda):
         to_print = True
-        all_tasks = True
+        all_tasks = not query
+
+    # Version.
+    if args.version:
+        print(
+            (
+                f"{CONFIG['package_name']} {CONFIG['version']}\n"
+                f"Author: {CONFIG['author']}\n"
+                f"Homepage: {CONFIG['homepage']}"
+            )
+        )
 
     if to_print:
-        print_list(tasks, args.sort if args else None, all_tasks)
+        print_list(tasks, args.sort, all_tasks, args.limit, args.format)
@@ -0,0 +1,203 @@
+import struct
+
+from .snapshot import from_us, to_us
+
+# Operations (see ``eagle.journal``) and structures they change.
+# Both are stored as their index.
+OPS = ("append", "insert", "pop", "set", "clear", "reset")
+STRUCTURES = ("tasks", "groups")
+
+OP_CODES = {name: i for i, name in enumerate(OPS)}
+STRUCTURE_CODES = {name: i for i, name in enumerate(STRUCTURES)}
+
+# Operation, structure, number of items carried by the operation
+# and key (task ID or list index, 0 if not used).
+OP = struct.Struct("<BBxxIq")
+
+# Creation time in microseconds, frequency interval and anchor,
+# frequency kind (0 for none), size of the title and size of the group
+# name (-1 for none). The title and the group name follow.
+TASK = struct.Struct("<qiiB3xIi")
+
+# Creation time in microseconds and size of the title which follows.
+GROUP = struct.Struct("<qI")
+
+
+def encode_task(item, out):
+    """
+    Appends serialized task (see ``eagle.storage.serialize_item()``)
+    to the buffer.
+
+    :param list item: Serialized task.
+    :param bytearray out: Buffer.
+    """
+
+    title, frequency, group, created = item
+    title = title.encode()
+    group = group.encode() if group is not None else None
+    kind, interval, anchor = frequency if frequency is not None else ("\0", 0, 0)
+
+    out += TASK.pack(
+        to_us(created),
+        interval,
+        anchor,
+        ord(kind),
+        len(title),
+        len(group) if group is not None else -1,
+    )
+    out += title
+
+    if group is not None:
+        out += group
+
+
+def decode_task(data, pos):
+    """
+    Decodes serialized task (see ``encode_task()``).
+
+    :param bytes data: Encoded data.
+    :param int pos: Position of the task.
+    :return: Serialized task and position right after it.
+    :rtype: tuple
+    """
+
+    created, interval, anchor, kind, title_size, group_size = TASK.unpack_from(
+        data, pos
+    )
+    pos += TASK.size
+    title = str(data[pos : pos + title_size], "utf-8")
+    pos += title_size
+
+    if -1 == group_size:
+        group = None
+    else:
+        group = str(data[pos : pos + group_size], "utf-8")
+        pos += group_size
+
+    frequency = (chr(kind), interval, anchor) if kind else None
+
+    return [title, frequency, group, from_us(created)], pos
+
+
+def encode_group(item, out):
+    """
+    Appends serialized group to the buffer.
+
+    :param list item: Serialized group.
+    :param bytearray out: Buffer.
+    """
+
+    title, created = item
+    title = title.encode()
+    out += GROUP.pack(to_us(created), len(title))
+    out += title
+
+
+def decode_group(data, pos):
+    """
+    Decodes serialized group (see ``encode_group()``).
+
+    :param bytes data: Encoded data.
+    :param int pos: Position of the group.
+    :return: Serialized group and position right after it.
+    :rtype: tuple
+    """
+
+    created, title_size = GROUP.unpack_from(data, pos)
+    pos += GROUP.size
+
+    title = str(data[pos : pos + title_size], "utf-8")
+    pos += title_size
+
+    return [title, from_us(created)], pos
+
+
+ENCODERS = (encode_task, encode_group)
+DECODERS = (decode_task, decode_group)
+
+
+def encode_ops(ops):
+    """
+    Encodes serialized operations (see ``eagle.storage.serialize_op()``).
+    Every operation is a fixed size header (see ``OP``) followed by
+    its items.
+
+    :param list ops: Serialized operations.
+    :return: Encoded operations.
+    :rtype: bytes
+    :raises ValueError: If there is unknown operation or structure.
+    """
+
+    out = bytearray()
+
+    for op in ops:
+        name, structure = op[0], op[1]
+
+        if name not in OP_CODES or structure not in STRUCTURE_CODES:
+            raise ValueError(f"Cannot encode operation {name} of {structure}.")
+
+        if "append" == name:
+            key, items = 0, (op[2],)
+        elif "insert" == name or "set" == name:
+            key, items = op[2], (op[3],)
+        elif "pop" == name:
+            key, items = op[2], ()
+        elif "reset" == name:
+            key, items = 0, op[2]
+        else:
+            key, items = 0, ()
+
+        code = STRUCTURE_CODES[structure]
+        out += OP.pack(OP_CODES[name], code, len(items), key)
+        encode = ENCODERS[code]
+
+        for item in items:
+            encode(item, out)
+
+    return bytes(out)
+
+
+def decode_ops(data):
+    """
+    Decodes operations encoded by ``encode_ops()``. Nothing but
+    strings, numbers and datetimes is constructed - no matter what
+    the data contain.
+
+    :param bytes data: Encoded operations.
+    :return: Serialized operations.
+    :rtype: list
+    :raises ValueError: If the data are corrupted.
+    """
+
+    ops = []
+    pos = 0
+
+    try:
+        while pos < len(data):
+            code, structure_code, count, key = OP.unpack_from(data, pos)
+            pos += OP.size
+            name, structure = OPS[code], STRUCTURES[structure_code]
+            decode = DECODERS[structure_code]
+            items = []
+
+            for _ in range(count):
+                item, pos = decode(data, pos)
+                items.append(item)
+
+            if "append" == name:
+                ops.append((name, structure, items[0]))
+            elif "insert" == name or "set" == name:
+                ops.append((name, structure, key, items[0]))
+            elif "pop" == name:
+                ops.append((name, structure, key))
+            elif "reset" == name:
+                ops.append((name, structure, items))
+            else:
+                ops.append((name, structure))
+    except (IndexError, struct.error, UnicodeDecodeError, OverflowError) as e:
+        raise ValueError("Journal record is corrupted.") from e
+
+    if len(data) != pos:
+        raise ValueError("Journal record is corrupted.")
+
+    return ops
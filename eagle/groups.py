@@ -16,7 +16,7 @@ def add_group(groups):
 
     with get_storage() as s:
         for g in groups:
-            if not group_exist(g):
+            if s.group(g) is None:
                 s["groups"].append(Group(g, datetime.now()))
             else:
                 err_print(f'Group "{g}" already exists.')
@@ -34,19 +34,13 @@ def delete_group(groups):
 
     with get_storage() as s:
 
-        # Delete in reverse order so no item are skipped
-        # once pop() method is called on the storage.
-        for i, t in sorted(enumerate(s["tasks"]), reverse=True):
+        # Find the tasks in group index.
+        to_delete = {i for g in set(groups) for i in s.group_tasks(g)}
 
-            # Compare by group name.
-            if t.group in groups:
-                s["tasks"].pop(i)
+        for i in sorted(to_delete):
+            del s["tasks"][i]
 
-        for i, g in enumerate(s["groups"]):
-
-            # Compare by group name.
-            if g.title in groups:
-                s["groups"].pop(i)
+        delete_groups(s, groups)
 
 
 def soft_delete_group(groups):
@@ -65,23 +59,39 @@ def soft_delete_group(groups):
         :param str group: Group title.
         """
 
-        for i, t in enumerate(storage["tasks"]):
-            if group == t.group:
+        for i in storage.group_tasks(group):
+            t = storage["tasks"][i]
 
-                # Cannot modify existing task so let's create a new
-                # one without group.
-                storage["tasks"][i] = Task(t.title, t.frequency, None, t.created)
+            # Cannot modify existing task so let's create a new
+            # one without group.
+            storage["tasks"][i] = Task(t.title, t.frequency, None, t.created)
 
     # Flatten group list.
     groups = [g for g_list in groups for g in g_list]
 
     with get_storage() as s:
-        for i, g in enumerate(s["groups"]):
+        for g in groups:
+            if s.group(g) is not None:
+                ungroup_tasks(s, g)
+
+        delete_groups(s, groups)
+
+
+def delete_groups(storage, groups):
+    """
+    Removes given groups from storage.
+
+    :param dict storage: Storage object (dictionary).
+    :param list groups: List of group titles.
+    """
+
+    # Delete in reverse order so no item are skipped
+    # once pop() method is called on the storage.
+    for i in range(len(storage["groups"]) - 1, -1, -1):
 
-            # Compare by group name.
-            if g.title in groups:
-                ungroup_tasks(s, g.title)
-                s["groups"].pop(i)
+        # Compare by group name.
+        if storage["groups"][i].title in groups:
+            storage["groups"].pop(i)
 
 
 def group_exist(title):
@@ -94,6 +104,4 @@ def group_exist(title):
     """
 
     with get_storage() as s:
-        for i, g in enumerate(s["groups"]):
-            if title == g.title:
-                return True
+        return s.group(title) is not None
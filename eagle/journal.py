@@ -0,0 +1,508 @@
+import os
+import struct
+
+# Magic and version at the start of the journal file.
+MAGIC = b"EGLJ\x01\x00\x00\x00"
+
+# Size and CRC32 of the encoded operations and generation
+# of the storage snapshot.
+RECORD = struct.Struct("<IIq")
+
+
+class JournaledList(list):
+    """
+    List which records every mutation as an operation into shared
+    operation log. The storage persists these operations instead
+    of the whole list.
+
+    Operations are tuples where the first item is operation name
+    and the second one is the name of the list:
+
+    * ("append", name, item)
+    * ("insert", name, index, item)
+    * ("pop", name, index)
+    * ("set", name, index, item)
+    * ("clear", name)
+    * ("reset", name, items) - whole list content, used for operations
+      which cannot be expressed by the ones above (sort, slices, ...).
+    """
+
+    def __init__(self, name, iterable=(), ops=None, listener=None):
+
+        super().__init__(iterable)
+        self.name = name
+        self.ops = ops if ops is not None else []
+
+        # Called with every recorded operation.
+        self.listener = listener
+
+    def _record(self, op):
+
+        self.ops.append(op)
+
+        if self.listener:
+            self.listener(op)
+
+    def _index(self, index):
+        """
+        Normalizes negative index to positive one.
+
+        :param int index: List index.
+        :return: Positive index.
+        :rtype: int
+        """
+
+        if index < 0:
+            index += len(self)
+
+        return index
+
+    def _reset(self):
+
+        self._record(("reset", self.name, list(self)))
+
+    def append(self, item):
+
+        super().append(item)
+        self._record(("append", self.name, item))
+
+    def extend(self, items):
+
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items):
+
+        self.extend(items)
+
+        return self
+
+    def insert(self, index, item):
+
+        # Clamp the index the same way list.insert() does.
+        index = min(max(self._index(index), 0), len(self))
+        super().insert(index, item)
+        self._record(("insert", self.name, index, item))
+
+    def pop(self, index=-1):
+
+        item = super().pop(index)
+        self._record(("pop", self.name, self._index(index) + (index < 0)))
+
+        return item
+
+    def remove(self, item):
+
+        self.pop(self.index(item))
+
+    def clear(self):
+
+        super().clear()
+        self._record(("clear", self.name))
+
+    def __setitem__(self, index, item):
+
+        super().__setitem__(index, item)
+
+        if isinstance(index, slice):
+            self._reset()
+        else:
+            self._record(("set", self.name, self._index(index), item))
+
+    def __delitem__(self, index):
+
+        super().__delitem__(index)
+
+        if isinstance(index, slice):
+            self._reset()
+        else:
+            self._record(("pop", self.name, self._index(index) + (index < 0)))
+
+    def __imul__(self, n):
+
+        super().__imul__(n)
+        self._reset()
+
+        return self
+
+    def sort(self, *args, **kwargs):
+
+        super().sort(*args, **kwargs)
+        self._reset()
+
+    def reverse(self):
+
+        super().reverse()
+        self._reset()
+
+
+class JournaledMapping:
+    """
+    Mapping of items keyed by stable integer ID which records every
+    mutation as an operation into shared operation log
+    (see ``JournaledList``):
+
+    * ("set", name, key, item)
+    * ("pop", name, key)
+    * ("clear", name)
+
+    IDs of new items are assigned by ``add()`` and are never reused
+    (unless the mapping is cleared).
+
+    Mixed into the actual mapping class - ``dict``
+    (see ``JournaledDict``) or a compact one (see ``eagle.table``).
+    """
+
+    def __init__(self, name, items=(), ops=None, listener=None, next_id=None):
+
+        super().__init__(items)
+        self.name = name
+        self.ops = ops if ops is not None else []
+        self.listener = listener
+        self.next_id = max(next_id or 1, self.last_key() + 1)
+
+        # Next ID at the time the dict was loaded - IDs from this one
+        # up were assigned by this process.
+        self.base_next_id = self.next_id
+
+    def _record(self, op):
+
+        self.ops.append(op)
+
+        if self.listener:
+            self.listener(op)
+
+    def last_key(self):
+        """
+        Returns the highest key (0 if empty).
+
+        :return: Key.
+        :rtype: int
+        """
+
+        return max(self, default=0)
+
+    def add(self, item):
+        """
+        Adds item under a new ID.
+
+        :param item: Item to be added.
+        :return: ID of the item.
+        :rtype: int
+        """
+
+        key = self.next_id
+        self[key] = item
+
+        return key
+
+    def __setitem__(self, key, item):
+
+        super().__setitem__(key, item)
+        self.next_id = max(self.next_id, key + 1)
+        self._record(("set", self.name, key, item))
+
+    def __delitem__(self, key):
+
+        super().__delitem__(key)
+        self._record(("pop", self.name, key))
+
+    def pop(self, key, *default):
+
+        if key not in self:
+            return super().pop(key, *default)
+
+        item = super().pop(key)
+        self._record(("pop", self.name, key))
+
+        return item
+
+    def popitem(self):
+
+        key, item = super().popitem()
+        self._record(("pop", self.name, key))
+
+        return key, item
+
+    def setdefault(self, key, default=None):
+
+        if key not in self:
+            self[key] = default
+
+        return self[key]
+
+    def update(self, *args, **kwargs):
+
+        for key, item in dict(*args, **kwargs).items():
+            self[key] = item
+
+    def clear(self):
+
+        super().clear()
+        self.next_id = 1
+        self._record(("clear", self.name))
+
+
+class JournaledDict(JournaledMapping, dict):
+    """
+    Dict which records every mutation (see ``JournaledMapping``).
+    """
+
+
+def rebase_ops(ops, name, base_next_id, next_id):
+    """
+    Moves IDs assigned by ``JournaledDict.add()`` to other IDs. Used
+    when another process assigned the same IDs in the meantime.
+
+    :param list ops: Operations (see ``JournaledDict``).
+    :param str name: Name of the dict which IDs are moved.
+    :param int base_next_id: IDs from this one up are moved.
+    :param int next_id: First free ID the IDs are moved to.
+    :return: Operations with moved IDs.
+    :rtype: list
+    """
+
+    ids = {}
+    result = []
+
+    for op in ops:
+        if name == op[1] and op[0] in ("set", "pop") and base_next_id <= op[2]:
+            if op[2] not in ids:
+                ids[op[2]] = next_id + len(ids)
+
+            op = op[:2] + (ids[op[2]],) + op[3:]
+
+        result.append(op)
+
+    return result
+
+
+def apply_op(storage, op):
+    """
+    Applies one journal operation on raw (serialized) storage.
+    Items of dicts (or task tables - see ``eagle.table``) are keyed
+    by ID and the storage keeps the next free ID as "<name>_next_id"
+    (i.e. "tasks_next_id").
+
+    :param dict storage: Raw storage dict with lists and dicts.
+    :param tuple op: Operation - see ``JournaledList``
+        and ``JournaledDict``.
+    """
+
+    name, target = op[0], storage.setdefault(op[1], [])
+    keyed = not isinstance(target, list)
+
+    if keyed:
+        next_id = f"{op[1]}_next_id"
+
+        if "set" == name:
+            storage[next_id] = max(storage.get(next_id, 1), op[2] + 1)
+        elif "clear" == name:
+            storage[next_id] = 1
+
+    if "append" == name:
+        target.append(op[2])
+    elif "insert" == name:
+        target.insert(op[2], op[3])
+    elif "pop" == name:
+        # Journal may be replayed twice over the same dict items
+        # (see ``Journal``) - popping missing item is fine.
+        target.pop(op[2], None) if keyed else target.pop(op[2])
+    elif "set" == name:
+        target[op[2]] = op[3]
+    elif "clear" == name:
+        target.clear()
+    elif "reset" == name:
+        target[:] = op[2]
+
+
+class Journal:
+    """
+    Append-only file of storage operations. Each commit appends
+    one record (list of operations) so a mutation costs only
+    the bytes of the operations itself.
+
+    Records are tagged with generation of the storage snapshot they
+    were written on top of. Records of other generations are left
+    by compaction which didn't finish (the snapshot was replaced
+    but the journal wasn't removed) and are skipped on replay.
+    """
+
+    def __init__(self, filename):
+
+        self.filename = filename
+
+        # Size of the journal which contains only complete records
+        # (known once the journal was replayed).
+        self.valid_size = None
+
+        # Whether the journal was written by older version (pickled).
+        # Such journal is compacted instead of appended to.
+        self.legacy = False
+
+    def size(self):
+        """
+        Returns current size of the journal file.
+
+        :return: Size in bytes.
+        :rtype: int
+        """
+
+        try:
+            return os.stat(self.filename).st_size
+        except FileNotFoundError:
+            return 0
+
+    def records(self):
+        """
+        Yields journaled records one by one. Incomplete record at the end
+        of the journal (interrupted write) is ignored.
+
+        Every record is a header (see ``RECORD``) followed by operations
+        encoded by ``eagle.encoding``. Journals written by older versions
+        are pickled - they are read by restricted unpickler (see
+        ``eagle.legacy``) and ``legacy`` is set so the storage gets
+        compacted.
+
+        :return: Generator of (generation, list of serialized operations)
+            pairs. Generation is None for records written before
+            generations were introduced.
+        :rtype: generator
+        """
+
+        self.valid_size = 0
+        self.legacy = False
+
+        try:
+            f = open(self.filename, "rb")
+        except FileNotFoundError:
+            return
+
+        with f:
+            if MAGIC != f.read(len(MAGIC)):
+                f.seek(0)
+                yield from self.legacy_records(f)
+
+                return
+
+            from zlib import crc32
+
+            from .encoding import decode_ops
+
+            self.valid_size = f.tell()
+
+            while True:
+                header = f.read(RECORD.size)
+
+                if RECORD.size != len(header):
+                    break
+
+                size, checksum, generation = RECORD.unpack(header)
+                payload = f.read(size)
+
+                # Torn write - the rest of the file is garbage.
+                if size != len(payload) or crc32(payload) != checksum:
+                    break
+
+                try:
+                    ops = decode_ops(payload)
+                except ValueError:
+                    break
+
+                self.valid_size = f.tell()
+
+                yield generation, ops
+
+    def legacy_records(self, f):
+        """
+        Yields records of pickled journal written by older version.
+
+        :param file f: Journal file.
+        :return: Generator of records (see ``records()``).
+        :rtype: generator
+        """
+
+        from .legacy import load
+
+        while True:
+            try:
+                record = load(f)
+            except EOFError:
+                break
+            except Exception:
+                # Torn write (or forbidden content) - the rest of the file
+                # is garbage.
+                break
+
+            self.valid_size = f.tell()
+            self.legacy = True
+
+            if isinstance(record, tuple):
+                yield record
+            else:
+                yield None, record
+
+    def replay(self, storage):
+        """
+        Applies all journaled operations of the storage generation
+        on the given raw storage.
+
+        :param dict storage: Raw storage dict.
+        :return: Number of replayed records.
+        :rtype: int
+        """
+
+        records = 0
+        generation = storage.get("generation", 0)
+
+        for record_generation, ops in self.records():
+            if record_generation not in (None, generation):
+                continue
+
+            for op in ops:
+                apply_op(storage, op)
+
+            records += 1
+
+        return records
+
+    def append(self, ops, generation=0):
+        """
+        Appends one record of operations to the journal.
+
+        :param list ops: List of serialized operations.
+        :param int generation: Generation of the storage snapshot.
+        """
+
+        from zlib import crc32
+
+        from .encoding import encode_ops
+
+        payload = encode_ops(ops)
+
+        with open(self.filename, "ab") as f:
+
+            # Cut off an incomplete record so it doesn't hide the new one.
+            if self.valid_size is not None and f.tell() != self.valid_size:
+                f.truncate(self.valid_size)
+                f.seek(self.valid_size)
+
+            if not f.tell():
+                f.write(MAGIC)
+
+            f.write(RECORD.pack(len(payload), crc32(payload), generation) + payload)
+            self.valid_size = f.tell()
+
+    def clear(self):
+        """
+        Removes the journal - used once the journal was compacted
+        into the storage snapshot.
+        """
+
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
+
+        self.valid_size = 0
+        self.legacy = False
@@ -0,0 +1,51 @@
+import pickle
+
+# The only classes files written by older versions refer to.
+ALLOWED_CLASSES = {
+    ("datetime", "date"),
+    ("datetime", "datetime"),
+    ("datetime", "timedelta"),
+}
+
+
+class RestrictedUnpickler(pickle.Unpickler):
+    """
+    Unpickler which refuses to construct anything but plain values
+    and datetimes - pickled storage files and journals written
+    by older versions are read with it so a planted file cannot
+    run any code.
+    """
+
+    def find_class(self, module, name):
+
+        if (module, name) not in ALLOWED_CLASSES:
+            raise pickle.UnpicklingError(
+                f"{module}.{name} is not allowed in storage files."
+            )
+
+        return super().find_class(module, name)
+
+
+def load(f):
+    """
+    Reads one pickled value written by older version.
+
+    :param file f: File opened for binary reading.
+    :return: Unpickled value.
+    :raises pickle.UnpicklingError: If the pickle refers to other classes.
+    """
+
+    return RestrictedUnpickler(f).load()
+
+
+def loads(data):
+    """
+    Same as ``load()`` but reads the value from bytes.
+
+    :param bytes data: Pickled value.
+    :return: Unpickled value.
+    """
+
+    import io
+
+    return load(io.BytesIO(data))
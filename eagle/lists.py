@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .profiling import count, phase
+from .storage import get_engine
+
+# Maximum number of lists read at once.
+MAX_WORKERS = 8
+
+
+def read_list(name, query=None):
+    """
+    Reads tasks of one list and filters them by the query. Works with
+    its own storage engine only (no ``get_storage()``) so more lists
+    can be read at once.
+
+    :param str name: List name.
+    :param Query query: Filters (see ``eagle.query.Query``).
+    :return: List of matching tasks - (ID, task) pairs.
+    :rtype: list
+    """
+
+    engine = get_engine(name)
+
+    try:
+        view = engine.view() if hasattr(engine, "view") else None
+        tasks = list((view if view is not None else engine.load()["tasks"]).items())
+    finally:
+        engine.close()
+
+    if not query:
+        return tasks
+
+    with phase("filter"):
+        return query.filter(tasks)
+
+
+def query_lists(names, query=None):
+    """
+    Runs the query on all the lists in parallel and merges
+    the results. Task IDs are prefixed with the list name
+    (i.e. "work:12") as they are unique only within their list.
+
+    :param list names: List names.
+    :param Query query: Filters (all tasks by default).
+    :return: List of matching tasks - (list:ID, task) pairs.
+    :rtype: list
+    """
+
+    with ThreadPoolExecutor(max_workers=min(len(names), MAX_WORKERS)) as pool:
+        results = list(pool.map(lambda name: read_list(name, query), names))
+
+    tasks = [
+        (f"{name}:{i}", t) for name, result in zip(names, results) for i, t in result
+    ]
+    count("lists.read", len(names))
+    count("filter.matched", len(tasks))
+
+    return tasks
@@ -0,0 +1,175 @@
+import atexit
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+# Set once the module is imported - right at startup (it's imported
+# by ``eagle.storage``).
+STARTED = time.perf_counter()
+
+# Phase name -> [number of runs, seconds spent].
+phases = {}
+
+# Counter name -> value.
+counters = {}
+
+# Where the trace is reported - "stderr", file name or None
+# if tracing is off (see ``enable()``).
+target = None
+
+# Files the trace refers to (i.e. cProfile dump).
+files = {}
+
+NULL_PHASE = nullcontext()
+
+
+class Phase:
+    """
+    Measures one run of a phase. Phases can be nested - time of a phase
+    includes time of the phases run inside it.
+    """
+
+    __slots__ = ("name", "began")
+
+    def __init__(self, name):
+
+        self.name = name
+
+    def __enter__(self):
+
+        self.began = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc):
+
+        timer = phases.setdefault(self.name, [0, 0.0])
+        timer[0] += 1
+        timer[1] += time.perf_counter() - self.began
+
+
+def phase(name):
+    """
+    Returns context manager which measures the wrapped code
+    as the given phase. Does nothing unless tracing is on.
+
+    :param str name: Phase name (i.e. "storage.read").
+    :return: Context manager.
+    """
+
+    if target is None:
+        return NULL_PHASE
+
+    return Phase(name)
+
+
+def count(name, value=1):
+    """
+    Adds value to the counter. Does nothing unless tracing is on.
+
+    :param str name: Counter name (i.e. "tasks.emitted").
+    :param int value: Value to add.
+    """
+
+    if target is not None:
+        counters[name] = counters.get(name, 0) + value
+
+
+def enable(to="stderr"):
+    """
+    Turns tracing on. Trace is reported once eagle exits.
+
+    :param str to: "stderr" or name of JSON file.
+    """
+
+    global target
+
+    if target is None:
+        atexit.register(report)
+
+    target = to
+
+
+def start_profile(filename):
+    """
+    Runs the rest of the command under cProfile and dumps the stats
+    (see ``pstats``) into the file on exit. Turns tracing on too.
+
+    :param str filename: Stats file name.
+    """
+
+    import cProfile
+
+    if target is None:
+        enable()
+
+    profiler = cProfile.Profile()
+    files["profile"] = os.path.abspath(filename)
+
+    def dump():
+
+        profiler.disable()
+        profiler.dump_stats(filename)
+
+    # Registered after the report so it runs before it.
+    atexit.register(dump)
+    profiler.enable()
+
+
+def get_trace():
+    """
+    Returns the trace - phase timers, counters and referenced files.
+
+    :return: Trace.
+    :rtype: dict
+    """
+
+    return {
+        "argv": sys.argv[1:],
+        "seconds": time.perf_counter() - STARTED,
+        "phases": {
+            name: {"calls": calls, "seconds": seconds}
+            for name, (calls, seconds) in phases.items()
+        },
+        "counters": dict(counters),
+        "files": dict(files),
+    }
+
+
+def report():
+    """
+    Reports the trace to stderr or into JSON file (see ``enable()``).
+    """
+
+    trace = get_trace()
+
+    if "stderr" != target:
+        import json
+
+        with open(target, "w") as f:
+            json.dump(trace, f, indent=2)
+
+        return
+
+    lines = [f"\nTrace ({trace['seconds'] * 1000:.1f} ms total):"]
+
+    for name, timer in trace["phases"].items():
+        lines.append(
+            f"  {name:<22} {timer['calls']:>6}x {timer['seconds'] * 1000:>10.2f} ms"
+        )
+
+    for name, value in trace["counters"].items():
+        lines.append(f"  {name:<22} {value:>7}")
+
+    for name, filename in trace["files"].items():
+        lines.append(f"  {name:<22} {filename}")
+
+    print("\n".join(lines) + "\n", file=sys.stderr)
+
+
+# EAGLE_TRACE=1 reports to stderr, any other value is JSON file name.
+TRACE = os.environ.get("EAGLE_TRACE")
+
+if TRACE:
+    enable("stderr" if TRACE in ("1", "stderr") else TRACE)
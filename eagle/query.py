@@ -0,0 +1,186 @@
+from datetime import date, timedelta
+
+from .profiling import count, phase
+from .search import search
+from .storage import (
+    OTHER,
+    OVERDUE,
+    TODAY,
+    UPCOMING,
+    UPCOMING_DAYS,
+    classify_tasks,
+    get_storage,
+)
+
+# Date filters and buckets (see ``eagle.storage.classify_tasks()``)
+# of tasks they match. Other tasks are all except today's and overdue.
+DATE_FILTERS = {
+    "today": {TODAY},
+    "overdue": {OVERDUE},
+    "upcoming": {UPCOMING},
+    "others": {UPCOMING, OTHER},
+}
+
+
+class Query:
+    """
+    Filters given by CLI flags compiled into one query. Tasks are
+    narrowed by the available indexes (group index, search index
+    or the database) and the rest of the predicates is checked
+    in one pass. Every task is listed once.
+
+    There are three kinds of criteria - groups, search queries and date
+    filters. Task matches a kind if it matches any of its values (search
+    queries can be required all - see ``match_all``). Task has to match
+    any kind (default) or all of them (see ``combine_all``).
+    """
+
+    def __init__(
+        self,
+        groups=None,
+        queries=None,
+        date_filters=None,
+        match_all=False,
+        combine_all=False,
+    ):
+
+        self.groups = set(groups) if groups else None
+        self.queries = [q.lower() for q in queries] if queries else None
+        self.buckets = None
+        self.match_all = match_all
+        self.combine_all = combine_all
+
+        if date_filters:
+            self.buckets = set().union(*(DATE_FILTERS[f] for f in date_filters))
+
+    def kinds(self):
+        """
+        Returns number of criteria kinds the query has.
+
+        :return: Number of kinds.
+        :rtype: int
+        """
+
+        return sum(c is not None for c in (self.groups, self.queries, self.buckets))
+
+    def __bool__(self):
+
+        return 0 < self.kinds()
+
+    def matches_title(self, task):
+
+        title = task.title.lower()
+        match = all if self.match_all else any
+
+        return match(q in title for q in self.queries)
+
+    def get_dates(self):
+        """
+        Translates date filters into date predicates of
+        ``eagle.storage.Storage.select()`` - range of days covering
+        all the buckets (recurring tasks are always candidates of today's
+        and upcoming ones). Other tasks cannot be narrowed.
+
+        :return: Keyword arguments of ``select()`` or None.
+        :rtype: dict
+        """
+
+        if self.buckets is None or OTHER in self.buckets:
+            return None
+
+        today = date.today()
+        dates = {"recurring": bool(self.buckets & {TODAY, UPCOMING})}
+
+        if OVERDUE not in self.buckets:
+            dates["date_from"] = today + timedelta(days=TODAY not in self.buckets)
+
+        if UPCOMING in self.buckets:
+            dates["date_to"] = today + timedelta(days=UPCOMING_DAYS)
+        else:
+            dates["date_to"] = today - timedelta(days=TODAY not in self.buckets)
+
+        return dates
+
+    def get_candidates(self):
+        """
+        Returns tasks narrowed by indexes (or by the database). If any
+        kind is enough for the task to match (and there are more kinds)
+        no index can be used and all tasks are candidates.
+
+        :return: List of (ID, task) pairs.
+        :rtype: list
+        """
+
+        if self.combine_all or 1 == self.kinds():
+            dates = self.get_dates()
+
+            # Search index is not used along with groups
+            # which are narrowed by group index (or the database).
+            if self.queries is not None and self.groups is None:
+                return search(self.queries, self.match_all)
+
+            if self.groups is not None or dates is not None:
+                with get_storage() as s:
+                    return s.select(
+                        groups=list(self.groups) if self.groups is not None else None,
+                        queries=self.queries,
+                        match_all=self.match_all,
+                        **(dates or {}),
+                    )
+
+        with get_storage() as s:
+            return list(s["tasks"].items())
+
+    def run(self):
+        """
+        Runs the query.
+
+        :return: List of matching tasks - (ID, task) pairs.
+        :rtype: list
+        """
+
+        tasks = self.get_candidates()
+
+        with phase("filter"):
+            result = self.filter(tasks)
+
+        count("filter.scanned", len(tasks))
+        count("filter.matched", len(result))
+
+        return result
+
+    def filter(self, tasks):
+        """
+        Checks all predicates of the query on the candidates.
+
+        :param list tasks: Candidates - (ID, task) pairs.
+        :return: List of matching tasks - (ID, task) pairs.
+        :rtype: list
+        """
+
+        if self.buckets is not None:
+            buckets = classify_tasks([t for _, t in tasks])
+        else:
+            buckets = [None] * len(tasks)
+
+        result = []
+
+        for (i, t), bucket in zip(tasks, buckets):
+            matches = (
+                self.groups is None or t.group in self.groups,
+                self.queries is None or self.matches_title(t),
+                self.buckets is None or bucket in self.buckets,
+            )
+
+            if self.combine_all:
+                matched = all(matches)
+            else:
+
+                # Only given kinds count (the missing ones are True).
+                given = (self.groups, self.queries, self.buckets)
+                matched = any(m for m, c in zip(matches, given) if c is not None)
+
+            if matched:
+                result.append((i, t))
+
+        return result
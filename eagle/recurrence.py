@@ -0,0 +1,101 @@
+import heapq
+from datetime import date
+
+from .storage import DATE, PERIOD_DAYS, PERIOD_MONTHS, days_in_month
+
+
+def next_occurrence(frequency, after):
+    """
+    Computes the first occurrence of the task on ``after`` day
+    or later. Computed in closed form - no day by day stepping.
+
+    :param Frequency frequency: Task frequency.
+    :param int after: Day ordinal.
+    :return: Ordinal of the occurrence or None if the task
+        doesn't take place anymore.
+    :rtype: int
+    """
+
+    if frequency is None:
+        return None
+
+    if DATE == frequency.kind:
+        return frequency.anchor if after <= frequency.anchor else None
+
+    if frequency.kind in PERIOD_DAYS:
+        period = frequency.interval * PERIOD_DAYS[frequency.kind]
+
+        return after + (frequency.anchor - after) % period
+
+    # Monthly/yearly - find the first month since "after" month
+    # which is whole number of periods from the anchor.
+    months = frequency.interval * PERIOD_MONTHS[frequency.kind]
+    a = date.fromordinal(frequency.anchor)
+    d = date.fromordinal(after)
+    month = d.year * 12 + d.month - 1
+    month += (a.year * 12 + a.month - 1 - month) % months
+
+    while True:
+        year, m = divmod(month, 12)
+        occurrence = date(year, m + 1, min(a.day, days_in_month(year, m + 1)))
+
+        if after <= occurrence.toordinal():
+            return occurrence.toordinal()
+
+        month += months
+
+
+def iter_occurrences(frequency, start, end=None):
+    """
+    Yields all occurrences of the task in the given range.
+    Next N occurrences can be taken with ``itertools.islice()``
+    when the range is open.
+
+    :param Frequency frequency: Task frequency.
+    :param int start: First day ordinal of the range.
+    :param int end: Last day ordinal of the range (open range if None).
+    :return: Generator of day ordinals.
+    :rtype: generator
+    """
+
+    day = next_occurrence(frequency, start)
+
+    while day is not None and (end is None or day <= end):
+        yield day
+        day = next_occurrence(frequency, day + 1)
+
+
+def iter_agenda(tasks, start, end):
+    """
+    Yields all occurrences of all the tasks in the given range
+    ordered by day. Occurrences of all the tasks are merged
+    with a heap so each task is asked only for its next occurrence.
+
+    :param list tasks: List of tasks - enumerated.
+    :param date start: First day of the range.
+    :param date end: Last day of the range.
+    :return: Generator of (day, task number, task) tuples.
+    :rtype: generator
+    """
+
+    start, end = start.toordinal(), end.toordinal()
+    heap = []
+
+    for i, t in tasks:
+        day = next_occurrence(t.frequency, start)
+
+        if day is not None and day <= end:
+            heap.append((day, i, t))
+
+    heapq.heapify(heap)
+
+    while heap:
+        day, i, t = heap[0]
+        yield date.fromordinal(day), i, t
+
+        day = next_occurrence(t.frequency, day + 1)
+
+        if day is not None and day <= end:
+            heapq.heapreplace(heap, (day, i, t))
+        else:
+            heapq.heappop(heap)
@@ -0,0 +1,364 @@
+import sys
+
+from .profiling import count, phase
+from .storage import OTHER, OVERDUE, TODAY, UPCOMING, iter_buckets
+
+# Buckets in order they are printed and their titles.
+SECTIONS = (
+    (OVERDUE, "Overdue:"),
+    (TODAY, "Today:"),
+    (UPCOMING, "Upcoming:"),
+    (OTHER, "Your list:"),
+)
+
+# Output formats - text for humans, JSON array and JSON Lines
+# (one record per line) for machines.
+FORMATS = ("text", "json", "ndjson")
+
+# Bucket names in machine readable output.
+BUCKET_NAMES = {
+    OVERDUE: "overdue",
+    TODAY: "today",
+    UPCOMING: "upcoming",
+    OTHER: "other",
+}
+
+# Output is written once this many characters are buffered.
+BUFFER_SIZE = 64 * 1024
+
+
+class BufferedWriter:
+    """
+    Collects output and writes it in big chunks instead
+    of line by line.
+    """
+
+    def __init__(self, out=None, size=BUFFER_SIZE):
+
+        self.out = out or sys.stdout
+        self.size = size
+        self.parts = []
+        self.length = 0
+
+    def write(self, text):
+
+        self.parts.append(text)
+        self.length += len(text)
+
+        if self.size <= self.length:
+            self.flush()
+
+    def flush(self):
+
+        with phase("output"):
+            self.out.write("".join(self.parts))
+            self.out.flush()
+        self.parts.clear()
+        self.length = 0
+
+
+class RecordWriter:
+    """
+    Writes records as JSON array or JSON Lines. Records are encoded
+    one by one so the output is streamed as it's produced.
+    """
+
+    def __init__(self, fmt, out=None):
+
+        import json
+
+        self.dumps = json.dumps
+        self.fmt = fmt
+        self.writer = BufferedWriter(out)
+        self.count = 0
+
+    def write(self, record):
+
+        text = self.dumps(record, ensure_ascii=False)
+
+        if "ndjson" == self.fmt:
+            self.writer.write(text + "\n")
+        else:
+            self.writer.write(("[" if not self.count else ",\n") + text)
+
+        self.count += 1
+
+    def close(self):
+
+        if "json" == self.fmt:
+            self.writer.write("]\n" if self.count else "[]\n")
+
+        self.writer.flush()
+
+
+def format_task(number, task):
+    """
+    Formats task line.
+
+    :param int number: Task ID.
+    :param Task task: Task.
+    :return: Task line.
+    :rtype: str
+    """
+
+    freq = f" ({task.frequency})" if task.frequency else ""
+    group = f" [{task.group}]" if task.group else ""
+
+    return f"\t{number}. {task.title}{freq}{group}\n"
+
+
+def sort_tasks(tasks, flag):
+    """
+    Sorts tasks by the given flag.
+    Choices are:
+        * groups
+
+    :param list tasks: List of (ID, task) pairs.
+    :param str flag: The sort flag.
+    :return: Sorted list.
+    :rtype: list
+    """
+
+    if "groups" == flag:
+        return sorted(tasks, key=lambda t: t[1].group or "")
+
+    return tasks
+
+
+def gather(rows, buckets, load, limit=None, sort_by=None):
+    """
+    Sorts tasks into the buckets. With limit tasks are taken only until
+    every bucket is full (unless they are sorted) so neither the rest
+    of the tasks is classified nor any task over the limit is built.
+
+    :param iterable rows: (task ID, row) pairs.
+    :param iterable buckets: Bucket of every row (see ``iter_buckets()``).
+    :param callable load: Turns row into task.
+    :param int limit: Maximum number of tasks per bucket.
+    :param str sort_by: Sort flag (see ``sort_tasks()``).
+    :return: Bucket -> list of (ID, task) pairs and set of buckets
+        which have more tasks than listed.
+    :rtype: tuple
+    """
+
+    lists = {bucket: [] for bucket, _ in SECTIONS}
+    truncated = set()
+
+    # Sorted buckets have to be taken whole.
+    if sort_by:
+        limit, cut = None, limit
+    else:
+        cut = None
+
+    for (i, row), bucket in zip(rows, buckets):
+        tasks = lists[bucket]
+
+        if limit is not None and limit <= len(tasks):
+            truncated.add(bucket)
+
+            if len(truncated) == len(lists):
+                break
+
+            continue
+
+        tasks.append((i, load(row)))
+
+    for bucket, tasks in lists.items():
+        if sort_by:
+            tasks[:] = sort_tasks(tasks, sort_by)
+
+        if cut is not None and cut < len(tasks):
+            del tasks[cut:]
+            truncated.add(bucket)
+
+    return lists, truncated
+
+
+def iter_records(rows, buckets, load, limit=None, sort_by=None):
+    """
+    Yields records of tasks in the order they are stored (or sorted
+    by ``sort_by``). Unless the tasks are sorted records are built
+    one by one as the rows are read.
+
+    :param iterable rows: (task ID, row) pairs.
+    :param iterable buckets: Bucket of every row (see ``iter_buckets()``).
+    :param callable load: Turns row into task.
+    :param int limit: Maximum number of tasks per bucket.
+    :param str sort_by: Sort flag (see ``sort_tasks()``).
+    :return: Generator of records (see ``eagle.transfer.FIELDS``)
+        with the task bucket.
+    :rtype: generator
+    """
+
+    from .transfer import task_to_record
+
+    if sort_by:
+        lists, _ = gather(rows, buckets, load, limit, sort_by)
+        tasks = [(i, t, b) for b, tasks in lists.items() for i, t in tasks]
+        tasks.sort(key=lambda t: (t[1].group or "", t[0]))
+    else:
+        tasks = ((i, row, b) for (i, row), b in zip(rows, buckets))
+
+    counts = dict.fromkeys(BUCKET_NAMES, 0)
+    full = 0
+
+    for i, t, bucket in tasks:
+        if limit is not None and not sort_by:
+            if limit <= counts[bucket]:
+                continue
+
+            counts[bucket] += 1
+            full += limit == counts[bucket]
+
+        record = task_to_record(i, t if sort_by else load(t))
+        record["bucket"] = BUCKET_NAMES[bucket]
+
+        yield record
+
+        # Every bucket is full - the rest of the tasks is not read.
+        if len(counts) == full:
+            break
+
+
+def render_list(
+    rows, buckets, load=None, limit=None, sort_by=None, fmt="text", out=None
+):
+    """
+    Renders tasks sorted into overdue, today, upcoming and other tasks.
+    Machine readable formats list tasks in the order they are stored
+    with the bucket in every record.
+
+    :param iterable rows: (task ID, row) pairs - rows are tasks unless
+        ``load`` is given.
+    :param iterable buckets: Bucket of every row (see ``iter_buckets()``).
+    :param callable load: Turns row into task.
+    :param int limit: Maximum number of tasks per bucket.
+    :param str sort_by: Sort flag (see ``sort_tasks()``).
+    :param str fmt: Output format (see ``FORMATS``).
+    :param file out: Output (stdout by default).
+    """
+
+    load = load or (lambda task: task)
+
+    with phase("render"):
+        if "text" != fmt:
+            writer = RecordWriter(fmt, out)
+
+            for record in iter_records(rows, buckets, load, limit, sort_by):
+                writer.write(record)
+
+            writer.close()
+            count("tasks.emitted", writer.count)
+        else:
+            write_list(rows, buckets, load, limit, sort_by, out)
+
+
+def write_list(rows, buckets, load, limit=None, sort_by=None, out=None):
+    """
+    Writes tasks as text list sorted into sections (see ``render_list()``).
+    """
+
+    lists, truncated = gather(rows, buckets, load, limit, sort_by)
+    writer = BufferedWriter(out)
+    count("tasks.emitted", sum(len(tasks) for tasks in lists.values()))
+
+    for bucket, title in SECTIONS:
+        tasks = lists[bucket]
+
+        if not tasks:
+            continue
+
+        writer.write(f"\n{title}\n")
+
+        for i, t in tasks:
+            writer.write(format_task(i, t))
+
+        if bucket in truncated:
+            writer.write("\t...\n")
+
+        if OTHER == bucket:
+            writer.write("\n")
+
+    writer.flush()
+
+
+def render_tasks(tasks, limit=None, sort_by=None, fmt="text", out=None):
+    """
+    Renders list of tasks (see ``render_list()``).
+
+    :param list tasks: List of (ID, task) pairs.
+    :param int limit: Maximum number of tasks per bucket.
+    :param str sort_by: Sort flag (see ``sort_tasks()``).
+    :param str fmt: Output format (see ``FORMATS``).
+    :param file out: Output (stdout by default).
+    """
+
+    buckets = iter_buckets([t for _, t in tasks])
+    render_list(tasks, buckets, None, limit, sort_by, fmt, out)
+
+
+def render_view(view, limit=None, sort_by=None, fmt="text", out=None, buckets=None):
+    """
+    Renders all tasks of read-only task view (see ``read_tasks()``).
+    Tasks are built only if they get listed.
+
+    :param view: Task mapping (dict or ``SnapshotView``).
+    :param int limit: Maximum number of tasks per bucket.
+    :param str sort_by: Sort flag (see ``sort_tasks()``).
+    :param str fmt: Output format (see ``FORMATS``).
+    :param file out: Output (stdout by default).
+    :param set buckets: Render only tasks of these buckets.
+    """
+
+    if hasattr(view, "rows_items"):
+        rows, load = view.rows_items(), view.get_task
+    else:
+        rows, load = view.items(), None
+
+    classified = iter_buckets(view)
+
+    if buckets is not None:
+        pairs = [(r, b) for r, b in zip(rows, classified) if b in buckets]
+        rows, classified = [r for r, _ in pairs], [b for _, b in pairs]
+
+    render_list(rows, classified, load, limit, sort_by, fmt, out)
+
+
+def render_agenda(occurrences, fmt="text", out=None):
+    """
+    Renders task occurrences grouped by day (see
+    ``eagle.recurrence.iter_agenda()``). Machine readable formats
+    have the day in every record.
+
+    :param iterable occurrences: (day, task ID, task) tuples ordered by day.
+    :param str fmt: Output format (see ``FORMATS``).
+    :param file out: Output (stdout by default).
+    """
+
+    if "text" != fmt:
+        from .transfer import task_to_record
+
+        writer = RecordWriter(fmt, out)
+
+        for day, i, t in occurrences:
+            record = task_to_record(i, t)
+            record["date"] = day.isoformat()
+            writer.write(record)
+
+        writer.close()
+
+        return
+
+    writer = BufferedWriter(out)
+    current = None
+
+    for day, i, t in occurrences:
+        if day != current:
+            current = day
+            writer.write(f"\n{day.strftime('%a %d/%m/%Y')}:\n")
+
+        group = f" [{t.group}]" if t.group else ""
+        writer.write(f"\t{i}. {t.title} ({t.frequency}){group}\n")
+
+    writer.write("\n")
+    writer.flush()
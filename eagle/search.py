@@ -0,0 +1,349 @@
+import mmap
+import os
+import struct
+from array import array
+
+from .profiling import count, phase
+from .snapshot import pack_strings, pad
+from .storage import get_engine, get_storage
+
+MAGIC = b"EGLI"
+VERSION = 1
+
+# Magic, version, trigram count, next task ID (all lower IDs are
+# indexed), number of stale postings, size and modification time
+# of the storage snapshot the index was made of.
+HEADER = struct.Struct("<4sH2xQQQqq")
+
+
+def get_trigrams(text):
+    """
+    Splits text into lowercase trigrams.
+
+    :param str text: Text (task title or query).
+    :return: Set of trigrams.
+    :rtype: set
+    """
+
+    text = text.lower()
+
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def build_postings(titles):
+    """
+    Builds posting lists - trigram -> IDs of tasks which title
+    contains the trigram.
+
+    :param iterable titles: (task ID, title) pairs.
+    :return: Posting lists.
+    :rtype: dict
+    """
+
+    postings = {}
+
+    for i, title in titles:
+        for trigram in get_trigrams(title):
+            postings.setdefault(trigram, array("q")).append(i)
+
+    return postings
+
+
+def write_index(filename, postings, next_id, stale, stamp):
+    """
+    Writes search index file. Trigrams are stored in one blob
+    with offsets the same way as strings of columnar snapshot
+    (see ``eagle.snapshot``) followed by posting lists.
+
+    :param str filename: Index file name.
+    :param dict postings: Posting lists (see ``build_postings()``).
+    :param int next_id: All tasks with lower ID are indexed.
+    :param int stale: Number of postings which may point to
+        deleted or edited tasks.
+    :param tuple stamp: Stamp of the storage snapshot.
+    """
+
+    trigrams = list(postings)
+    trigram_offsets, trigram_blob = pack_strings(trigrams)
+    offsets = array("Q", [0])
+
+    for trigram in trigrams:
+        offsets.append(offsets[-1] + len(postings[trigram]))
+
+    # The index is replaced at once so it can be read (mapped)
+    # while it's rewritten. It's not written under the storage lock
+    # so every process writes its own file.
+    tmp = f"{filename}.{os.getpid()}.tmp"
+
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(trigrams), next_id, stale, *stamp))
+
+        for column in (trigram_offsets, trigram_blob, offsets):
+            f.write(pad(bytes(column)))
+
+        for trigram in trigrams:
+            f.write(bytes(postings[trigram]))
+
+    os.replace(tmp, filename)
+
+
+class SearchIndex:
+    """
+    Memory mapped trigram index of task titles. Only posting lists
+    of the searched trigrams are read.
+    """
+
+    def __init__(self, filename):
+
+        with open(filename, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self.mmap)
+        header = HEADER.unpack_from(view)
+        magic, version, count, self.next_id, self.stale = header[:5]
+
+        if MAGIC != magic or VERSION != version:
+            raise ValueError("Unknown search index format.")
+
+        self.stamp = header[5:]
+        offset = HEADER.size
+
+        def column(fmt, length):
+
+            nonlocal offset
+
+            size = struct.calcsize(fmt) * length
+            data = view[offset : offset + size]
+            offset += size + (-size % 8)
+
+            return data.cast(fmt) if "B" != fmt else data
+
+        trigram_offsets = column("Q", count + 1)
+        trigram_blob = bytes(column("B", trigram_offsets[count]))
+        self.offsets = column("Q", count + 1)
+        self.postings = column("q", self.offsets[count])
+
+        self.trigrams = {
+            trigram_blob[trigram_offsets[i] : trigram_offsets[i + 1]].decode(): i
+            for i in range(count)
+        }
+
+    def get(self, trigram):
+        """
+        Returns posting list of the trigram.
+
+        :param str trigram: Trigram.
+        :return: Task IDs.
+        :rtype: memoryview
+        """
+
+        i = self.trigrams.get(trigram)
+
+        if i is None:
+            return ()
+
+        return self.postings[self.offsets[i] : self.offsets[i + 1]]
+
+    def lookup(self, query):
+        """
+        Finds candidate tasks for the query - tasks which contain
+        all trigrams of the query. Candidates have to be verified
+        as the trigrams may not be adjacent and postings may be stale.
+
+        :param str query: Search query.
+        :return: Set of task IDs or None if the query is too short
+            to be looked up (every task is a candidate).
+        :rtype: set
+        """
+
+        trigrams = sorted(get_trigrams(query), key=lambda t: len(self.get(t)))
+
+        if not trigrams:
+            return None
+
+        candidates = set(self.get(trigrams[0]))
+
+        for trigram in trigrams[1:]:
+            if not candidates:
+                break
+
+            candidates.intersection_update(self.get(trigram))
+
+        return candidates
+
+    def load(self):
+        """
+        Loads all posting lists for update.
+
+        :return: Posting lists (see ``build_postings()``).
+        :rtype: dict
+        """
+
+        return {
+            trigram: array("q", self.postings[self.offsets[i] : self.offsets[i + 1]])
+            for trigram, i in self.trigrams.items()
+        }
+
+
+def open_index(filename):
+
+    try:
+        return SearchIndex(filename)
+    except (OSError, ValueError):
+        return None
+
+
+def get_index(filename, snapshot):
+    """
+    Opens search index of the columnar snapshot. If there is no index
+    yet or it's out of date it's built from the snapshot.
+
+    :param str filename: Index file name.
+    :param Snapshot snapshot: Columnar snapshot.
+    :return: Search index.
+    :rtype: SearchIndex
+    """
+
+    index = open_index(filename)
+
+    if index is not None and index.stamp == snapshot.stamp:
+        return index
+
+    ids = snapshot.ids
+    postings = build_postings((ids[i], snapshot.title(i)) for i in range(len(ids)))
+    write_index(filename, postings, max(ids, default=0) + 1, 0, snapshot.stamp)
+
+    return SearchIndex(filename)
+
+
+def update_index(filename, journal, generation, tasks, old_stamp, stamp):
+    """
+    Carries the search index over storage compaction. Only tasks
+    added or edited in the journal are indexed, postings of edited
+    and deleted tasks are left as stale and the index is rebuilt
+    once there are more stale postings than tasks.
+    Nothing happens if the index doesn't exist (search wasn't used).
+
+    :param str filename: Index file name.
+    :param Journal journal: Journal which is about to be compacted.
+    :param int generation: Generation of the compacted snapshot.
+    :param dict tasks: All tasks.
+    :param tuple old_stamp: Stamp of the compacted snapshot.
+    :param tuple stamp: Stamp of the new snapshot.
+    """
+
+    index = open_index(filename)
+
+    if index is None:
+        return
+
+    changed = set()
+    stale = index.stale
+    rebuild = index.stamp != old_stamp
+
+    for record_generation, ops in journal.records():
+        if record_generation not in (None, generation):
+            continue
+
+        for op in ops:
+            if "tasks" != op[1]:
+                continue
+
+            if op[0] in ("set", "pop") and op[2] < index.next_id:
+                stale += 1
+
+            if "set" == op[0]:
+                changed.add(op[2])
+            elif "pop" != op[0]:
+                rebuild = True
+
+    if rebuild or len(tasks) < stale:
+        postings = build_postings((i, t.title) for i, t in tasks.items())
+        stale = 0
+    else:
+        postings = index.load()
+
+        for i, t in sorted((i, tasks[i]) for i in changed if i in tasks):
+            for trigram in get_trigrams(t.title):
+                postings.setdefault(trigram, array("q")).append(i)
+
+    write_index(filename, postings, max(tasks, default=0) + 1, stale, stamp)
+
+
+def search(queries, match_all=False):
+    """
+    Searches tasks by title (case insensitive). Candidates are looked
+    up in the search index of the default storage engine. Tasks changed
+    since the last compaction are checked directly. Other storage
+    engines answer the search themselves (see ``Storage.select()``).
+
+    :param list queries: Search queries.
+    :param bool match_all: Task title has to contain all the queries
+        (at least one by default).
+    :return: List of matching tasks - (ID, task) pairs.
+    :rtype: list
+    """
+
+    engine = get_engine()
+
+    try:
+        view = None
+
+        if not hasattr(get_storage, "storage") and hasattr(engine, "view"):
+            view = engine.view()
+    finally:
+        engine.close()
+
+    if view is None:
+        with get_storage() as s:
+            return s.select(queries=queries, match_all=match_all)
+
+    with phase("search.index"):
+        index = get_index(engine.index_filename, view.snapshot)
+
+    with phase("search"):
+        return find(view, index, queries, match_all)
+
+
+def find(view, index, queries, match_all):
+    """
+    Looks the queries up in the search index and verifies
+    the candidates (see ``search()``).
+
+    :param SnapshotView view: All tasks.
+    :param SearchIndex index: Search index.
+    :param list queries: Search queries.
+    :param bool match_all: Task title has to contain all the queries.
+    :return: List of matching tasks - (ID, task) pairs.
+    :rtype: list
+    """
+
+    queries = [q.lower() for q in queries]
+    lookups = [index.lookup(q) for q in queries]
+    known = [c for c in lookups if c is not None]
+
+    # Too short queries match anything.
+    if not known or (not match_all and len(known) < len(lookups)):
+        candidates = set(view)
+    elif match_all:
+        candidates = set.intersection(*known)
+    else:
+        candidates = set.union(*known)
+
+    candidates.update(view.changed())
+    count("search.candidates", len(candidates))
+    match = all if match_all else any
+    result = []
+
+    for i in sorted(candidates):
+        try:
+            task = view[i]
+        except KeyError:
+            continue
+
+        title = task.title.lower()
+
+        if match(q in title for q in queries):
+            result.append((i, task))
+
+    return result
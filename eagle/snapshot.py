@@ -0,0 +1,614 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import chain
+
+from .storage import (
+    Frequency,
+    Group,
+    Task,
+    classify_chunk,
+    deserialize_task,
+    get_kind_columns,
+)
+
+MAGIC = b"EGLC"
+VERSION = 4
+
+# Magic, version, task count, group name count, group count,
+# generation, size and modification time of the storage snapshot
+# the columnar snapshot was made of.
+HEADER = struct.Struct("<4sH2xQQQQqq")
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_us(d):
+    """
+    Converts datetime into microseconds since epoch.
+
+    :param datetime d: Datetime.
+    :return: Microseconds.
+    :rtype: int
+    """
+
+    delta = d - EPOCH
+
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def from_us(us):
+    """
+    Converts microseconds since epoch into datetime.
+
+    :param int us: Microseconds.
+    :return: Datetime.
+    :rtype: datetime
+    """
+
+    return EPOCH + timedelta(microseconds=us)
+
+
+def pack_strings(strings):
+    """
+    Packs strings into one blob and list of offsets.
+
+    :param list strings: Strings to be packed.
+    :return: Offsets (one more than strings) and the blob.
+    :rtype: tuple
+    """
+
+    offsets = array("Q", [0])
+    blob = bytearray()
+
+    for s in strings:
+        blob += s.encode()
+        offsets.append(len(blob))
+
+    return offsets, bytes(blob)
+
+
+def pad(data):
+    """
+    Pads data to 8 bytes so the next column stays aligned.
+
+    :param bytes data: Column data.
+    :return: Padded data.
+    :rtype: bytes
+    """
+
+    return data + b"\0" * (-len(data) % 8)
+
+
+def write_snapshot(filename, storage, stamp, generation=0):
+    """
+    Writes tasks and groups into columnar snapshot file.
+
+    Every task attribute is stored as one fixed width column
+    (titles are stored in one blob with offsets), group names are
+    stored only once and tasks refer to them by index.
+
+    :param str filename: Snapshot file name.
+    :param dict storage: Storage dict.
+    :param tuple stamp: Size and modification time of the storage
+        file the snapshot corresponds to.
+    :param int generation: Generation of the storage snapshot.
+    """
+
+    ids = array("q", storage["tasks"])
+    tasks = list(storage["tasks"].values())
+    names = [g.title for g in storage["groups"]]
+    name_ids = {n: i for i, n in enumerate(names)}
+
+    created = array("q")
+    kinds = bytearray()
+    intervals = array("i")
+    anchors = array("i")
+    group_ids = array("i")
+
+    for t in tasks:
+        created.append(to_us(t.created))
+
+        # Frequency kind 0 stands for no frequency.
+        if t.frequency:
+            kinds.append(ord(t.frequency.kind))
+            intervals.append(t.frequency.interval)
+            anchors.append(t.frequency.anchor)
+        else:
+            kinds.append(0)
+            intervals.append(0)
+            anchors.append(0)
+
+        if t.group is None:
+            group_ids.append(-1)
+        else:
+            if t.group not in name_ids:
+                name_ids[t.group] = len(names)
+                names.append(t.group)
+
+            group_ids.append(name_ids[t.group])
+
+    title_offsets, titles = pack_strings(t.title for t in tasks)
+    name_offsets, name_blob = pack_strings(names)
+    group_created = array("q", (to_us(g.created) for g in storage["groups"]))
+
+    # Written aside and replaced at once so readers never see
+    # half written snapshot.
+    tmp = filename + ".tmp"
+
+    with open(tmp, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(tasks),
+                len(names),
+                len(storage["groups"]),
+                generation,
+                *stamp,
+            )
+        )
+
+        for column in (
+            ids,
+            created,
+            kinds,
+            intervals,
+            anchors,
+            group_ids,
+            title_offsets,
+            titles,
+            name_offsets,
+            name_blob,
+            group_created,
+        ):
+            f.write(pad(bytes(column)))
+
+    os.replace(tmp, filename)
+
+
+class Snapshot:
+    """
+    Memory mapped columnar snapshot. Nothing is decoded upfront,
+    tasks are built from the columns once they are accessed.
+    """
+
+    def __init__(self, filename):
+
+        with open(filename, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self.mmap)
+        header = HEADER.unpack_from(view)
+        magic, version, count, name_count, group_count, generation = header[:6]
+
+        if MAGIC != magic or VERSION != version:
+            raise ValueError("Unknown snapshot format.")
+
+        self.generation = generation
+        self.stamp = header[6:]
+        self.count = count
+
+        self.group_count = group_count
+        self.offset = HEADER.size
+
+        def column(fmt, length):
+
+            size = struct.calcsize(fmt) * length
+            data = view[self.offset : self.offset + size]
+            self.offset += size + (-size % 8)
+
+            return data.cast(fmt) if "B" != fmt else data
+
+        self.ids = column("q", count)
+        self.created = column("q", count)
+        self.kinds = column("B", count)
+        self.intervals = column("i", count)
+        self.anchors = column("i", count)
+        self.group_ids = column("i", count)
+        self.title_offsets = column("Q", count + 1)
+        self.titles = column("B", self.title_offsets[count])
+        name_offsets = column("Q", name_count + 1)
+        name_blob = column("B", name_offsets[name_count])
+        self.group_created = column("q", group_count)
+
+        # Group names are few - decode them all.
+        self.names = [
+            bytes(name_blob[name_offsets[i] : name_offsets[i + 1]]).decode()
+            for i in range(name_count)
+        ]
+
+    def __len__(self):
+
+        return self.count
+
+    def position(self, task_id):
+        """
+        Finds index of the task in the columns.
+
+        :param int task_id: Task ID.
+        :return: Task index.
+        :rtype: int
+        :raises KeyError: If there is no such task.
+        """
+
+        row = self.find(task_id)
+
+        if -1 == row:
+            raise KeyError(task_id)
+
+        return row
+
+    def find(self, task_id):
+        """
+        Finds index of the task in the columns - tasks are ordered
+        by their IDs (see ``eagle.table.TaskTable.find()``).
+
+        :param int task_id: Task ID.
+        :return: Task index or -1 if there is no such task.
+        :rtype: int
+        """
+
+        row = bisect_left(self.ids, task_id)
+
+        if row < self.count and task_id == self.ids[row]:
+            return row
+
+        return -1
+
+    def title(self, i):
+        """
+        Decodes task title only.
+
+        :param int i: Task index (not ID).
+        :return: Task title.
+        :rtype: str
+        """
+
+        return bytes(
+            self.titles[self.title_offsets[i] : self.title_offsets[i + 1]]
+        ).decode()
+
+    def task(self, i):
+        """
+        Builds task from the columns.
+
+        :param int i: Task index (not ID).
+        :return: Task.
+        :rtype: Task
+        """
+
+        if self.kinds[i]:
+            frequency = Frequency(
+                chr(self.kinds[i]), self.intervals[i], self.anchors[i]
+            )
+        else:
+            frequency = None
+
+        group_id = self.group_ids[i]
+
+        return Task(
+            self.title(i),
+            frequency,
+            self.names[group_id] if -1 != group_id else None,
+            from_us(self.created[i]),
+        )
+
+    def columns(self):
+        """
+        Converts snapshot columns into classification columns
+        (see ``eagle.storage.get_task_columns()``).
+
+        :return: Period, months, anchor and fixed columns.
+        :rtype: tuple
+        """
+
+        return get_kind_columns(self.kinds, self.intervals, self.anchors)
+
+    def groups(self):
+        """
+        Builds all groups.
+
+        :return: List of groups.
+        :rtype: list
+        """
+
+        return [
+            Group(self.names[i], from_us(self.group_created[i]))
+            for i in range(self.group_count)
+        ]
+
+
+class Overlay:
+    """
+    Tasks changed in the journal since the snapshot was written.
+    Journal operations are applied on it the same way as on raw
+    storage (see ``eagle.journal.apply_op()``) - only the journaled
+    task IDs are kept, never all the snapshot ones.
+    """
+
+    def __init__(self):
+
+        # Task ID -> serialized task added or changed in the journal.
+        self.tasks = {}
+
+        # IDs of removed tasks.
+        self.removed = set()
+
+        # All the snapshot tasks were removed.
+        self.cleared = False
+
+    def __setitem__(self, task_id, task):
+
+        self.tasks[task_id] = task
+
+    def pop(self, task_id, default=None):
+
+        self.removed.add(task_id)
+
+        return self.tasks.pop(task_id, default)
+
+    def clear(self):
+
+        self.tasks.clear()
+        self.removed.clear()
+        self.cleared = True
+
+
+class SnapshotView:
+    """
+    Read-only mapping of task IDs to tasks backed by columnar
+    snapshot. Changes journaled since the snapshot was written are
+    laid over the snapshot rows so the view is up to date - rows
+    of the changed tasks are found by bisection so the view costs
+    the journal only, not the whole snapshot.
+    """
+
+    def __init__(self, snapshot, journal=None, buckets_filename=None):
+
+        self.snapshot = snapshot
+
+        # Bucket cache of the snapshot (see ``eagle.buckets``).
+        self.buckets_filename = buckets_filename
+        self.journal_size = journal.size() if journal else 0
+
+        # Journaled changes (None if there are none).
+        self.overlay = None
+
+        # Runs of snapshot rows - (start, end, task ID) where the task
+        # ID (or None) is the journaled task which replaces row ``end``.
+        self.segments = None
+
+        # IDs of journaled tasks which follow the snapshot rows.
+        self.added = None
+
+        if self.journal_size:
+            self.overlay = overlay = Overlay()
+            journal.replay(
+                {
+                    "generation": snapshot.generation,
+                    "tasks": overlay,
+                    "groups": list(range(snapshot.group_count)),
+                }
+            )
+            self.segments, self.added = self.get_segments(overlay)
+
+    def get_segments(self, overlay):
+        """
+        Splits the snapshot rows by rows of the journaled tasks.
+
+        :param Overlay overlay: Journaled changes.
+        :return: Segments and added task IDs (see ``__init__()``).
+        :rtype: tuple
+        """
+
+        snapshot = self.snapshot
+
+        if overlay.cleared:
+            return [], list(overlay.tasks)
+
+        # Snapshot row -> journaled task ID (None for removed task).
+        replaced = {}
+        added = []
+
+        for task_id in overlay.tasks:
+            row = snapshot.find(task_id)
+
+            if -1 == row:
+                added.append(task_id)
+            else:
+                replaced[row] = task_id
+
+        for task_id in overlay.removed.difference(overlay.tasks):
+            row = snapshot.find(task_id)
+
+            if -1 != row:
+                replaced[row] = None
+
+        segments = []
+        start = 0
+
+        for row in sorted(replaced):
+            segments.append((start, row, replaced[row]))
+            start = row + 1
+
+        segments.append((start, len(snapshot), None))
+
+        return segments, added
+
+    def lay_over(self, column, values):
+        """
+        Lays values of the journaled tasks over snapshot column.
+
+        :param column: Snapshot column (bytes-like, i.e. ``memoryview``).
+        :param dict values: Task ID -> value of the journaled tasks.
+        :return: Column in order of ``rows_items()``.
+        :rtype: array
+        """
+
+        column = memoryview(column)
+        result = array(column.format)
+
+        for start, end, task_id in self.segments:
+            result.frombytes(column[start:end].cast("B"))
+
+            if task_id is not None:
+                result.append(values[task_id])
+
+        result.extend(values[i] for i in self.added)
+
+        return result
+
+    def columns(self):
+        """
+        Returns classification columns of the tasks
+        (see ``eagle.storage.get_task_columns()``) without
+        building the tasks from the snapshot.
+
+        :return: Period, months, anchor and fixed columns.
+        :rtype: tuple
+        """
+
+        snapshot = self.snapshot
+
+        if self.overlay is None:
+            return snapshot.columns()
+
+        kinds, intervals, anchors = {}, {}, {}
+
+        for task_id, row in self.overlay.tasks.items():
+            frequency = deserialize_task(row).frequency
+
+            if frequency is None:
+                kinds[task_id] = intervals[task_id] = anchors[task_id] = 0
+            else:
+                kinds[task_id] = ord(frequency.kind)
+                intervals[task_id] = frequency.interval
+                anchors[task_id] = frequency.anchor
+
+        return get_kind_columns(
+            self.lay_over(snapshot.kinds, kinds),
+            self.lay_over(snapshot.intervals, intervals),
+            self.lay_over(snapshot.anchors, anchors),
+        )
+
+    def buckets(self, today):
+        """
+        Returns bucket of every task (see ``eagle.storage.iter_buckets()``)
+        - from the bucket cache if there is one (see ``eagle.buckets``).
+
+        :param int today: Today's ordinal.
+        :return: Buckets in order of ``rows_items()``.
+        :rtype: iterable
+        """
+
+        if self.buckets_filename is None:
+            return classify_chunk(self.columns(), today)
+
+        from .buckets import get_buckets
+
+        return get_buckets(self.buckets_filename, self, today)
+
+    def get_task(self, row):
+
+        if isinstance(row, int):
+            return self.snapshot.task(row)
+
+        return deserialize_task(row)
+
+    def changed(self):
+        """
+        Returns IDs of tasks added or edited since the snapshot
+        was written.
+
+        :return: List of task IDs.
+        :rtype: list
+        """
+
+        if self.overlay is None:
+            return []
+
+        return list(self.overlay.tasks)
+
+    def __len__(self):
+
+        if self.overlay is None:
+            return len(self.snapshot)
+
+        rows = sum(end - start for start, end, _ in self.segments)
+        replaced = sum(1 for _, _, task_id in self.segments if task_id is not None)
+
+        return rows + replaced + len(self.added)
+
+    def __contains__(self, task_id):
+
+        try:
+            self[task_id]
+        except KeyError:
+            return False
+
+        return True
+
+    def __getitem__(self, task_id):
+
+        overlay = self.overlay
+
+        if overlay is not None:
+            if task_id in overlay.tasks:
+                return deserialize_task(overlay.tasks[task_id])
+
+            if overlay.cleared or task_id in overlay.removed:
+                raise KeyError(task_id)
+
+        return self.snapshot.task(self.snapshot.position(task_id))
+
+    def __iter__(self):
+
+        return (task_id for task_id, _ in self.rows_items())
+
+    def items(self):
+        """
+        Yields (task ID, task) pairs in the storage order.
+
+        :return: Generator of pairs.
+        :rtype: generator
+        """
+
+        for task_id, row in self.rows_items():
+            yield task_id, self.get_task(row)
+
+    def rows_items(self):
+        """
+        Returns (task ID, row) pairs without building the tasks. Rows
+        are turned into tasks with ``get_task()`` - row is either
+        snapshot index or serialized task which came from the journal.
+
+        :return: Iterable of pairs.
+        :rtype: iterable
+        """
+
+        ids = self.snapshot.ids
+
+        if self.overlay is None:
+            return zip(ids, range(len(self.snapshot)))
+
+        tasks = self.overlay.tasks
+        parts = []
+
+        for start, end, task_id in self.segments:
+            parts.append(zip(ids[start:end], range(start, end)))
+
+            if task_id is not None:
+                parts.append(((task_id, tasks[task_id]),))
+
+        parts.append((i, tasks[i]) for i in self.added)
+
+        return chain.from_iterable(parts)
+
+    def values(self):
+
+        for _, task in self.items():
+            yield task
@@ -0,0 +1,472 @@
+import os
+import sqlite3
+from datetime import datetime
+
+from .journal import Journal
+from .profiling import count, phase
+from .storage import (
+    DATE,
+    Frequency,
+    Group,
+    JournalEngine,
+    Storage,
+    Task,
+    deserialize_frequency,
+    lock_file,
+    rebase,
+)
+
+# Version of the schema - stored as "user_version" of the database.
+# 2 - frequency stored as kind, interval and anchor columns.
+# 3 - tasks keyed by ID instead of position.
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    kind TEXT,
+    interval INTEGER,
+    anchor INTEGER,
+    grp TEXT,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_grp ON tasks (grp);
+CREATE INDEX IF NOT EXISTS tasks_kind_anchor ON tasks (kind, anchor);
+
+CREATE TABLE IF NOT EXISTS groups (
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS groups_position ON groups (position);
+"""
+
+TASK_COLUMNS = "title, kind, interval, anchor, grp, created"
+GROUP_COLUMNS = "title, created"
+
+# Datetime format which keeps lexicographic order of the values.
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def format_datetime(d):
+
+    return d.strftime(DATETIME_FORMAT)
+
+
+def parse_datetime(s):
+
+    return datetime.strptime(s, DATETIME_FORMAT)
+
+
+def task_to_row(task):
+    """
+    Converts task into table row. Frequency is stored in separate
+    columns so specific dates can be queried by index.
+
+    :param Task task: Task to be converted.
+    :return: Row values (see ``TASK_COLUMNS``).
+    :rtype: tuple
+    """
+
+    frequency = task.frequency or (None, None, None)
+
+    return (task.title, *frequency, task.group, format_datetime(task.created))
+
+
+def row_to_task(row):
+    """
+    Converts table row into task.
+
+    :param tuple row: Row values (see ``TASK_COLUMNS``).
+    :return: Task.
+    :rtype: Task
+    """
+
+    title, kind, interval, anchor, group, created = row
+    frequency = Frequency(kind, interval, anchor) if kind else None
+
+    return Task(title, frequency, group, parse_datetime(created))
+
+
+def group_to_row(group):
+
+    return (group.title, format_datetime(group.created))
+
+
+def row_to_group(row):
+
+    return Group(row[0], parse_datetime(row[1]))
+
+
+def get_insert_sql(name, replace=False):
+
+    columns = TABLES[name][0]
+    placeholders = ", ".join("?" * (columns.count(",") + 2))
+    insert = "INSERT OR REPLACE" if replace else "INSERT"
+
+    return f"{insert} INTO {name} ({KEYS[name]}, {columns}) VALUES ({placeholders})"
+
+
+def get_update_sql(name):
+
+    columns = TABLES[name][0]
+    assignments = ", ".join(f"{c} = ?" for c in columns.split(", "))
+
+    return f"UPDATE {name} SET {assignments} WHERE position = ?"
+
+
+TABLES = {
+    "tasks": (TASK_COLUMNS, task_to_row, row_to_task),
+    "groups": (GROUP_COLUMNS, group_to_row, row_to_group),
+}
+
+# Key column of the tables - tasks are keyed by ID, groups
+# are kept as positional list.
+KEYS = {"tasks": "id", "groups": "position"}
+
+
+class SQLiteStorage(Storage):
+    """
+    Storage backed by SQLite database. Task and group lists
+    are loaded once they are accessed and ``select()`` is
+    answered directly by the database.
+    """
+
+    def __init__(self, connection):
+
+        super().__init__()
+        self.connection = connection
+
+    def __missing__(self, name):
+
+        columns, _, from_row = TABLES[name]
+
+        with phase("storage.read"):
+            rows = self.connection.execute(
+                f"SELECT {KEYS[name]}, {columns} FROM {name} ORDER BY {KEYS[name]}"
+            )
+
+            if "tasks" == name:
+                self[name] = self.make_list(
+                    name, ((r[0], from_row(r[1:])) for r in rows), self.next_id()
+                )
+            else:
+                self[name] = self.make_list(name, (from_row(r[1:]) for r in rows))
+
+        count(f"{name}.loaded", len(self[name]))
+
+        return self[name]
+
+    def next_id(self):
+        """
+        Returns next free task ID. IDs of deleted tasks are
+        not reused (the table is AUTOINCREMENT).
+
+        :return: Task ID.
+        :rtype: int
+        """
+
+        row = self.connection.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'tasks'"
+        ).fetchone()
+
+        return row[0] + 1 if row else 1
+
+    def select(
+        self,
+        groups=None,
+        date_from=None,
+        date_to=None,
+        recurring=False,
+        queries=None,
+        match_all=False,
+    ):
+
+        # Uncommitted changes are not in the database yet.
+        if "tasks" in self:
+            return super().select(
+                groups, date_from, date_to, recurring, queries, match_all
+            )
+
+        where = []
+        params = []
+
+        if groups is not None:
+            where.append(f"grp IN ({', '.join('?' * len(groups))})")
+            params.extend(groups)
+
+        if queries is not None:
+            operator = " AND " if match_all else " OR "
+            where.append(
+                "("
+                + operator.join("instr(lowercase(title), ?)" for q in queries)
+                + ")"
+            )
+            params.extend(q.lower() for q in queries)
+
+        if date_from or date_to or recurring:
+            dated = ["kind = ?"]
+            params.append(DATE)
+
+            if date_from:
+                dated.append("? <= anchor")
+                params.append(date_from.toordinal())
+
+            if date_to:
+                dated.append("anchor <= ?")
+                params.append(date_to.toordinal())
+
+            dated = " AND ".join(dated)
+
+            if recurring:
+                dated = f"({dated}) OR kind IN ('d', 'w', 'm', 'y')"
+
+            where.append(f"({dated})")
+
+        sql = f"SELECT id, {TASK_COLUMNS} FROM tasks"
+
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+
+        with phase("storage.select"):
+            rows = self.connection.execute(sql + " ORDER BY id", params)
+            tasks = [(r[0], row_to_task(r[1:])) for r in rows]
+
+        count("tasks.loaded", len(tasks))
+
+        return tasks
+
+
+class SQLiteEngine:
+    """
+    Storage engine which keeps tasks and groups in SQLite database.
+    Operations recorded by the storage are translated into SQL
+    statements on save.
+
+    Storage file: storage.sqlite
+    """
+
+    def __init__(self, filename):
+
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.create_function("lowercase", 1, str.lower)
+
+        # Up to date database is only read - nothing is written
+        # unless the storage is changed.
+        if SCHEMA_VERSION == self.get_version():
+            return
+
+        # Database is created (or upgraded) by one process at a time
+        # in one transaction. The version is written last so other
+        # processes never take half-made database as up to date.
+        with lock_file(os.path.splitext(filename)[0] + ".lock"):
+            version = self.get_version()
+
+            if SCHEMA_VERSION == version:
+                return
+
+            with self.connection:
+                self.connection.execute("BEGIN IMMEDIATE")
+
+                if version:
+                    self.upgrade(version)
+
+                self.create_schema()
+
+                # Move content of the default storage into the new database.
+                if not version:
+                    self.migrate()
+
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def get_version(self):
+        """
+        Returns schema version of the database. Version 1 databases
+        didn't store the version.
+
+        :return: Schema version (0 for new database).
+        :rtype: int
+        """
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+        if not version and self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks'"
+        ).fetchone():
+            return 1
+
+        return version
+
+    def upgrade(self, version):
+        """
+        Upgrades database created with older schema.
+
+        Version 1 stored frequency as "frequency" (recurring) and "date"
+        (specific date) text columns. Versions 1 and 2 kept tasks
+        by position - the position becomes task ID (starting from 1)
+        so the tasks keep their numbers. The caller holds
+        the transaction.
+
+        :param int version: Schema version of the database.
+        """
+
+        if SCHEMA_VERSION <= version:
+            return
+
+        if 2 > version:
+            rows = [
+                (position + 1, title)
+                + tuple(
+                    deserialize_frequency(
+                        parse_datetime(date) if date else frequency,
+                        parse_datetime(created),
+                    )
+                    or (None, None, None)
+                )
+                + (group, created)
+                for position, title, frequency, date, group, created in (
+                    self.connection.execute(
+                        "SELECT position, title, frequency, date, grp, created "
+                        "FROM tasks ORDER BY position"
+                    )
+                )
+            ]
+        else:
+            rows = self.connection.execute(
+                f"SELECT position + 1, {TASK_COLUMNS} FROM tasks ORDER BY position"
+            ).fetchall()
+
+        self.connection.execute("DROP TABLE tasks")
+        self.create_schema()
+        self.connection.executemany(get_insert_sql("tasks"), rows)
+
+    def create_schema(self):
+        """
+        Creates tables and indexes which don't exist yet. Unlike
+        ``executescript()`` it doesn't commit the transaction.
+        """
+
+        for statement in SCHEMA.split(";"):
+            self.connection.execute(statement)
+
+    def migrate(self):
+        """
+        Imports tasks and groups from the default (journal) storage
+        of the same list. The caller holds the storage lock and
+        the transaction.
+        """
+
+        directory = os.path.dirname(self.filename)
+        storage = JournalEngine(
+            os.path.join(directory, "storage.dat"),
+            Journal(os.path.join(directory, "storage.journal")),
+            os.path.join(directory, "storage.col"),
+        ).read()
+
+        for name, items in storage.items():
+            self.insert_all(name, items)
+
+    def insert_all(self, name, items):
+        """
+        Inserts all the items into the table.
+
+        :param str name: Table name.
+        :param items: Tasks (mapping keyed by ID) or groups (list).
+        """
+
+        _, to_row, _ = TABLES[name]
+        items = enumerate(items) if isinstance(items, list) else items.items()
+        self.connection.executemany(
+            get_insert_sql(name), ((i,) + to_row(item) for i, item in items)
+        )
+
+    def data_version(self):
+
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self):
+
+        # Changed once another connection commits (see ``save()``).
+        self.loaded = self.data_version()
+
+        return SQLiteStorage(self.connection)
+
+    def save(self, storage):
+        """
+        Translates storage operations into SQL statements
+        and executes them in one transaction. If another process
+        changed the database since it was loaded the changes are
+        rebased (see ``eagle.storage.rebase()``) first.
+
+        :param SQLiteStorage storage: Storage to be saved.
+        """
+
+        if not storage.ops:
+            return
+
+        execute = self.connection.execute
+        lengths = {}
+
+        with phase("storage.write"), self.connection:
+            execute("BEGIN IMMEDIATE")
+
+            if self.data_version() != self.loaded:
+                storage.replace(rebase(storage, SQLiteStorage(self.connection)))
+
+            for op in storage.ops:
+                name = op[1]
+                to_row = TABLES[name][1]
+                insert = get_insert_sql(name)
+
+                # Tasks are keyed by ID.
+                if "tasks" == name:
+                    if "set" == op[0]:
+                        execute(get_insert_sql(name, True), (op[2],) + to_row(op[3]))
+                    elif "pop" == op[0]:
+                        execute("DELETE FROM tasks WHERE id = ?", (op[2],))
+                    elif "clear" == op[0]:
+                        execute("DELETE FROM tasks")
+                        execute("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+
+                    continue
+
+                if name not in lengths:
+                    count = execute(f"SELECT count(*) FROM {name}").fetchone()
+                    lengths[name] = count[0]
+
+                if "append" == op[0]:
+                    execute(insert, (lengths[name],) + to_row(op[2]))
+                    lengths[name] += 1
+                elif "insert" == op[0]:
+                    execute(
+                        f"UPDATE {name} SET position = position + 1 WHERE position >= ?",
+                        (op[2],),
+                    )
+                    execute(insert, (op[2],) + to_row(op[3]))
+                    lengths[name] += 1
+                elif "pop" == op[0]:
+                    execute(f"DELETE FROM {name} WHERE position = ?", (op[2],))
+                    execute(
+                        f"UPDATE {name} SET position = position - 1 WHERE position > ?",
+                        (op[2],),
+                    )
+                    lengths[name] -= 1
+                elif "set" == op[0]:
+                    execute(get_update_sql(name), to_row(op[3]) + (op[2],))
+                elif "clear" == op[0]:
+                    execute(f"DELETE FROM {name}")
+                    lengths[name] = 0
+                elif "reset" == op[0]:
+                    execute(f"DELETE FROM {name}")
+                    self.insert_all(name, op[2])
+                    lengths[name] = len(op[2])
+
+        storage.ops.clear()
+        storage.mark_saved()
+        self.loaded = self.data_version()
+
+    def close(self):
+
+        self.connection.close()
@@ -1,15 +1,143 @@
 import os
-import pickle
+from array import array
 from collections import namedtuple
 from contextlib import contextmanager
 
 # import pprint
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
+
+from .journal import Journal, JournaledList, rebase_ops
+from .profiling import count, phase
+from .tools import get_home_dir
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locking on this platform.
+    fcntl = None
+
+# Journal smaller than this is never compacted into the snapshot.
+JOURNAL_COMPACT_SIZE = 64 * 1024
+
+# Version of serialized storage structures.
+# 1 - frequency stored as datetime or string (i.e. "2w").
+# 2 - frequency stored as (kind, interval, anchor) tuple.
+# 3 - tasks stored as dict keyed by task ID.
+# 4 - tasks stored as columns (see ``eagle.table``).
+STORAGE_VERSION = 4
 
 # Main structures.
 Task = namedtuple("Task", "title frequency group created")
 Group = namedtuple("Group", "title created")
 
+# Frequency kind of tasks with specific date.
+DATE = "@"
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# List kept right in the home directory (see ``get_conf_dir()``).
+DEFAULT_LIST = "default"
+
+# Recurring period lengths in days and months.
+PERIOD_DAYS = {"d": 1, "w": 7}
+PERIOD_MONTHS = {"m": 1, "y": 12}
+
+
+def days_in_month(year, month):
+    """
+    Returns number of days in the given month.
+
+    :param int year: Year.
+    :param int month: Month (1 - 12).
+    :return: Number of days.
+    :rtype: int
+    """
+
+    if 2 == month:
+        return 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28
+
+    return 30 if month in (4, 6, 9, 11) else 31
+
+
+class Frequency(namedtuple("Frequency", "kind interval anchor")):
+    """
+    Parsed task frequency.
+
+    * kind - "@" for specific date or "d", "w", "m", "y" for recurring
+      tasks (days, weeks, months, years)
+    * interval - number of periods between occurrences (0 for specific date)
+    * anchor - ordinal of the specific date or of the first occurrence
+      of recurring task
+
+    Monthly and yearly tasks recur on the anchor's day of month
+    (or on the last day of shorter months).
+    """
+
+    __slots__ = ()
+
+    def is_date(self):
+
+        return DATE == self.kind
+
+    def date(self):
+        """
+        Returns the anchor date.
+
+        :return: Specific date of the task.
+        :rtype: date
+        """
+
+        return date.fromordinal(self.anchor)
+
+    def occurs_on(self, ordinal):
+        """
+        Checks if the task takes place on the given day.
+
+        :param int ordinal: Day ordinal.
+        :return: True if the task takes place on the day.
+        :rtype: bool
+        """
+
+        if DATE == self.kind:
+            return ordinal == self.anchor
+
+        if self.kind in PERIOD_DAYS:
+            return 0 == (ordinal - self.anchor) % (
+                self.interval * PERIOD_DAYS[self.kind]
+            )
+
+        return occurs_monthly(
+            self.anchor, self.interval * PERIOD_MONTHS[self.kind], ordinal
+        )
+
+    def __str__(self):
+
+        if DATE == self.kind:
+            return self.date().strftime("%d/%m/%Y")
+
+        return f"{self.interval}{self.kind}"
+
+
+def occurs_monthly(anchor, months, ordinal):
+    """
+    Checks if task recurring each ``months`` months since
+    the ``anchor`` day takes place on the given day.
+
+    :param int anchor: Anchor day ordinal.
+    :param int months: Number of months between occurrences.
+    :param int ordinal: Day ordinal.
+    :return: True if the task takes place on the day.
+    :rtype: bool
+    """
+
+    a = date.fromordinal(anchor)
+    d = date.fromordinal(ordinal)
+
+    if (d.year * 12 + d.month - a.year * 12 - a.month) % months:
+        return False
+
+    return d.day == min(a.day, days_in_month(d.year, d.month))
+
 
 def is_today_task(self, today=None):
     """
@@ -28,34 +156,7 @@ def is_today_task(self, today=None):
     if self.frequency is None:
         return False
 
-    # Check for specific date.
-    if isinstance(self.frequency, datetime):
-        if self.frequency.date() == today:
-            return True
-
-        return False
-
-    # Parse frequency - for example "1d".
-    number = int(self.frequency[:-1])
-    period = self.frequency[-1:]
-
-    delta = (today - self.created.date()).days
-
-    # Day.
-    if "d" == period and 0 == delta % number:
-        return True
-
-    # Week.
-    if "w" == period and 0 == delta % (number * 7):
-        return True
-
-    # Month.
-    if "m" == period and 0 == delta % (number * 30):
-        return True
-
-    # Year
-    if "y" == period and 0 == delta % (number * 365):
-        return True
+    return self.frequency.occurs_on(today.toordinal())
 
 
 Task.is_today_task = is_today_task
@@ -66,7 +167,7 @@ def is_overdue(self):
     if self.frequency is None:
         return False
 
-    if isinstance(self.frequency, datetime) and self.frequency.date() < date.today():
+    if self.frequency.is_date() and self.frequency.anchor < date.today().toordinal():
         return True
 
 
@@ -75,35 +176,420 @@ Task.is_overdue = is_overdue
 
 def is_upcoming(self):
 
-    for i in range(1, 4):
+    from .recurrence import next_occurrence
 
-        is_upcoming_task = self.is_today_task(date.today() + timedelta(days=i))
+    today = date.today().toordinal()
+    day = next_occurrence(self.frequency, today + 1)
 
-        if is_upcoming_task:
-            return True
+    return day is not None and day <= today + UPCOMING_DAYS
 
 
 Task.is_upcoming = is_upcoming
 
+# Task buckets as returned by classify_tasks().
+OVERDUE, TODAY, UPCOMING, OTHER = range(4)
+BUCKETS = ("overdue", "today", "upcoming", "other")
+
+# Number of days after today which are considered upcoming.
+UPCOMING_DAYS = 3
 
-def get_conf_file(file):
+# Lists with fewer tasks are classified without NumPy
+# which isn't even worth importing for them.
+NUMPY_THRESHOLD = 10000
+
+# Number of tasks classified at once by ``iter_buckets()``.
+CLASSIFY_CHUNK = 4096
+
+
+def get_numpy():
+    """
+    Returns NumPy module if it's installed.
+
+    :return: NumPy module or None.
+    :rtype: module
+    """
+
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def get_task_columns(tasks):
+    """
+    Converts tasks into integer columns:
+
+    * period - recurring period in days (0 for other tasks)
+    * months - recurring period in months (0 for other tasks)
+    * anchor - ordinal of the first occurrence of recurring task
+    * fixed - ordinal of the task specific date (0 for tasks without one)
+
+    :param list tasks: List or dict of tasks (or task mapping with
+        ``columns()`` method which provides the columns).
+    :return: Period, months, anchor and fixed columns.
+    :rtype: tuple
+    """
+
+    if hasattr(tasks, "columns"):
+        return tasks.columns()
+
+    if isinstance(tasks, dict):
+        tasks = tasks.values()
+
+    columns = array("q"), array("q"), array("q"), array("q")
+
+    for t in tasks:
+        for column, value in zip(columns, get_frequency_columns(t.frequency)):
+            column.append(value)
+
+    return columns
+
+
+def get_kind_columns(kinds, intervals, anchors):
+    """
+    Converts frequencies stored as columns - kind (``ord()`` of the kind,
+    0 for no frequency), interval and anchor - into classification
+    columns (see ``get_task_columns()``).
+
+    :param kinds: Kind column (bytes-like).
+    :param intervals: Interval column (int32 array-like).
+    :param anchors: Anchor column (int32 array-like).
+    :return: Period, months, anchor and fixed columns.
+    :rtype: tuple
+    """
+
+    numpy = get_numpy() if NUMPY_THRESHOLD <= len(kinds) else None
+
+    if numpy:
+        days = numpy.zeros(256, dtype=numpy.int64)
+        months = numpy.zeros(256, dtype=numpy.int64)
+
+        for kind, length in PERIOD_DAYS.items():
+            days[ord(kind)] = length
+
+        for kind, length in PERIOD_MONTHS.items():
+            months[ord(kind)] = length
+
+        kinds = numpy.frombuffer(kinds, dtype=numpy.uint8)
+        intervals = numpy.frombuffer(intervals, dtype=numpy.int32)
+        anchors = numpy.frombuffer(anchors, dtype=numpy.int32)
+        dated = ord(DATE) == kinds
+
+        return (
+            intervals * days[kinds],
+            intervals * months[kinds],
+            numpy.where(dated, 0, anchors),
+            numpy.where(dated, anchors, 0),
+        )
+
+    days = {ord(kind): length for kind, length in PERIOD_DAYS.items()}
+    months = {ord(kind): length for kind, length in PERIOD_MONTHS.items()}
+    dated = ord(DATE)
+    columns = array("q"), array("q"), array("q"), array("q")
+
+    for kind, interval, anchor in zip(kinds, intervals, anchors):
+        columns[0].append(interval * days.get(kind, 0))
+        columns[1].append(interval * months.get(kind, 0))
+        columns[2].append(anchor if dated != kind else 0)
+        columns[3].append(anchor if dated == kind else 0)
+
+    return columns
+
+
+def get_frequency_columns(f):
+    """
+    Converts frequency into column values (see ``get_task_columns()``).
+
+    :param Frequency f: Frequency.
+    :return: Period, months, anchor and fixed values.
+    :rtype: tuple
+    """
+
+    if f is None:
+        return 0, 0, 0, 0
+
+    if DATE == f.kind:
+        return 0, 0, 0, f.anchor
+
+    if f.kind in PERIOD_DAYS:
+        return f.interval * PERIOD_DAYS[f.kind], 0, f.anchor, 0
+
+    return 0, f.interval * PERIOD_MONTHS[f.kind], f.anchor, 0
+
+
+def classify_columns(period, months, anchor, fixed, today):
     """
-    Returns path to file placed in user's config
-    directory.
-    Also checkes if the config directory exists and if not
-    creates it.
+    Classifies tasks given as columns (see ``get_task_columns()``)
+    into buckets in one pass.
+
+    :param int today: Today's ordinal.
+    :return: List of buckets.
+    :rtype: list
+    """
+
+    buckets = []
+
+    for p, m, a, f in zip(period, months, anchor, fixed):
+
+        # Specific date.
+        if f:
+            if f < today:
+                buckets.append(OVERDUE)
+            elif f == today:
+                buckets.append(TODAY)
+            elif f - today <= UPCOMING_DAYS:
+                buckets.append(UPCOMING)
+            else:
+                buckets.append(OTHER)
+
+            continue
+
+        # Recurring - count days till the next occurrence.
+        if p:
+            days = (a - today) % p
+        elif m:
+            days = next(
+                (
+                    i
+                    for i in range(UPCOMING_DAYS + 1)
+                    if occurs_monthly(a, m, today + i)
+                ),
+                None,
+            )
+        else:
+            days = None
+
+        if 0 == days:
+            buckets.append(TODAY)
+        elif days is not None and days <= UPCOMING_DAYS:
+            buckets.append(UPCOMING)
+        else:
+            buckets.append(OTHER)
+
+    return buckets
+
+
+def classify_columns_numpy(numpy, period, months, anchor, fixed, today):
+    """
+    NumPy variant of ``classify_columns()``.
+    """
+
+    period = numpy.asarray(period, dtype=numpy.int64)
+    months = numpy.asarray(months, dtype=numpy.int64)
+    anchor = numpy.asarray(anchor, dtype=numpy.int64)
+    fixed = numpy.asarray(fixed, dtype=numpy.int64)
+    buckets = numpy.full(len(period), OTHER, dtype=numpy.int8)
+
+    # Recurring by days - count days till the next occurrence.
+    recurring = 0 < period
+    days = numpy.mod(anchor - today, numpy.where(recurring, period, 1))
+    buckets[recurring & (days <= UPCOMING_DAYS)] = UPCOMING
+    buckets[recurring & (0 == days)] = TODAY
+
+    # Recurring by months - check the next few days one by one.
+    # Anchor is converted into month index and day of month.
+    monthly = 0 < months
+    anchor_days = (anchor - EPOCH_ORDINAL).astype("datetime64[D]")
+    anchor_months = anchor_days.astype("datetime64[M]")
+    anchor_day = (anchor_days - anchor_months).astype(numpy.int64) + 1
+    anchor_months = anchor_months.astype(numpy.int64)
+    step = numpy.where(monthly, months, 1)
+
+    for i in range(UPCOMING_DAYS, -1, -1):
+        d = date.fromordinal(today + i)
+        month = (d.year - 1970) * 12 + d.month - 1
+        occurs = (
+            monthly
+            & (0 == numpy.mod(month - anchor_months, step))
+            & (numpy.minimum(anchor_day, days_in_month(d.year, d.month)) == d.day)
+        )
+        buckets[occurs] = UPCOMING if i else TODAY
+
+    # Specific date.
+    dated = 0 < fixed
+    days = fixed - today
+    buckets[dated & (days <= UPCOMING_DAYS)] = UPCOMING
+    buckets[dated & (0 == days)] = TODAY
+    buckets[dated & (days < 0)] = OVERDUE
+
+    return buckets.tolist()
+
+
+def classify_tasks(tasks, today=None):
+    """
+    Classifies all the tasks into buckets (overdue, today, upcoming
+    and other) at once. Buckets are exclusive and checked in that
+    order - i.e. today's recurring task is not upcoming.
+
+    Lists bigger than ``NUMPY_THRESHOLD`` are classified
+    with NumPy if it's installed.
+
+    :param list tasks: List of tasks (see ``get_task_columns()``).
+    :param date today: Fake today date.
+    :return: List of buckets (``OVERDUE``, ``TODAY``, ...) in order
+        of the given tasks (values in case of dict).
+    :rtype: list
+    """
+
+    today = (today or date.today()).toordinal()
+
+    return classify_chunk(get_task_columns(tasks), today)
+
+
+def classify_chunk(columns, today):
+    """
+    Classifies tasks given by columns (see ``classify_tasks()``).
+
+    :param tuple columns: Task columns (see ``get_task_columns()``).
+    :param int today: Today's ordinal.
+    :return: List of buckets.
+    :rtype: list
+    """
+
+    count("tasks.classified", len(columns[0]))
+
+    with phase("classify"):
+        if NUMPY_THRESHOLD <= len(columns[0]):
+            numpy = get_numpy()
+
+            if numpy:
+                return classify_columns_numpy(numpy, *columns, today)
+
+        return classify_columns(*columns, today)
+
+
+def iter_buckets(tasks, today=None):
+    """
+    Classifies the tasks lazily chunk by chunk (see ``classify_tasks()``)
+    so the caller can stop once it has seen enough tasks.
+
+    :param list tasks: List of tasks (see ``get_task_columns()``) or task
+        mapping with ``buckets()`` method which provides the buckets.
+    :param date today: Fake today date.
+    :return: Generator of buckets in order of the given tasks.
+    :rtype: generator
+    """
+
+    today = (today or date.today()).toordinal()
+
+    # Tasks which keep their buckets (see ``eagle.buckets``).
+    if hasattr(tasks, "buckets"):
+        yield from tasks.buckets(today)
+
+        return
+
+    columns = get_task_columns(tasks)
+
+    for start in range(0, len(columns[0]), CLASSIFY_CHUNK):
+        end = start + CLASSIFY_CHUNK
+
+        yield from classify_chunk([c[start:end] for c in columns], today)
+
+
+def is_list_name(name):
+    """
+    Checks the name can be used as list name - letters, digits,
+    "_", "-" and "." (not at the start).
+
+    :param str name: List name.
+    :return: True if it's valid list name.
+    :rtype: bool
+    """
+
+    return bool(name) and not name.startswith(".") and all(
+        c.isalnum() or c in "_-." for c in name
+    )
+
+
+def use_list(name):
+    """
+    Switches all storage functions (``get_engine()``, ``get_storage()``,
+    ..) to the given list.
+
+    :param str name: List name.
+    """
+
+    if not is_list_name(name):
+        raise ValueError(f"Invalid list name: {name}")
+
+    get_conf_dir.list = name
+
+
+def get_lists():
+    """
+    Returns names of all lists - the default one and the named ones.
+
+    :return: List names.
+    :rtype: list
+    """
+
+    try:
+        names = os.listdir(os.path.join(get_home_dir(), "lists"))
+    except FileNotFoundError:
+        names = []
+
+    return [DEFAULT_LIST] + sorted(n for n in names if is_list_name(n))
+
+
+def get_conf_dir(name=None):
+    """
+    Returns directory of the list (see ``use_list()``). The default
+    list is kept in eagle home directory (``EAGLE_HOME``
+    or ``~/.config/eagle``), named lists in its ``lists`` directory.
+    Also creates the directory if it doesn't exist.
+
+    :param str name: List name (the current list by default).
+    :return: Absolute path to the directory.
+    :rtype: str
+    """
+
+    name = name or get_conf_dir.list
+    conf_path = get_home_dir()
+
+    if DEFAULT_LIST != name:
+        conf_path = os.path.join(conf_path, "lists", name)
+
+    if not os.path.exists(conf_path):
+        os.makedirs(conf_path, mode=0o755, exist_ok=True)
+
+    return conf_path
+
+
+get_conf_dir.list = DEFAULT_LIST
+
+
+def get_conf_file(file, name=None):
+    """
+    Returns path to file placed in directory of the list
+    (see ``get_conf_dir()``).
 
     :param str file: File name.
+    :param str name: List name (the current list by default).
     :return: Absolute path to the file.
     :rtype: str
     """
 
-    conf_path = os.path.join(os.path.expanduser("~"), ".config", "eagle")
+    return os.path.join(get_conf_dir(name), file)
 
-    if not os.path.exists(conf_path):
-        os.makedirs(conf_path, mode=0o755)
 
-    return os.path.join(conf_path, file)
+def serialize_item(item):
+    """
+    Serializes one storage structure (task, group) into list.
+
+    :param namedtuple item: Storage structure.
+    :return: Serialized structure.
+    :rtype: list
+    """
+
+    values = list(item._asdict().values())
+
+    # Store frequency as plain tuple.
+    if isinstance(item, Task) and item.frequency is not None:
+        values[1] = tuple(item.frequency)
+
+    return values
 
 
 def serialize_structures(storage):
@@ -116,14 +602,107 @@ def serialize_structures(storage):
     """
 
     return {
-        "tasks": [list(t._asdict().values()) for t in storage["tasks"]],
-        "groups": [list(g._asdict().values()) for g in storage["groups"]],
+        "version": STORAGE_VERSION,
+        "tasks": storage["tasks"].to_raw(),
+        "tasks_next_id": storage["tasks"].next_id,
+        "groups": [serialize_item(g) for g in storage["groups"]],
     }
 
 
+def serialize_op(op):
+    """
+    Serializes journal operation - structures carried by
+    the operation are serialized into lists.
+
+    :param tuple op: Journal operation.
+    :return: Serialized operation.
+    :rtype: tuple
+    """
+
+    name = op[0]
+
+    if name in ("append", "set", "insert"):
+        return op[:-1] + (serialize_item(op[-1]),)
+
+    if "reset" == name:
+        return (name, op[1], [serialize_item(i) for i in op[2]])
+
+    return op
+
+
+def deserialize_frequency(frequency, created):
+    """
+    Deserializes task frequency. Frequencies stored by older
+    versions (datetime for specific date, string like "2w" for
+    recurring tasks) are converted as well.
+
+    :param frequency: Serialized frequency.
+    :param datetime created: Task creation time - anchor of legacy
+        recurring tasks.
+    :return: Frequency.
+    :rtype: Frequency
+    """
+
+    if frequency is None or isinstance(frequency, Frequency):
+        return frequency
+
+    if isinstance(frequency, datetime):
+        return Frequency(DATE, 0, frequency.toordinal())
+
+    if isinstance(frequency, str):
+        return Frequency(frequency[-1], int(frequency[:-1]), created.toordinal())
+
+    return Frequency._make(frequency)
+
+
+def deserialize_task(values):
+    """
+    Deserializes one task.
+
+    :param list values: Serialized task.
+    :return: Task.
+    :rtype: Task
+    """
+
+    title, frequency, group, created = values
+
+    return Task(title, deserialize_frequency(frequency, created), group, created)
+
+
+def deserialize_tasks(tasks, version):
+    """
+    Deserializes tasks into task table (see ``eagle.table``). Tasks
+    stored by older versions as a dict of serialized tasks are
+    converted as well - or as a list, then they get IDs by their
+    position (starting from 1).
+
+    :param tasks: Serialized tasks (or already deserialized table).
+    :param int version: Storage version the tasks were stored by.
+    :return: Task table.
+    :rtype: TaskTable
+    """
+
+    from .table import TaskTable
+
+    if isinstance(tasks, TaskTable):
+        return tasks
+
+    if not tasks:
+        return TaskTable()
+
+    if 4 <= version:
+        return TaskTable.from_raw(tasks)
+
+    if isinstance(tasks, list):
+        tasks = dict(enumerate(tasks, 1))
+
+    return TaskTable(sorted(tasks.items()))
+
+
 def deserialize_structures(storage):
     """
-    Deserializes storage structures into named tuples.
+    Deserializes storage structures - tasks into task table
+    (see ``deserialize_tasks()``) and groups into named tuples.
 
     :param dict storage: Storage dict.
     :return: Deserialized storage.
@@ -131,56 +710,787 @@ def deserialize_structures(storage):
     """
 
     return {
-        "tasks": [Task._make(t) for t in storage.get("tasks", [])],
+        "tasks": deserialize_tasks(storage.get("tasks"), storage.get("version", 1)),
         "groups": [Group._make(g) for g in storage.get("groups", [])],
     }
 
 
+def task_matches(
+    task,
+    groups=None,
+    date_from=None,
+    date_to=None,
+    recurring=False,
+    queries=None,
+    match_all=False,
+):
+    """
+    Checks if the task matches the given predicates.
+    See ``Storage.select()``.
+
+    :param Task task: Task to be checked.
+    :return: True if the task matches all the predicates.
+    :rtype: bool
+    """
+
+    if groups is not None and task.group not in groups:
+        return False
+
+    if queries is not None:
+        title = task.title.lower()
+        match = all if match_all else any
+
+        if not match(q.lower() in title for q in queries):
+            return False
+
+    if date_from or date_to or recurring:
+        if task.frequency is None:
+            return False
+
+        if task.frequency.is_date():
+            day = task.frequency.anchor
+
+            return (not date_from or date_from.toordinal() <= day) and (
+                not date_to or day <= date_to.toordinal()
+            )
+
+        return recurring
+
+    return True
+
+
+class GroupIndex:
+    """
+    Index of groups by title and of task IDs by group title.
+    Both parts are built once used and are kept in sync with
+    changes made to the storage.
+    """
+
+    def __init__(self, storage):
+
+        self.storage = storage
+
+        # Group title -> group.
+        self.groups = None
+
+        # Group title -> set of task IDs.
+        self.tasks = None
+
+        # Task ID -> group title.
+        self.task_groups = None
+
+    def get_groups(self):
+
+        if self.groups is None:
+            self.groups = {}
+
+            for g in self.storage["groups"]:
+                self.groups.setdefault(g.title, g)
+
+        return self.groups
+
+    def get_tasks(self):
+
+        if self.tasks is None:
+            self.tasks = {}
+            self.task_groups = {}
+
+            tasks = self.storage["tasks"]
+
+            if hasattr(tasks, "group_items"):
+                groups = tasks.group_items()
+            else:
+                groups = ((i, t.group) for i, t in tasks.items())
+
+            for i, group in groups:
+                self.add_task(i, group)
+
+        return self.tasks
+
+    def add_task(self, i, group):
+
+        self.tasks.setdefault(group, set()).add(i)
+        self.task_groups[i] = group
+
+    def remove_task(self, i):
+
+        if i in self.task_groups:
+            self.tasks[self.task_groups.pop(i)].discard(i)
+
+    def update(self, op):
+        """
+        Updates the index with storage operation.
+
+        :param tuple op: Journal operation - see ``JournaledList``
+            and ``JournaledDict``.
+        """
+
+        name, target = op[0], op[1]
+
+        if "groups" == target and self.groups is not None:
+            if "append" == name:
+                self.groups.setdefault(op[2].title, op[2])
+            else:
+                self.groups = None
+
+        elif "tasks" == target and self.tasks is not None:
+            if "set" == name:
+                self.remove_task(op[2])
+                self.add_task(op[2], op[3].group)
+            elif "pop" == name:
+                self.remove_task(op[2])
+            else:
+                self.tasks = self.task_groups = None
+
+
+class Storage(dict):
+    """
+    Storage dict with "tasks" table (keyed by task ID) and "groups"
+    list. All changes made to them are recorded into ``ops`` so only
+    the changes are persisted.
+    """
+
+    def __init__(self, structures=None, next_id=None):
+
+        self.ops = []
+        self.index = GroupIndex(self)
+
+        # Storage was loaded from older storage format.
+        self.outdated = False
+
+        # Engine the storage was loaded with (set by ``get_storage()``).
+        self.engine = None
+
+        # Titles of groups at the time they were loaded (see ``rebase()``).
+        self.base_groups = set()
+
+        super().__init__(
+            (name, self.make_list(name, items, next_id))
+            for name, items in (structures or {}).items()
+        )
+
+    def make_list(self, name, items, next_id=None):
+        """
+        Makes storage list (or task table for tasks) which records
+        its changes.
+
+        :param str name: List name.
+        :param iterable items: List items.
+        :param int next_id: Next free task ID.
+        :return: Storage list.
+        :rtype: JournaledList or JournaledTable
+        """
+
+        if "tasks" == name:
+            from .table import JournaledTable
+
+            return JournaledTable(name, items, self.ops, self.index.update, next_id)
+
+        items = JournaledList(name, items, self.ops, self.index.update)
+
+        if "groups" == name:
+            self.base_groups = {g.title for g in items}
+
+        return items
+
+    def replace(self, other):
+        """
+        Takes over content of other storage (see ``rebase()``).
+
+        :param Storage other: Storage to take over.
+        """
+
+        dict.clear(self)
+        dict.update(self, other)
+        self.ops = other.ops
+        self.index = other.index
+        self.index.storage = self
+        self.base_groups = other.base_groups
+        self.outdated = other.outdated
+
+    @property
+    def dirty(self):
+        """
+        True if the storage was changed since it was loaded
+        (or saved) - storage which is not dirty is never written.
+        """
+
+        return bool(self.ops)
+
+    def commit(self):
+        """
+        Persists changes made so far. Used by long running operations
+        (i.e. import) which save the storage in batches instead of
+        once on ``get_storage()`` exit.
+        """
+
+        if self.engine is not None:
+            self.engine.save(self)
+
+    def mark_saved(self):
+        """
+        Makes the saved state base of the next rebase (see ``rebase()``)
+        - called by engines once the changes were written so changes
+        which were saved already are not rebased again.
+        """
+
+        if "tasks" in self:
+            self["tasks"].base_next_id = self["tasks"].next_id
+
+        if "groups" in self:
+            self.base_groups = {g.title for g in self["groups"]}
+
+    def group(self, title):
+        """
+        Finds group by title.
+
+        :param str title: Group title.
+        :return: Group or None if there is no such group.
+        :rtype: Group
+        """
+
+        return self.index.get_groups().get(title)
+
+    def group_tasks(self, title):
+        """
+        Returns IDs of tasks belonging to the group.
+
+        :param str title: Group title.
+        :return: Sorted list of task IDs.
+        :rtype: list
+        """
+
+        return sorted(self.index.get_tasks().get(title, ()))
+
+    def select(
+        self,
+        groups=None,
+        date_from=None,
+        date_to=None,
+        recurring=False,
+        queries=None,
+        match_all=False,
+    ):
+        """
+        Selects tasks matching all the given predicates.
+
+        :param list groups: Task has to belong to one of the groups.
+        :param date date_from: Task has to be dated on this day or later.
+        :param date date_to: Task has to be dated on this day or sooner.
+        :param bool recurring: Recurring tasks match the date
+            predicates as well.
+        :param list queries: Task title has to contain one of the queries
+            (case insensitive).
+        :param bool match_all: Task title has to contain all the queries.
+        :return: List of matching tasks - (ID, task) pairs.
+        :rtype: list
+        """
+
+        tasks = self["tasks"]
+
+        # Only tasks of the groups are checked.
+        if groups is not None:
+            index = self.index.get_tasks()
+            candidates = sorted(set().union(*(index.get(g, ()) for g in groups)))
+            candidates = ((i, tasks[i]) for i in candidates)
+        else:
+            candidates = tasks.items()
+
+        return [
+            (i, t)
+            for i, t in candidates
+            if task_matches(
+                t, groups, date_from, date_to, recurring, queries, match_all
+            )
+        ]
+
+
+def rebase(storage, fresh):
+    """
+    Applies changes made to the storage on top of fresh storage which
+    was loaded after another process changed it in the meantime.
+    Tasks added by this process are moved to free IDs, groups are
+    added and removed by their titles.
+
+    :param Storage storage: Storage with changes.
+    :param Storage fresh: Freshly loaded storage.
+    :return: Fresh storage with the changes.
+    :rtype: Storage
+    """
+
+    ops = storage.ops
+
+    if "tasks" in storage:
+        base_next_id = storage["tasks"].base_next_id
+        next_id = max(fresh["tasks"].next_id, base_next_id)
+        ops = rebase_ops(ops, "tasks", base_next_id, next_id)
+
+    for op in ops:
+        if "tasks" != op[1]:
+            continue
+
+        if "set" == op[0]:
+            fresh["tasks"][op[2]] = op[3]
+        elif "pop" == op[0]:
+            fresh["tasks"].pop(op[2], None)
+        elif "clear" == op[0]:
+            fresh["tasks"].clear()
+
+    if any("groups" == op[1] for op in ops):
+        titles = {g.title for g in storage["groups"]}
+        removed = storage.base_groups - titles
+
+        for i in range(len(fresh["groups"]) - 1, -1, -1):
+            if fresh["groups"][i].title in removed:
+                fresh["groups"].pop(i)
+
+        for g in storage["groups"]:
+            if g.title not in storage.base_groups and fresh.group(g.title) is None:
+                fresh["groups"].append(g)
+
+    return fresh
+
+
 @contextmanager
-def get_storage():
+def lock_file(filename, shared=False):
     """
-    Context manager for storage.
-    On enter reads storage content and yields it out.
-    On exit serializes and saved storage back to storage file.
+    Holds advisory lock of the file. Lock is not taken on platforms
+    without ``fcntl``.
+
+    :param str filename: Lock file name (created if missing).
+    :param bool shared: Take shared (read) lock instead
+        of exclusive (write) one.
+    """
+
+    if fcntl is None:
+        yield
+
+        return
+
+    with open(filename, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class JournalEngine:
+    """
+    Default storage engine - snapshot of the whole storage (see
+    ``eagle.datafile``) and journal of changes made since the snapshot
+    was written.
+
+    Loaded storage is cached for the whole process so stacked
+    ``get_storage()`` blocks read the files only once. The cache
+    is valid until the files change and it's dropped once a storage
+    is left dirty (changed but not saved). Engine given its own
+    ``cache`` dict never shares its storage (see ``eagle.api.Session``).
 
     Storage file: storage.dat
+    Journal file: storage.journal
+    Columnar snapshot file: storage.col (see ``eagle.snapshot``)
+    Search index file: storage.idx (see ``eagle.search``)
+    Bucket cache file: storage.bkt (see ``eagle.buckets``)
+    Lock file: storage.lock
+
+    Readers hold shared lock and writers exclusive one. Changes are
+    written optimistically - if another process changed the storage
+    since it was loaded the changes are rebased (see ``rebase()``)
+    on top of the fresh storage. Snapshot files are replaced at once
+    so they are never seen half written.
+    """
+
+    def __init__(
+        self,
+        filename,
+        journal,
+        snapshot_filename,
+        index_filename=None,
+        buckets_filename=None,
+    ):
+
+        self.filename = filename
+        self.journal = journal
+        self.snapshot_filename = snapshot_filename
+        self.index_filename = index_filename
+        self.buckets_filename = buckets_filename
+        self.lock_filename = os.path.splitext(filename)[0] + ".lock"
+
+        # Generation of the loaded snapshot (see ``Journal``).
+        self.generation = 0
+
+        # State of the storage files at the time of loading.
+        self.loaded = None
+
+    # Storage file name -> (state, generation, journal valid size, storage).
+    cache = {}
+
+    def remember(self, storage):
+        """
+        Caches the storage which reflects current state of the files.
+
+        :param Storage storage: Loaded or saved storage.
+        """
+
+        self.cache[self.filename] = (
+            self.loaded,
+            self.generation,
+            self.journal.valid_size,
+            storage,
+        )
+
+    def lock(self, shared=False):
+
+        return lock_file(self.lock_filename, shared)
+
+    def state(self):
+        """
+        Returns state of the storage files - changed by every write.
+
+        :return: Snapshot stamp and journal size.
+        :rtype: tuple
+        """
+
+        return self.stamp(), self.journal.size()
+
+    def stamp(self):
+        """
+        Returns stamp (size and modification time) of the storage
+        file which identifies the snapshot version.
+
+        :return: Storage file stamp or None if there is no file.
+        :rtype: tuple
+        """
+
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def open_snapshot(self):
+        """
+        Opens columnar snapshot if it's up to date with
+        the storage file.
+
+        :return: Columnar snapshot or None.
+        :rtype: Snapshot
+        """
+
+        from .snapshot import Snapshot
+
+        try:
+            snapshot = Snapshot(self.snapshot_filename)
+        except (OSError, ValueError):
+            return None
+
+        if snapshot.stamp != self.stamp():
+            return None
+
+        return snapshot
+
+    def view(self):
+        """
+        Returns read-only mapping of all tasks backed by
+        the columnar snapshot so no task is decoded until
+        it's accessed.
+
+        :return: Mapping of task IDs to tasks or None if the columnar
+            snapshot is not available.
+        :rtype: SnapshotView
+        """
+
+        from .snapshot import SnapshotView
+
+        with self.lock(shared=True), phase("storage.view"):
+            snapshot = self.open_snapshot()
+
+            if snapshot is None:
+                return None
+
+            return SnapshotView(snapshot, self.journal, self.buckets_filename)
+
+    def load(self):
+        """
+        Loads storage snapshot and applies journaled changes on it.
+
+        :return: Loaded storage.
+        :rtype: Storage
+        """
+
+        with self.lock(shared=True):
+            state = self.state()
+            cached = self.cache.get(self.filename)
+
+            if cached and cached[0] == state and not cached[3].dirty:
+                self.loaded, self.generation, self.journal.valid_size, storage = cached
+
+                return storage
+
+            storage = self.read()
+            self.remember(storage)
+
+            return storage
+
+    def read(self):
+        """
+        Reads storage - the caller holds the lock (see ``load()``).
+
+        :return: Loaded storage.
+        :rtype: Storage
+        """
+
+        from .datafile import get_compression, load
+
+        raw = {"version": STORAGE_VERSION, "groups": [], "tasks": {}}
+        codec = get_compression()[0]
+
+        # Try to open existing file and read the content (see
+        # ``eagle.datafile``). If file is empty keep the storage empty.
+        try:
+            with open(self.filename, "rb") as f, phase("storage.read"):
+                if os.fstat(f.fileno()).st_size:
+                    raw, codec = load(f)
+        except FileNotFoundError:
+            pass
+
+        # Journal is replayed right into the task table.
+        with phase("storage.deserialize"):
+            raw["tasks"] = deserialize_tasks(raw.get("tasks"), raw.get("version", 1))
+
+        with phase("storage.replay"):
+            self.journal.replay(raw)
+
+        self.generation = raw.get("generation", 0)
+        self.loaded = self.state()
+
+        with phase("storage.deserialize"):
+            storage = Storage(deserialize_structures(raw), raw.get("tasks_next_id"))
+
+        count("tasks.loaded", len(storage["tasks"]))
+
+        # Storage written by older version (or with other compression)
+        # gets rewritten with the next change - pickled files are
+        # converted this way (see ``eagle.legacy``).
+        storage.outdated = (
+            STORAGE_VERSION > raw.get("version", 1)
+            or get_compression()[0] != codec
+            or self.journal.legacy
+        )
+
+        return storage
+
+    def save(self, storage):
+        """
+        Persists storage changes. Changes are appended to the journal
+        and once the journal outgrows the snapshot the journal
+        is compacted into a new snapshot.
+        Storage without any change is not written at all.
+
+        :param Storage storage: Storage to be saved.
+        """
+
+        if not storage.ops:
+            return
+
+        with self.lock():
+
+            # Another process changed the storage since it was loaded.
+            if self.state() != self.loaded:
+                storage.replace(rebase(storage, self.read()))
+
+            self.write(storage)
+            self.loaded = self.state()
+            storage.mark_saved()
+            self.remember(storage)
+
+    def write(self, storage):
+        """
+        Writes storage changes - the caller holds the lock
+        (see ``save()``).
+
+        :param Storage storage: Storage to be saved.
+        """
+
+        # Journal operations of older storage version cannot be
+        # replayed on top of the old snapshot - rewrite it instead.
+        if storage.outdated:
+            storage.ops.clear()
+            storage.outdated = False
+            self.compact(storage)
+
+            return
+
+        with phase("storage.journal"):
+            ops = [serialize_op(op) for op in storage.ops]
+            self.journal.append(ops, self.generation)
+
+        storage.ops.clear()
+
+        try:
+            snapshot_size = os.stat(self.filename).st_size
+        except FileNotFoundError:
+            snapshot_size = 0
+
+        if (
+            self.journal.size() > max(JOURNAL_COMPACT_SIZE, snapshot_size)
+            or self.open_snapshot() is None
+        ):
+            self.compact(storage)
+
+    def compact(self, storage):
+        """
+        Writes whole storage into the snapshot files and drops
+        the journal. Snapshot of a new generation is written aside
+        and replaced at once so journal left by interrupted compaction
+        is not replayed on top of it.
+
+        :param Storage storage: Storage to be saved.
+        """
+
+        from .datafile import dump, get_compression
+        from .snapshot import write_snapshot
+
+        old_stamp = self.stamp()
+
+        with phase("storage.serialize"):
+            raw = serialize_structures(storage)
+
+        raw["generation"] = self.generation + 1
+        tmp = self.filename + ".tmp"
+
+        with open(tmp, "wb") as f, phase("storage.write"):
+            dump(raw, f, *get_compression())
+
+        os.replace(tmp, self.filename)
+
+        stamp = self.stamp()
+
+        with phase("storage.snapshot"):
+            write_snapshot(self.snapshot_filename, storage, stamp, raw["generation"])
+
+        # Keep search index in sync (it's built by the first search).
+        if self.index_filename and os.path.exists(self.index_filename):
+            from .search import update_index
+
+            with phase("search.update"):
+                update_index(
+                    self.index_filename,
+                    self.journal,
+                    self.generation,
+                    storage["tasks"],
+                    old_stamp,
+                    stamp,
+                )
+
+        # Keep bucket cache in sync (it's written by the first listing).
+        if self.buckets_filename:
+            from .buckets import update_buckets
+
+            with phase("buckets.update"):
+                update_buckets(
+                    self.buckets_filename,
+                    storage["tasks"],
+                    date.today().toordinal(),
+                    stamp,
+                )
+
+        self.generation = raw["generation"]
+        self.journal.clear()
+
+    def close(self):
+        pass
+
+
+def get_engine(name=None):
+    """
+    Returns storage engine of the list chosen by ``EAGLE_ENGINE``
+    environment variable. Choices are:
+
+    * journal (default)
+    * sqlite
+
+    :param str name: List name (the current list by default).
+    :return: Storage engine.
+    :rtype: JournalEngine or SQLiteEngine
     """
 
-    def get_empty_storage():
+    engine = os.environ.get("EAGLE_ENGINE", "journal")
 
-        return {"groups": [], "tasks": []}
+    if "sqlite" == engine:
+        from .sqlstore import SQLiteEngine
+
+        return SQLiteEngine(get_conf_file("storage.sqlite", name))
+
+    return JournalEngine(
+        get_conf_file("storage.dat", name),
+        Journal(get_conf_file("storage.journal", name)),
+        get_conf_file("storage.col", name),
+        get_conf_file("storage.idx", name),
+        get_conf_file("storage.bkt", name),
+    )
+
+
+@contextmanager
+def get_storage():
+    """
+    Context manager for storage.
+    On enter reads storage content and yields it out.
+    On exit persists changes made to the storage
+    with the storage engine (see ``get_engine()``).
+    """
 
     if hasattr(get_storage, "storage"):
         yield get_storage.storage
 
         return
 
-    filename = get_conf_file("storage.dat")
-    f = None
+    engine = get_engine()
 
-    # Try to open existing file and pickle the
-    # content.
     try:
-        f = open(filename, "rb+")
+        get_storage.storage = engine.load()
+        get_storage.storage.engine = engine
 
-        # If file is empty set up the storage.
-        if not os.stat(filename).st_size:
-            get_storage.storage = get_empty_storage()
-        else:
-            get_storage.storage = deserialize_structures(pickle.load(f))
-            f.close()
+        # print("Storage:", pprint.pprint(get_storage.storage))
+
+        try:
+            yield get_storage.storage
+        finally:
+            storage = get_storage.storage
+            del get_storage.storage
+
+        # Persist the storage (only if it was changed).
+        if storage.dirty:
+            engine.save(storage)
+    finally:
+        engine.close()
 
-    except FileNotFoundError:
-        get_storage.storage = get_empty_storage()
 
-    # print("Storage:", pprint.pprint(get_storage.storage))
+def read_tasks():
+    """
+    Returns all tasks for read-only use. If the storage engine
+    supports it the tasks are not loaded at all but are decoded
+    once accessed.
+
+    :return: Mapping of task IDs to tasks.
+    :rtype: dict or SnapshotView
+    """
 
-    yield get_storage.storage
+    if hasattr(get_storage, "storage"):
+        return get_storage.storage["tasks"]
+
+    engine = get_engine()
+
+    try:
+        view = engine.view() if hasattr(engine, "view") else None
+    finally:
+        engine.close()
 
-    # Persist the storage.
-    pickle.dump(serialize_structures(get_storage.storage), open(filename, "wb"))
+    if view is not None:
+        return view
 
-    # Close file if previously opened.
-    if f:
-        f.close()
-        del get_storage.storage
+    with get_storage() as s:
+        return s["tasks"]
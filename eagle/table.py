@@ -0,0 +1,499 @@
+import sys
+from array import array
+from bisect import bisect_left
+
+from .journal import JournaledMapping
+from .snapshot import from_us, to_us
+from .storage import Frequency, Task, deserialize_frequency, get_kind_columns
+
+# Array columns of the table and their type codes (``kinds`` is
+# a bytearray, ``titles`` are ``Titles`` and ``names`` a list).
+ARRAYS = (
+    ("ids", "q"),
+    ("created", "q"),
+    ("intervals", "i"),
+    ("anchors", "i"),
+    ("group_ids", "i"),
+)
+
+# Kind of deleted rows.
+DELETED = 0xFF
+
+
+class Titles:
+    """
+    Column of task titles kept encoded in one blob with offsets the way
+    they were read from the storage file (see ``eagle.datafile``)
+    - a title is decoded only once its task is accessed. Titles which
+    are set or added later are kept aside as strings.
+    """
+
+    def __init__(self, offsets=None, blob=b"", added=None):
+
+        self.offsets = offsets if offsets is not None else array("Q", [0])
+        self.blob = blob
+
+        # Number of titles in the blob.
+        self.count = len(self.offsets) - 1
+
+        # Row -> title which replaced the one in the blob.
+        self.changed = {}
+
+        # Titles following the ones in the blob.
+        self.added = added if added is not None else []
+
+    def __len__(self):
+
+        return self.count + len(self.added)
+
+    def __getitem__(self, row):
+
+        if row >= self.count:
+            return self.added[row - self.count]
+
+        title = self.changed.get(row)
+
+        if title is None:
+            offsets = self.offsets
+            title = str(self.blob[offsets[row] : offsets[row + 1]], "utf-8")
+
+        return title
+
+    def __setitem__(self, row, title):
+
+        if row >= self.count:
+            self.added[row - self.count] = title
+        else:
+            self.changed[row] = title
+
+    def __iter__(self):
+
+        for row in range(len(self)):
+            yield self[row]
+
+    def append(self, title):
+
+        self.added.append(title)
+
+    def insert(self, row, title):
+
+        # Titles in the blob cannot shift - decode them all.
+        if row < self.count:
+            self.added = list(self)
+            self.offsets, self.blob, self.count = array("Q", [0]), b"", 0
+            self.changed = {}
+
+        self.added.insert(row - self.count, title)
+
+    def take(self, rows):
+        """
+        Makes column of titles of the given rows. Titles in the blob
+        are copied without decoding.
+
+        :param rows: Row indexes.
+        :return: New column.
+        :rtype: Titles
+        """
+
+        offsets, blob, changed = self.offsets, self.blob, self.changed
+        new_offsets = array("Q", [0])
+        new_blob = bytearray()
+
+        for row in rows:
+            if row < self.count and row not in changed:
+                new_blob += blob[offsets[row] : offsets[row + 1]]
+            else:
+                new_blob += self[row].encode()
+
+            new_offsets.append(len(new_blob))
+
+        return Titles(new_offsets, bytes(new_blob))
+
+    def pack(self):
+        """
+        Returns all titles packed into one blob (see
+        ``eagle.snapshot.pack_strings()``).
+
+        :return: Offsets and the blob.
+        :rtype: tuple
+        """
+
+        if self.changed or self.added:
+            titles = self.take(range(len(self)))
+        else:
+            titles = self
+
+        return titles.offsets, titles.blob
+
+
+class TaskTable:
+    """
+    Compact mapping of task IDs to tasks. Tasks are not kept as objects
+    but spread into columns the same way as in the columnar snapshot
+    (see ``eagle.snapshot``) - title, creation time in microseconds,
+    frequency kind, interval and anchor ordinal and index of the group
+    name. Group names are interned and stored once. Tasks are built
+    once they are accessed.
+
+    Rows are ordered by task ID so a task is found by binary search.
+    Deleted rows are only marked (their kind is ``DELETED``) and dropped
+    once there is enough of them.
+    """
+
+    def __init__(self, items=()):
+
+        self._reset_columns()
+
+        if isinstance(items, TaskTable):
+            self.__dict__.update(items.__dict__)
+
+            return
+
+        if hasattr(items, "items"):
+            items = items.items()
+
+        # Not recorded (see ``JournaledTable``).
+        for key, task in items:
+            TaskTable.__setitem__(self, key, task)
+
+    def _reset_columns(self):
+        """
+        Makes all the columns empty.
+        """
+
+        self.ids = array("q")
+        self.titles = Titles()
+        self.created = array("q")
+        self.kinds = bytearray()
+        self.intervals = array("i")
+        self.anchors = array("i")
+        self.group_ids = array("i")
+
+        # Group names and name -> index.
+        self.names = []
+        self.name_ids = {}
+
+        # Number of deleted rows which were not dropped yet.
+        self.deleted = 0
+
+    @classmethod
+    def from_raw(cls, raw):
+        """
+        Makes table of serialized columns (see ``to_raw()``).
+
+        :param dict raw: Serialized columns.
+        :return: Task table.
+        :rtype: TaskTable
+        """
+
+        table = cls()
+
+        for name, typecode in ARRAYS:
+            column = array(typecode)
+            column.frombytes(raw[name])
+            setattr(table, name, column)
+
+        if "title_offsets" in raw:
+            offsets = array("Q")
+            offsets.frombytes(raw["title_offsets"])
+            table.titles = Titles(offsets, bytes(raw["titles"]))
+        else:
+            # Titles stored as a list by older version.
+            table.titles = Titles(added=list(raw["titles"]))
+
+        table.kinds = bytearray(raw["kinds"])
+        table.names = [sys.intern(n) for n in raw["names"]]
+        table.name_ids = {n: i for i, n in enumerate(table.names)}
+
+        return table
+
+    def to_raw(self):
+        """
+        Serializes the table into plain columns.
+
+        :return: Serialized columns.
+        :rtype: dict
+        """
+
+        self.compact()
+
+        raw = {name: getattr(self, name).tobytes() for name, _ in ARRAYS}
+        offsets, blob = self.titles.pack()
+        raw.update(
+            title_offsets=offsets.tobytes(),
+            titles=blob,
+            kinds=bytes(self.kinds),
+            names=self.names,
+        )
+
+        return raw
+
+    def find(self, key):
+        """
+        Finds row of the task.
+
+        :param int key: Task ID.
+        :return: Row index or -1 if there is no such task.
+        :rtype: int
+        """
+
+        ids = self.ids
+        row = bisect_left(ids, key)
+
+        if row < len(ids) and key == ids[row] and DELETED != self.kinds[row]:
+            return row
+
+        return -1
+
+    def get_task(self, row):
+        """
+        Builds task of the row.
+
+        :param int row: Row index.
+        :return: Task.
+        :rtype: Task
+        """
+
+        kind = self.kinds[row]
+        group_id = self.group_ids[row]
+
+        return Task(
+            self.titles[row],
+            Frequency(chr(kind), self.intervals[row], self.anchors[row])
+            if kind
+            else None,
+            self.names[group_id] if -1 != group_id else None,
+            from_us(self.created[row]),
+        )
+
+    def get_group_id(self, group):
+
+        if group is None:
+            return -1
+
+        group_id = self.name_ids.get(group)
+
+        if group_id is None:
+            group_id = self.name_ids[group] = len(self.names)
+            self.names.append(sys.intern(group))
+
+        return group_id
+
+    def encode(self, task):
+        """
+        Converts task into column values. Serialized tasks (lists)
+        are accepted as well so the journal can be replayed right
+        into the table.
+
+        :param task: Task or serialized task.
+        :return: Column values (without ID).
+        :rtype: tuple
+        """
+
+        title, frequency, group, created = task
+
+        if frequency is None:
+            kind, interval, anchor = 0, 0, 0
+        else:
+            kind, interval, anchor = deserialize_frequency(frequency, created)
+            kind = ord(kind)
+
+        return title, to_us(created), kind, interval, anchor, self.get_group_id(group)
+
+    def __setitem__(self, key, task):
+
+        values = (key,) + self.encode(task)
+        columns = (
+            self.ids,
+            self.titles,
+            self.created,
+            self.kinds,
+            self.intervals,
+            self.anchors,
+            self.group_ids,
+        )
+
+        # New tasks get the highest ID - appended.
+        if not self.ids or self.ids[-1] < key:
+            for column, value in zip(columns, values):
+                column.append(value)
+
+            return
+
+        row = bisect_left(self.ids, key)
+
+        if key == self.ids[row]:
+            if DELETED == self.kinds[row]:
+                self.deleted -= 1
+
+            for column, value in zip(columns, values):
+                column[row] = value
+        else:
+            for column, value in zip(columns, values):
+                column.insert(row, value)
+
+    def __getitem__(self, key):
+
+        row = self.find(key)
+
+        if -1 == row:
+            raise KeyError(key)
+
+        return self.get_task(row)
+
+    def __delitem__(self, key):
+
+        row = self.find(key)
+
+        if -1 == row:
+            raise KeyError(key)
+
+        self.kinds[row] = DELETED
+        self.deleted += 1
+
+        if max(1024, len(self)) < self.deleted:
+            self.compact()
+
+    def __contains__(self, key):
+
+        return -1 != self.find(key)
+
+    def __len__(self):
+
+        return len(self.ids) - self.deleted
+
+    def __iter__(self):
+
+        for key, kind in zip(self.ids, self.kinds):
+            if DELETED != kind:
+                yield key
+
+    def __repr__(self):
+
+        return f"<{type(self).__name__} of {len(self)} tasks>"
+
+    def get(self, key, default=None):
+
+        row = self.find(key)
+
+        return self.get_task(row) if -1 != row else default
+
+    def keys(self):
+
+        return list(self)
+
+    def values(self):
+
+        for row, kind in enumerate(self.kinds):
+            if DELETED != kind:
+                yield self.get_task(row)
+
+    def items(self):
+
+        for row, (key, kind) in enumerate(zip(self.ids, self.kinds)):
+            if DELETED != kind:
+                yield key, self.get_task(row)
+
+    def group_items(self):
+        """
+        Yields group of every task without building the tasks.
+
+        :return: Generator of (task ID, group name) pairs.
+        :rtype: generator
+        """
+
+        names = self.names
+
+        for key, kind, group_id in zip(self.ids, self.kinds, self.group_ids):
+            if DELETED != kind:
+                yield key, names[group_id] if -1 != group_id else None
+
+    def rows_items(self):
+        """
+        Returns (task ID, row) pairs in the order of ``columns()``
+        (see ``eagle.render.render_view()``).
+
+        :return: Iterator of (task ID, row index) pairs.
+        :rtype: iterator
+        """
+
+        self.compact()
+
+        return zip(self.ids, range(len(self.ids)))
+
+    def columns(self):
+        """
+        Returns classification columns (see
+        ``eagle.storage.get_task_columns()``) straight from the table.
+
+        :return: Period, months, anchor and fixed columns.
+        :rtype: tuple
+        """
+
+        self.compact()
+
+        return get_kind_columns(self.kinds, self.intervals, self.anchors)
+
+    def pop(self, key, *default):
+
+        row = self.find(key)
+
+        if -1 == row:
+            if default:
+                return default[0]
+
+            raise KeyError(key)
+
+        task = self.get_task(row)
+
+        # Not recorded (see ``JournaledTable``).
+        TaskTable.__delitem__(self, key)
+
+        return task
+
+    def popitem(self):
+
+        for row in range(len(self.ids) - 1, -1, -1):
+            if DELETED != self.kinds[row]:
+                key = self.ids[row]
+
+                return key, TaskTable.pop(self, key)
+
+        raise KeyError("popitem(): table is empty")
+
+    def last_key(self):
+
+        for row in range(len(self.ids) - 1, -1, -1):
+            if DELETED != self.kinds[row]:
+                return self.ids[row]
+
+        return 0
+
+    def clear(self):
+
+        # Not ``__init__()`` - it's different in ``JournaledTable``.
+        self._reset_columns()
+
+    def compact(self):
+        """
+        Drops deleted rows.
+        """
+
+        if not self.deleted:
+            return
+
+        rows = [row for row, kind in enumerate(self.kinds) if DELETED != kind]
+
+        for name, typecode in ARRAYS:
+            column = getattr(self, name)
+            setattr(self, name, array(typecode, [column[row] for row in rows]))
+
+        self.titles = self.titles.take(rows)
+        self.kinds = bytearray(self.kinds[row] for row in rows)
+        self.deleted = 0
+
+
+class JournaledTable(JournaledMapping, TaskTable):
+    """
+    Task table which records every mutation (see ``JournaledMapping``).
+    """
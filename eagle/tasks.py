@@ -1,12 +1,25 @@
-import calendar
 from datetime import date, datetime, timedelta
 
 from .groups import add_group, group_exist
-from .storage import Task, get_storage
+from .storage import DATE, Frequency, Task, get_storage
 from .tools import err_print
 
 
-def parse_frequency(f, silent=True):
+def parse_frequency(f, silent=True, anchor=None):
+    """
+    Parses frequency given by user (see ``add_task()``).
+
+    :param str f: Frequency string.
+    :param bool silent: Don't print error for unknown frequency.
+    :param date anchor: First occurrence of recurring task (today
+        by default).
+    :return: Parsed frequency or None.
+    :rtype: Frequency
+    """
+
+    def on(d):
+
+        return Frequency(DATE, 0, d.toordinal())
 
     # 1. specific date.
     if f.startswith("@"):
@@ -14,27 +27,29 @@ def parse_frequency(f, silent=True):
         # Try (D)D/(M)M/YYYY
         # or fallback to (D)D/(M)M where year will be the current one.
         try:
-            return datetime.strptime(f[1:], "%d/%m/%Y")
+            return on(datetime.strptime(f[1:], "%d/%m/%Y"))
         except ValueError:
             d = datetime.strptime(f[1:], "%d/%m")
 
-            return d.replace(year=date.today().year)
+            return on(d.replace(year=date.today().year))
 
     # 2. Magic date name
     if "today" == f:
-        return datetime.now()
+        return on(date.today())
 
     if "tomorrow" == f:
-        return datetime.now() + timedelta(days=1)
+        return on(date.today() + timedelta(days=1))
 
     # Try to seek nearest weekday.
+    import calendar
+
     for i in range(1, 7):
 
-        the_date = datetime.now() + timedelta(days=i)
+        the_date = date.today() + timedelta(days=i)
         day_index = the_date.weekday()
 
         if calendar.day_name[day_index].lower().startswith(f.lower()):
-            return the_date
+            return on(the_date)
 
     # 3. +XY days
     # Handles the "+X" days - like "+5".
@@ -45,11 +60,16 @@ def parse_frequency(f, silent=True):
         except:
             days = 0
 
-        return datetime.now() + timedelta(days=days)
+        return on(date.today() + timedelta(days=days))
 
-    # 4. X(d|w|m|y) - i.e. "2w".
-    if 2 <= len(f) and f[-1] in ["d", "w", "m", "y"]:
-        return f
+    # 4. X(d|w|m|y) - i.e. "2w". Zero interval never recurs.
+    if (
+        2 <= len(f)
+        and f[-1] in ["d", "w", "m", "y"]
+        and f[:-1].isdigit()
+        and 0 < int(f[:-1])
+    ):
+        return Frequency(f[-1], int(f[:-1]), (anchor or date.today()).toordinal())
 
     # 5. No date at all - fallback.
     if "-" == f:
@@ -97,7 +117,7 @@ def add_task(tasks):
                 add_group([[t[2]]])
 
             # If a frequency was given "t" variable has 2 items.
-            s["tasks"].append(
+            s["tasks"].add(
                 Task(
                     t[0],
                     parse_frequency(t[1], silent=False) if 1 < len(t) else None,
@@ -111,12 +131,18 @@ def edit_task(task):
     """
     Edits a tasks with a helpo with input() functions.
 
-    :param list task: List of tasks to be edited.
+    :param list task: List of tasks (IDs) to be edited.
     """
 
     with get_storage() as s:
-        index = task[0] - 1
-        origin_task = s["tasks"][index]
+        task_id = task[0]
+
+        if task_id not in s["tasks"]:
+            print(f"Cannot edit {task_id}")
+
+            return
+
+        origin_task = s["tasks"][task_id]
 
         print("\nHere you can edit a task be rewriting current values.")
         print(
@@ -146,7 +172,7 @@ def edit_task(task):
         elif "" == freq:
             freq = origin_task.frequency
         else:
-            freq = parse_frequency(freq)
+            freq = parse_frequency(freq, anchor=origin_task.created)
 
         # Group.
         group = input("Enter group (empty space to remove group): ")
@@ -157,29 +183,24 @@ def edit_task(task):
             group = origin_task.group
 
         # Save.
-        s["tasks"].pop(index)
-        s["tasks"].insert(index, Task(title, freq, group, origin_task.created))
+        s["tasks"][task_id] = Task(title, freq, group, origin_task.created)
 
         print("\nTask was successfully updated.\n")
 
 
 def delete_task(index_list):
     """
-    Deletes a task from storage by index.
+    Deletes a task from storage by ID.
 
-    :param list index: List of lists of task indexes to be deleted.
+    :param list index: List of lists of task IDs to be deleted.
     """
 
-    # Sort the IDs descending so while we pop item by item
-    # the task indexes remains the same.
-    to_delete = sorted([i[0] for i in index_list], reverse=True)
-
     with get_storage() as s:
 
-        for i in to_delete:
+        for i in [i[0] for i in index_list]:
             try:
-                s["tasks"].pop(int(i) - 1)
-            except IndexError:
+                del s["tasks"][int(i)]
+            except KeyError:
                 print(f"Cannot delete {i}")
 
 
@@ -195,14 +216,10 @@ def prune():
         to_delete = []
 
         # Find tasks to delete.
-        for i, t in enumerate(s["tasks"]):
-            if isinstance(t.frequency, datetime) and t.frequency.date() < date.today():
+        for i, t in s["tasks"].items():
+            if t.is_overdue():
                 to_delete.append(i)
 
-        # Sort the IDs descending so while we pop item by item
-        # the task indexes remains the same.
-        to_delete = sorted(to_delete, reverse=True)
-
         # Delete the tasks.
         for i in to_delete:
             task = s["tasks"].pop(i)
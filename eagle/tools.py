@@ -1,3 +1,4 @@
+import os
 import sys
 
 
@@ -14,3 +15,33 @@ def err_print(message):
     print()
     print(R + message + W, file=sys.stderr)
     print()
+
+
+def get_home_dir():
+    """
+    Returns eagle home directory - ``EAGLE_HOME`` environment
+    variable or ``~/.config/eagle``.
+
+    :return: Absolute path to the directory.
+    :rtype: str
+    """
+
+    home = os.environ.get("EAGLE_HOME")
+
+    if home:
+        return os.path.abspath(os.path.expanduser(home))
+
+    return os.path.join(os.path.expanduser("~"), ".config", "eagle")
+
+
+def get_socket_file():
+    """
+    Returns path to socket of eagle daemon (see ``eagle.daemon``).
+    Kept apart from the storage so the client doesn't have to
+    import it.
+
+    :return: Absolute path to the socket.
+    :rtype: str
+    """
+
+    return os.path.join(get_home_dir(), "eagle.sock")
@@ -0,0 +1,238 @@
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from .storage import DATE, Group, Task, get_storage, read_tasks
+from .tasks import parse_frequency
+from .tools import err_print
+
+# Number of records saved at once during import.
+BATCH_SIZE = 1000
+
+# Fields of exported records (and CSV columns).
+FIELDS = ("id", "title", "frequency", "group", "created")
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def is_csv(filename):
+
+    return filename.lower().endswith(".csv")
+
+
+@contextmanager
+def open_file(filename, mode):
+    """
+    Opens file for import/export. "-" stands for stdin/stdout
+    which are left open.
+
+    :param str filename: File name.
+    :param str mode: "r" or "w".
+    """
+
+    if "-" == filename:
+        yield sys.stdin if "r" == mode else sys.stdout
+
+        return
+
+    with open(filename, mode, newline="", encoding="utf-8") as f:
+        yield f
+
+
+def format_frequency(frequency):
+    """
+    Formats frequency the way ``parse_frequency()`` accepts it.
+
+    :param Frequency frequency: Task frequency.
+    :return: Frequency string (empty for no frequency).
+    :rtype: str
+    """
+
+    if frequency is None:
+        return ""
+
+    if DATE == frequency.kind:
+        return f"@{frequency}"
+
+    return str(frequency)
+
+
+def task_to_record(task_id, task):
+    """
+    Converts task into exported record.
+
+    :param int task_id: Task ID.
+    :param Task task: Task.
+    :return: Record (see ``FIELDS``).
+    :rtype: dict
+    """
+
+    return {
+        "id": task_id,
+        "title": task.title,
+        "frequency": format_frequency(task.frequency),
+        "group": task.group or "",
+        "created": task.created.strftime(DATETIME_FORMAT),
+    }
+
+
+def get_field(record, field):
+    """
+    Returns text field of imported record.
+
+    :param dict record: Record (see ``FIELDS``).
+    :param str field: Field name.
+    :return: Field value (empty if missing).
+    :rtype: str
+    :raises ValueError: If the field is not a text.
+    """
+
+    value = record.get(field)
+
+    if value is None:
+        return ""
+
+    if not isinstance(value, str):
+        raise ValueError(f"{field} has to be a text")
+
+    return value
+
+
+def record_to_task(record):
+    """
+    Converts imported record into task. Only title is mandatory,
+    recurring tasks are anchored to their creation date.
+
+    :param dict record: Record (see ``FIELDS``).
+    :return: Task.
+    :rtype: Task
+    :raises ValueError: If the record is not valid.
+    """
+
+    title = get_field(record, "title").strip()
+
+    if not title:
+        raise ValueError("missing title")
+
+    created = get_field(record, "created")
+
+    if created:
+        try:
+            created = datetime.strptime(created, DATETIME_FORMAT)
+        except ValueError:
+            created = datetime.strptime(created, "%Y-%m-%d")
+    else:
+        created = datetime.now()
+
+    frequency = get_field(record, "frequency") or None
+
+    if frequency:
+        parsed = parse_frequency(frequency, anchor=created)
+
+        if parsed is None and "-" != frequency:
+            raise ValueError(f'unknown frequency "{frequency}"')
+
+        frequency = parsed
+
+    return Task(title, frequency, get_field(record, "group") or None, created)
+
+
+def read_records(f, csv_format):
+    """
+    Reads records from the file one by one.
+
+    :param file f: File object.
+    :param bool csv_format: The file is CSV (JSON Lines otherwise).
+    :return: Generator of (line number, record) pairs.
+    :rtype: generator
+    """
+
+    if csv_format:
+        reader = csv.DictReader(f)
+
+        for record in reader:
+            yield reader.line_num, record
+
+        return
+
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+
+        yield number, record
+
+
+def import_tasks(filename):
+    """
+    Imports tasks from JSON Lines or CSV file (by the file extension).
+    Records are streamed and saved in batches so the file is never
+    loaded at once. Invalid records are reported and skipped.
+
+    :param str filename: File name ("-" for stdin).
+    """
+
+    imported = 0
+
+    with open_file(filename, "r") as f, get_storage() as s:
+        records = read_records(f, is_csv(filename))
+
+        while True:
+            batch = list(islice(records, BATCH_SIZE))
+
+            if not batch:
+                break
+
+            for number, record in batch:
+                try:
+                    if not isinstance(record, dict):
+                        raise ValueError("not a valid record")
+
+                    task = record_to_task(record)
+                except ValueError as e:
+                    err_print(f"Line {number} skipped: {e}.")
+
+                    continue
+
+                # Create missing group.
+                if task.group and s.group(task.group) is None:
+                    s["groups"].append(Group(task.group, datetime.now()))
+
+                s["tasks"].add(task)
+                imported += 1
+
+            s.commit()
+
+    print(f"\n{imported} tasks have been imported.\n")
+
+
+def export_tasks(filename):
+    """
+    Exports all tasks into JSON Lines or CSV file (by the file
+    extension). Tasks are written one by one as they are read.
+
+    :param str filename: File name ("-" for stdout).
+    """
+
+    csv_format = is_csv(filename)
+
+    with open_file(filename, "w") as f:
+        if csv_format:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+
+            def write(record):
+
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        for task_id, task in read_tasks().items():
+            write(task_to_record(task_id, task))
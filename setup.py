@@ -16,7 +16,7 @@ setuptools.setup(
     author=CONFIG["author"],
     url=CONFIG["homepage"],
     packages=setuptools.find_packages(),
-    entry_points={"console_scripts": ["eagle = eagle.eagle:eagle"]},
+    entry_points={"console_scripts": ["eagle = eagle.__main__:main"]},
     python_requires=">=3.6",
     classifiers=[
         "Environment :: Console",
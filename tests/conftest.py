@@ -0,0 +1,51 @@
+import pytest
+
+from eagle.eagle import eagle
+from eagle.storage import DEFAULT_LIST, JournalEngine, get_conf_dir
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    """
+    Runs every test on its own empty eagle home directory.
+    """
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("EAGLE_HOME", str(tmp_path / "eagle"))
+
+    for name in ("EAGLE_ENGINE", "EAGLE_COMPRESSION", "EAGLE_TRACE"):
+        monkeypatch.delenv(name, raising=False)
+
+    monkeypatch.setattr(get_conf_dir, "list", DEFAULT_LIST)
+    JournalEngine.cache.clear()
+
+    yield tmp_path / "eagle"
+
+    JournalEngine.cache.clear()
+
+
+@pytest.fixture(params=["journal", "sqlite"])
+def engine(request, monkeypatch):
+    """
+    Runs the test on every storage engine.
+    """
+
+    monkeypatch.setenv("EAGLE_ENGINE", request.param)
+
+    return request.param
+
+
+@pytest.fixture
+def run(capsys):
+    """
+    Runs eagle command and returns its output.
+    """
+
+    def run(*argv):
+
+        capsys.readouterr()
+        eagle(list(argv))
+
+        return capsys.readouterr()
+
+    return run
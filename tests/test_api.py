@@ -0,0 +1,91 @@
+import subprocess
+import sys
+
+from eagle.api import Session
+
+
+def other_process(*argv):
+    """
+    Runs eagle command in another process.
+    """
+
+    subprocess.run(
+        [sys.executable, "-m", "eagle", *argv], check=True, stdout=subprocess.DEVNULL
+    )
+
+
+def test_commits_of_long_lived_session(home, engine):
+
+    with Session() as s:
+        s.add("first")
+        s.commit()
+
+        second = s.add("second", group="work")
+        s.commit()
+        other_process("-a", "third")
+
+        s.edit(second, title="second edited")
+        s.commit()
+
+        s.delete_group("work", keep_tasks=True)
+        s.commit()
+        other_process("-a", "fourth")
+
+        s.add("fifth")
+
+    with Session() as s:
+        titles = [task.title for _, task in s.tasks()]
+
+        assert ["first", "second edited", "third", "fourth", "fifth"] == titles
+        assert [] == list(s.groups())
+
+
+def test_two_sessions(home, engine):
+
+    a, b = Session(), Session()
+    a.add("first", group="work")
+    b.add("second")
+    a.commit()
+    b.commit()
+    a.add("third", group="home")
+    a.commit()
+    b.add("fourth")
+    b.commit()
+    a.edit(3, title="third edited")
+    a.delete_group("work")
+    a.commit()
+    b.add("fifth")
+    b.commit()
+    a.close()
+    b.close()
+
+    with Session() as s:
+        titles = [t.title for _, t in s.tasks()]
+
+        assert ["second", "third edited", "fourth", "fifth"] == titles
+        assert ["home"] == [g.title for g in s.groups()]
+
+
+def test_concurrent_sessions_do_not_share_changes(home, engine):
+
+    with Session() as s:
+        s.add("seed")
+
+    a, b = Session(), Session()
+
+    assert ["seed"] == [t.title for t in a.storage["tasks"].values()]
+    assert ["seed"] == [t.title for t in b.storage["tasks"].values()]
+
+    a.add("from a")
+    a.rollback()
+    b.add("from b")
+    b.commit()
+    a.add("from a again")
+    a.commit()
+    a.close()
+    b.close()
+
+    with Session() as s:
+        titles = [t.title for _, t in s.tasks()]
+
+    assert ["seed", "from b", "from a again"] == titles
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import pytest
+
+from eagle import profiling
+from eagle.api import Session
+from eagle.buckets import read_buckets, write_buckets
+from eagle.storage import classify_tasks, get_engine
+
+TODAY = date.today().toordinal()
+
+
+@pytest.fixture
+def tracing(monkeypatch):
+
+    monkeypatch.setattr(profiling, "target", "stderr")
+    monkeypatch.setattr(profiling, "counters", {})
+
+
+def test_read_buckets(tmp_path):
+
+    filename = str(tmp_path / "storage.bkt")
+    write_buckets(filename, b"\x01\x02\x03", TODAY, (10, 20), 30, {7: 4})
+
+    assert (b"\x01\x02\x03", 30, {7: 4}) == read_buckets(filename, TODAY, (10, 20))
+
+    # Other day or other snapshot.
+    assert read_buckets(filename, TODAY + 1, (10, 20)) is None
+    assert read_buckets(filename, TODAY, (10, 21)) is None
+
+    with open(filename, "ab") as f:
+        f.write(b"\0")
+
+    assert read_buckets(filename, TODAY, (10, 20)) is None
+
+
+def listing():
+    """
+    Checks buckets of all tasks the way the listing gets them
+    and returns the counters of the listing.
+    """
+
+    expected = classify_tasks([t for _, t in Session().tasks()])
+    profiling.counters.clear()
+
+    assert expected == list(get_engine().view().buckets(TODAY))
+
+    return profiling.counters
+
+
+def test_buckets_are_cached(home, tracing):
+
+    with Session() as s:
+        for i in range(30):
+            s.add(f"task {i}", f"+{i % 10 - 2}")
+
+    # Classified by the first listing only.
+    assert 30 == listing()["tasks.classified"]
+
+    counters = listing()
+
+    assert 30 == counters["buckets.cached"]
+    assert "tasks.classified" not in counters
+
+    # Only tasks changed in the journal are classified.
+    with Session() as s:
+        s.edit(1, frequency=f"@{date.today() + timedelta(days=1):%d/%m/%Y}")
+        s.add("new", "today")
+        s.delete(2)
+
+    assert 2 == listing()["tasks.classified"]
+    assert "tasks.classified" not in listing()
+
+    # Carried over compaction.
+    engine = get_engine()
+    storage = engine.load()
+
+    with engine.lock():
+        engine.compact(storage)
+
+    assert "tasks.classified" not in listing()
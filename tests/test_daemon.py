@@ -0,0 +1,141 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from eagle.__main__ import request_daemon
+from eagle.api import Session
+from eagle.daemon import Daemon, runs_locally
+from eagle.storage import read_tasks
+from eagle.tools import get_socket_file
+
+
+def client(*argv, stdin=None):
+    """
+    Runs eagle command the way the shell does - in the daemon
+    if it's running.
+    """
+
+    return subprocess.run(
+        [sys.executable, "-m", "eagle", *argv],
+        input=stdin,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+
+@pytest.fixture
+def daemon(home):
+    """
+    Runs eagle daemon in the background.
+    """
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "eagle", "--serve"], stdout=subprocess.DEVNULL
+    )
+
+    for _ in range(100):
+        if os.path.exists(get_socket_file()):
+            break
+
+        time.sleep(0.05)
+    else:
+        pytest.fail("Eagle daemon didn't start.")
+
+    yield process
+
+    process.terminate()
+    process.wait(5)
+
+
+def test_daemon_runs_commands(home, monkeypatch, tmp_path):
+
+    monkeypatch.chdir(tmp_path)
+    daemon = Daemon()
+
+    assert 0 == daemon.run(["-a", "first"], str(tmp_path))["code"]
+    assert 0 == daemon.run(["-a", "second", "1w"], str(tmp_path))["code"]
+
+    response = daemon.run([], str(tmp_path))
+    daemon.close()
+
+    assert "1. first" in response["stdout"]
+    assert "2. second" in response["stdout"]
+    assert ["first", "second"] == [t.title for t in read_tasks().values()]
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["-e", "1"],
+        ["-e1"],
+        ["--edit=1"],
+        ["--ed", "1"],
+        ["--import", "-"],
+        ["--import=-"],
+        ["--export=-"],
+        ["--profile=out.prof"],
+        ["--prof", "out.prof"],
+        ["--serve"],
+        ["--list", "work"],
+        ["--list=work", "-a", "task"],
+        ["--lis", "work"],
+        ["--all-lists"],
+        ["--all"],
+    ],
+)
+def test_runs_locally(argv):
+
+    assert runs_locally(argv)
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [[], ["-a", "task"], ["--today"], ["--import", "tasks.jsonl"], ["--bogus"]],
+)
+def test_runs_in_daemon(argv):
+
+    assert not runs_locally(argv)
+
+
+def test_stale_socket_is_ignored(home):
+
+    home.mkdir(parents=True, exist_ok=True)
+
+    with open(get_socket_file(), "w"):
+        pass
+
+    assert request_daemon(["-a", "task"]) is None
+
+
+def test_client(daemon, home, tmp_path):
+
+    client("-a", "first")
+    client("-a", "second", "1w")
+
+    assert "2. second" in client().stdout
+
+    # Handed back by the daemon and run by the client.
+    output = client("--import=-", stdin='{"title": "third"}\n')
+
+    assert "1 tasks have been imported" in output.stdout
+
+    filename = tmp_path / "out.prof"
+    client("--today", f"--profile={filename}")
+
+    assert filename.stat().st_size
+    assert ["first", "second", "third"] == [t.title for t in read_tasks().values()]
+
+
+def test_client_with_named_list(daemon, home):
+
+    client("--list=work", "-a", "first")
+    client("--lis", "work", "-a", "second")
+
+    assert not read_tasks()
+
+    with Session("work") as s:
+        assert ["first", "second"] == [t.title for _, t in s.tasks()]
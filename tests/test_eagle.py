@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+from eagle.storage import JournalEngine, get_storage, read_tasks
+
+
+def test_clear_journaled_store(home, run, engine):
+
+    run("-a", "first")
+    run("-a", "second", "1w", "home")
+
+    output = run("--clear")
+
+    assert "Your list has been cleared out." in output.out
+
+    # Read back from the disk.
+    JournalEngine.cache.clear()
+
+    with get_storage() as s:
+        assert not list(s["groups"])
+
+    assert not read_tasks()
+
+    run("-a", "third")
+
+    assert ["third"] == [t.title for t in read_tasks().values()]
+    assert "1. third" in run().out
+
+
+def test_profile_alone_lists_all_tasks(home, run, tmp_path):
+
+    run("-a", "first")
+    run("-a", "second", "1w")
+    filename = tmp_path / "out.prof"
+
+    # Profiling is left for the exit so it runs in its own process.
+    output = subprocess.run(
+        [sys.executable, "-m", "eagle", "--profile", str(filename)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    assert "1. first" in output.stdout
+    assert "2. second" in output.stdout
+    assert filename.stat().st_size
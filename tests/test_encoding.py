@@ -0,0 +1,111 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from eagle import datafile
+from eagle.encoding import decode_ops, encode_ops
+from eagle.journal import Journal
+from eagle.storage import (
+    DATE,
+    STORAGE_VERSION,
+    Frequency,
+    Group,
+    Task,
+    deserialize_tasks,
+    serialize_item,
+    serialize_op,
+)
+from eagle.table import TaskTable
+
+CREATED = datetime(2024, 2, 29, 13, 45, 30, 123456)
+
+TASKS = [
+    Task("dentist", Frequency(DATE, 0, 739000), "health", CREATED),
+    Task("water plants", Frequency("w", 2, 738950), None, CREATED),
+    Task("žluťoučký kůň", None, "dům", CREATED),
+    Task("", None, None, CREATED),
+]
+
+GROUPS = [Group("health", CREATED), Group("dům", CREATED), Group("", CREATED)]
+
+OPS = [
+    ("set", "tasks", 1, TASKS[0]),
+    ("set", "tasks", 2**40, TASKS[2]),
+    ("pop", "tasks", 1),
+    ("clear", "tasks"),
+    ("append", "groups", GROUPS[0]),
+    ("insert", "groups", 1, GROUPS[1]),
+    ("set", "groups", 0, GROUPS[2]),
+    ("pop", "groups", 1),
+    ("reset", "groups", GROUPS),
+    ("reset", "groups", []),
+    ("clear", "groups"),
+    ("append", "tasks", TASKS[1]),
+    ("insert", "tasks", 3, TASKS[3]),
+    ("reset", "tasks", TASKS),
+]
+
+
+@pytest.mark.parametrize("op", OPS, ids=lambda op: f"{op[0]}-{op[1]}")
+def test_op_round_trip(op):
+
+    ops = [serialize_op(op)]
+
+    assert ops == decode_ops(encode_ops(ops))
+
+
+def test_ops_round_trip():
+
+    ops = [serialize_op(op) for op in OPS]
+
+    assert ops == decode_ops(encode_ops(ops))
+
+
+def test_truncated_ops_are_rejected():
+
+    data = encode_ops([serialize_op(op) for op in OPS])
+
+    with pytest.raises(ValueError):
+        decode_ops(data[:-1])
+
+
+def test_journal_records_with_groups(tmp_path):
+
+    journal = Journal(str(tmp_path / "storage.journal"))
+    records = [
+        [serialize_op(("append", "groups", GROUPS[0]))],
+        [serialize_op(("set", "tasks", 1, TASKS[0]))],
+    ]
+
+    for ops in records:
+        journal.append(ops)
+
+    assert [(0, ops) for ops in records] == list(journal.records())
+
+
+@pytest.mark.parametrize("codec", sorted(datafile.CODECS))
+def test_storage_round_trip(codec):
+
+    tasks = TaskTable({i: task for i, task in enumerate(TASKS, 1)})
+    del tasks[2]
+    raw = {
+        "version": STORAGE_VERSION,
+        "generation": 7,
+        "tasks": tasks.to_raw(),
+        "tasks_next_id": 5,
+        "groups": [serialize_item(g) for g in GROUPS],
+    }
+    f = io.BytesIO()
+    datafile.dump(raw, f, codec, 1)
+    f.seek(0)
+
+    loaded, loaded_codec = datafile.load(f)
+
+    assert codec == loaded_codec
+    assert 7 == loaded["generation"]
+    assert 5 == loaded["tasks_next_id"]
+    assert [list(g) for g in GROUPS] == loaded["groups"]
+    assert list(tasks.items()) == list(
+        deserialize_tasks(loaded["tasks"], loaded["version"]).items()
+    )
@@ -0,0 +1,118 @@
+import os
+import pickle
+from datetime import datetime
+
+from eagle import storage as storage_module
+from eagle.api import Session
+from eagle.journal import Journal
+from eagle.storage import JournalEngine, get_engine
+
+CREATED = datetime(2024, 1, 1)
+
+
+def test_replay(tmp_path):
+
+    journal = Journal(str(tmp_path / "storage.journal"))
+    journal.append([("set", "tasks", 1, ["first", None, None, CREATED])])
+    journal.append(
+        [
+            ("set", "tasks", 2, ["second", ("w", 1, 738886), "home", CREATED]),
+            ("append", "groups", ["home", CREATED]),
+            ("pop", "tasks", 1),
+        ]
+    )
+
+    raw = {"tasks": {}, "groups": []}
+
+    assert 2 == journal.replay(raw)
+    assert {2: ["second", ("w", 1, 738886), "home", CREATED]} == raw["tasks"]
+    assert 3 == raw["tasks_next_id"]
+    assert [["home", CREATED]] == raw["groups"]
+
+
+def test_torn_record_is_cut_off(tmp_path):
+
+    filename = tmp_path / "storage.journal"
+    journal = Journal(str(filename))
+    journal.append([("set", "tasks", 1, ["first", None, None, CREATED])])
+    size = filename.stat().st_size
+    journal.append([("set", "tasks", 2, ["second", None, None, CREATED])])
+
+    # Write interrupted in the middle of the second record.
+    with open(filename, "r+b") as f:
+        f.truncate(size + 5)
+
+    journal = Journal(str(filename))
+    assert 1 == len(list(journal.records()))
+
+    journal.append([("set", "tasks", 3, ["third", None, None, CREATED])])
+    raw = {"tasks": {}}
+    journal.replay(raw)
+
+    assert [1, 3] == list(raw["tasks"])
+
+
+def test_records_of_other_generation_are_skipped(tmp_path):
+
+    journal = Journal(str(tmp_path / "storage.journal"))
+    journal.append([("set", "tasks", 1, ["old", None, None, CREATED])], 1)
+    journal.append([("set", "tasks", 2, ["new", None, None, CREATED])], 2)
+    raw = {"generation": 2, "tasks": {}}
+
+    assert 1 == journal.replay(raw)
+    assert [2] == list(raw["tasks"])
+
+
+def test_legacy_journal(tmp_path):
+
+    filename = tmp_path / "storage.journal"
+
+    with open(filename, "wb") as f:
+        pickle.dump([("set", "tasks", 1, ["first", None, None, CREATED])], f)
+
+    journal = Journal(str(filename))
+    raw = {"tasks": {}}
+
+    assert 1 == journal.replay(raw)
+    assert journal.legacy
+    assert ["first"] == [t[0] for t in raw["tasks"].values()]
+
+
+def test_changes_are_journaled(home):
+
+    with Session() as s:
+        s.add("first")
+
+    stat = os.stat(home / "storage.dat")
+
+    with Session() as s:
+        s.add("second", "1w", "home")
+        s.delete(1)
+
+    # Only the journal was written.
+    assert stat.st_mtime_ns == os.stat(home / "storage.dat").st_mtime_ns
+    assert (home / "storage.journal").stat().st_size
+
+    JournalEngine.cache.clear()
+    storage = get_engine().load()
+
+    assert ["second"] == [t.title for t in storage["tasks"].values()]
+    assert ["home"] == [g.title for g in storage["groups"]]
+
+
+def test_journal_is_compacted(home, monkeypatch):
+
+    monkeypatch.setattr(storage_module, "JOURNAL_COMPACT_SIZE", 0)
+
+    with Session() as s:
+        s.add("first")
+
+    with Session() as s:
+        s.add_many([(f"task {i}",) for i in range(100)])
+
+    # Journal outgrew the snapshot.
+    assert not (home / "storage.journal").exists()
+
+    JournalEngine.cache.clear()
+
+    assert 101 == len(get_engine().load()["tasks"])
@@ -0,0 +1,66 @@
+from datetime import date, datetime, timedelta
+from itertools import combinations
+
+import pytest
+
+from eagle import profiling
+from eagle.query import DATE_FILTERS, Query
+from eagle.storage import DATE, Frequency, Task, classify_tasks, get_storage
+
+
+def on(days):
+
+    return Frequency(DATE, 0, (date.today() + timedelta(days=days)).toordinal())
+
+
+TASKS = [
+    ("long ago", on(-30)),
+    ("yesterday", on(-1)),
+    ("today", on(0)),
+    ("tomorrow", on(1)),
+    ("in three days", on(3)),
+    ("in four days", on(4)),
+    ("daily", Frequency("d", 1, date.today().toordinal())),
+    ("weekly", Frequency("w", 1, (date.today() + timedelta(days=2)).toordinal())),
+    ("undated", None),
+]
+
+
+@pytest.fixture
+def stored_tasks(engine):
+
+    with get_storage() as s:
+        for title, frequency in TASKS:
+            s["tasks"].add(Task(title, frequency, None, datetime.now()))
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [list(c) for n in (1, 2) for c in combinations(sorted(DATE_FILTERS), n)],
+)
+def test_date_filters_match_classification(stored_tasks, filters):
+
+    with get_storage() as s:
+        tasks = list(s["tasks"].items())
+
+    buckets = set().union(*(DATE_FILTERS[f] for f in filters))
+    expected = [
+        i for (i, _), b in zip(tasks, classify_tasks([t for _, t in tasks]))
+        if b in buckets
+    ]
+
+    assert expected == [i for i, _ in Query(date_filters=filters).run()]
+
+
+def test_date_filters_are_pushed_down(stored_tasks, engine, monkeypatch):
+
+    monkeypatch.setattr(profiling, "target", "stderr")
+    monkeypatch.setattr(profiling, "counters", {})
+
+    result = Query(date_filters=["overdue"]).run()
+
+    assert ["long ago", "yesterday"] == [t.title for _, t in result]
+    assert 2 == profiling.counters["filter.scanned"]
+
+    if "sqlite" == engine:
+        assert 2 == profiling.counters["tasks.loaded"]
@@ -0,0 +1,87 @@
+import pytest
+
+from eagle import profiling
+from eagle.api import Session
+from eagle.search import get_trigrams, search
+from eagle.storage import JournalEngine, get_engine, get_storage
+
+TITLES = [
+    "Buy milk",
+    "Call mom",
+    "Pay the rent",
+    "Buy a present for mom",
+    "Water plants",
+    "Renew passport",
+]
+
+QUERIES = [
+    (["buy"], False),
+    (["mom", "buy"], False),
+    (["mom", "buy"], True),
+    (["ren"], False),
+    (["nothing"], False),
+    (["mo"], False),
+    (["mo", "buy"], True),
+    (["PLANT"], False),
+]
+
+
+def expected(queries, match_all):
+
+    JournalEngine.cache.clear()
+    match = all if match_all else any
+
+    with get_storage() as s:
+        return [
+            i
+            for i, t in s["tasks"].items()
+            if match(q.lower() in t.title.lower() for q in queries)
+        ]
+
+
+def test_trigrams():
+
+    assert {"buy", "uy ", "y m", " mi", "mil", "ilk"} == get_trigrams("Buy Milk")
+    assert set() == get_trigrams("ab")
+
+
+@pytest.mark.parametrize("queries, match_all", QUERIES)
+def test_search(engine, queries, match_all):
+
+    with Session() as s:
+        s.add_many([(t,) for t in TITLES])
+
+    assert expected(queries, match_all) == [i for i, _ in search(queries, match_all)]
+
+    # Journaled changes are searched as well.
+    with Session() as s:
+        s.edit(1, title="Buy bread")
+        s.edit(5, title="Water the garden")
+        s.delete(2)
+        s.add("Mom's birthday")
+
+    assert expected(queries, match_all) == [i for i, _ in search(queries, match_all)]
+
+    # The index is carried over compaction.
+    if "journal" == engine:
+        engine = get_engine()
+        storage = engine.load()
+
+        with engine.lock():
+            engine.compact(storage)
+
+    assert expected(queries, match_all) == [i for i, _ in search(queries, match_all)]
+
+
+def test_index_narrows_candidates(home, monkeypatch):
+
+    with Session() as s:
+        s.add_many([(f"task {i}",) for i in range(100)])
+        s.add("Buy milk")
+
+    monkeypatch.setattr(profiling, "target", "stderr")
+    monkeypatch.setattr(profiling, "counters", {})
+
+    assert ["Buy milk"] == [t.title for _, t in search(["milk"])]
+    assert (home / "storage.idx").exists()
+    assert 1 == profiling.counters["search.candidates"]
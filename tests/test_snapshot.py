@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+
+import pytest
+
+from eagle.api import Session
+from eagle.snapshot import SnapshotView
+from eagle.storage import JournalEngine, get_engine, iter_buckets
+
+TODAY = date.today()
+
+
+def compacted(count):
+    """
+    Makes storage of the tasks with snapshot and empty journal.
+    """
+
+    with Session() as s:
+        for i in range(count):
+            s.add(f"task {i}", f"@{(TODAY + timedelta(days=i % 9 - 3)):%d/%m/%Y}")
+
+    engine = get_engine()
+    storage = engine.load()
+
+    with engine.lock():
+        engine.compact(storage)
+
+
+def journal_edits(s):
+
+    s.edit(2, title="edited")
+    s.delete(3)
+    s.delete(20)
+    s.add("new", "1d")
+    s.add("gone")
+    s.delete(22)
+    s.edit(1, frequency="-")
+    s.delete(5)
+    s.storage["tasks"][5] = s.storage["tasks"][4]._replace(title="back")
+
+
+def journal_clear(s):
+
+    s.delete(1)
+    s.storage["tasks"].clear()
+    s.add("after clear", "today")
+    s.storage["tasks"][7] = s.storage["tasks"][1]._replace(title="old id")
+
+
+@pytest.mark.parametrize("changes", [None, journal_edits, journal_clear])
+def test_view_matches_storage(changes):
+
+    compacted(20)
+
+    if changes is not None:
+        with Session() as s:
+            changes(s)
+
+    # Twice - the second listing reads the bucket cache.
+    for _ in range(2):
+        view = get_engine().view()
+
+        assert isinstance(view, SnapshotView)
+        assert (changes is None) == (view.overlay is None)
+
+        JournalEngine.cache.clear()
+        tasks = get_engine().load()["tasks"]
+        items = list(tasks.items())
+
+        assert items == list(view.items())
+        assert [i for i, _ in items] == list(view)
+        assert len(items) == len(view)
+
+        buckets = list(iter_buckets(tasks.values()))
+
+        assert buckets == list(iter_buckets(view))
+        assert buckets == list(view.buckets(TODAY.toordinal()))
+
+        for i in range(25):
+            assert (i in tasks) == (i in view)
+
+            if i in tasks:
+                assert tasks[i] == view[i]
+            else:
+                with pytest.raises(KeyError):
+                    view[i]
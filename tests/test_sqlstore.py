@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+from eagle.api import Session
+
+
+def test_parallel_migration(home, monkeypatch):
+
+    with Session() as s:
+        s.add_many([(f"journaled {i}",) for i in range(50)])
+
+    monkeypatch.setenv("EAGLE_ENGINE", "sqlite")
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "eagle", "-a", f"added {i}"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        for i in range(10)
+    ]
+
+    for process in processes:
+        _, stderr = process.communicate()
+
+        assert 0 == process.returncode, stderr
+
+    with Session() as s:
+        titles = [t.title for _, t in s.tasks()]
+
+    assert [f"journaled {i}" for i in range(50)] == titles[:50]
+    assert {f"added {i}" for i in range(10)} == set(titles[50:])
+    assert os.path.exists(home / "storage.sqlite")
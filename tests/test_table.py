@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from eagle.storage import Task
+from eagle.table import JournaledTable
+
+CREATED = datetime(2024, 1, 1)
+
+
+def make_table(ops):
+
+    tasks = {i: Task(f"task {i}", None, None, CREATED) for i in range(1, 5)}
+
+    return JournaledTable("tasks", tasks, ops, next_id=5)
+
+
+def test_every_change_is_recorded_once():
+
+    ops = []
+    table = make_table(ops)
+
+    assert "task 1" == table.pop(1).title
+    assert table.pop(1, None) is None
+    del table[2]
+    key, task = table.popitem()
+    assert (4, "task 4") == (key, task.title)
+    table[3] = table[3]._replace(title="changed")
+
+    assert [
+        ("pop", "tasks", 1),
+        ("pop", "tasks", 2),
+        ("pop", "tasks", 4),
+        ("set", "tasks", 3, Task("changed", None, None, CREATED)),
+    ] == ops
+    assert {3: Task("changed", None, None, CREATED)} == dict(table.items())
@@ -0,0 +1,32 @@
+from datetime import date
+
+import pytest
+
+from eagle.api import Session
+from eagle.storage import Frequency, read_tasks
+from eagle.tasks import parse_frequency
+
+
+@pytest.mark.parametrize("frequency", ["0d", "0w", "00m", "0y"])
+def test_zero_interval_is_rejected(frequency, run):
+
+    assert parse_frequency(frequency) is None
+
+    with Session() as s, pytest.raises(ValueError):
+        s.add("task", frequency)
+
+    with Session() as s, pytest.raises(ValueError):
+        s.add("task", Frequency(frequency[-1], 0, date.today().toordinal()))
+
+    # Added without frequency.
+    run("-a", "task", frequency)
+
+    assert [None] == [t.frequency for t in read_tasks().values()]
+    assert not run("--agenda", "today", "+2").err
+
+
+def test_recurring_frequency():
+
+    anchor = date(2024, 1, 1)
+
+    assert Frequency("w", 2, anchor.toordinal()) == parse_frequency("2w", anchor=anchor)
@@ -0,0 +1,35 @@
+import json
+
+from eagle.storage import read_tasks
+
+
+def test_import_skips_malformed_lines(home, run, tmp_path):
+
+    lines = [
+        {"title": "first"},
+        {"title": 5},
+        {"title": "bad date", "created": 20240101},
+        {"title": "bad group", "group": ["a"]},
+        {"title": "last", "frequency": "1w", "group": "home"},
+    ]
+    filename = tmp_path / "tasks.jsonl"
+    filename.write_text("\n".join(json.dumps(line) for line in lines))
+
+    output = run("--import", str(filename))
+
+    assert "2 tasks have been imported" in output.out
+    assert "Line 2 skipped: title has to be a text." in output.err
+    assert "Line 3 skipped: created has to be a text." in output.err
+    assert "Line 4 skipped: group has to be a text." in output.err
+    assert ["first", "last"] == [t.title for t in read_tasks().values()]
+
+
+def test_import_skips_zero_interval(home, run, tmp_path):
+
+    filename = tmp_path / "tasks.jsonl"
+    filename.write_text('{"title": "never", "frequency": "0w"}\n')
+
+    output = run("--import", str(filename))
+
+    assert "0 tasks have been imported" in output.out
+    assert 'Line 1 skipped: unknown frequency "0w".' in output.err